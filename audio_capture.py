@@ -1,23 +1,29 @@
-import pyaudio
 import numpy as np
 import threading
 import time
 from contextlib import contextmanager
+from audio_sources import AudioSource
 
-class AudioCapture:
-    def __init__(self, callback, rate=44100, chunk_size=4096, device_index=None):
-        self.callback = callback
-        self.rate = rate
-        self.chunk_size = chunk_size
+def _import_pyaudio():
+    """Importa PyAudio solo cuando se necesita un dispositivo real"""
+    import pyaudio
+    return pyaudio
+
+class AudioCapture(AudioSource):
+    """Fuente de audio en vivo a través de PyAudio/PortAudio.
+
+    PortAudio se abre en ``start``, no al construir el objeto, para que la
+    aplicación pueda crearse en máquinas sin dispositivo de entrada. Con
+    ``channels`` > 1 se abre un único flujo multicanal y cada fragmento
+    entrelazado se entrega como una vista (canales, muestras) sin copias.
+    """
+    
+    def __init__(self, callback=None, rate=44100, chunk_size=4096, device_index=None, channels=1):
+        super().__init__(callback, rate, chunk_size, channels=channels)
         self.device_index = device_index
-        self.p = pyaudio.PyAudio()
+        self.pyaudio = None
+        self.p = None
         self.stream = None
-        self.is_running = False
-        self.thread = None
-        
-        # Verificar si el dispositivo especificado es válido
-        if device_index is not None:
-            self._validate_device(device_index)
     
     def _validate_device(self, device_index):
         """Verifica que el índice del dispositivo sea válido"""
@@ -25,6 +31,9 @@ class AudioCapture:
             device_info = self.p.get_device_info_by_index(device_index)
             if device_info['maxInputChannels'] <= 0:
                 print(f"Advertencia: El dispositivo {device_index} no tiene canales de entrada.")
+            elif device_info['maxInputChannels'] < self.channels:
+                print(f"Advertencia: El dispositivo {device_index} solo tiene "
+                      f"{device_info['maxInputChannels']} canales de entrada.")
         except Exception as e:
             print(f"Error al validar el dispositivo {device_index}: {e}")
             print("Se utilizará el dispositivo predeterminado.")
@@ -63,21 +72,30 @@ class AudioCapture:
     @contextmanager
     def _get_pyaudio():
         """Contextmanager para asegurar que PyAudio se inicializa y termina correctamente"""
-        p = pyaudio.PyAudio()
+        p = _import_pyaudio().PyAudio()
         try:
             yield p
         finally:
             p.terminate()
     
-    def start(self):
+    def start(self, callback=None):
         if self.is_running:
             return
+        if callback is not None:
+            self.callback = callback
+        
+        self.pyaudio = _import_pyaudio()
+        self.p = self.pyaudio.PyAudio()
+        # Verificar si el dispositivo especificado es válido
+        if self.device_index is not None:
+            self._validate_device(self.device_index)
         
         self.is_running = True
+        self.started_at = time.perf_counter()
         try:
             self.stream = self.p.open(
-                format=pyaudio.paFloat32,
-                channels=1,
+                format=self.pyaudio.paFloat32,
+                channels=self.channels,
                 rate=self.rate,
                 input=True,
                 input_device_index=self.device_index,
@@ -94,9 +112,30 @@ class AudioCapture:
             print(f"Error al iniciar la captura de audio: {e}")
     
     def _audio_callback(self, in_data, frame_count, time_info, status):
+        # Mantener este callback mínimo: se ejecuta en el hilo de tiempo real de PortAudio
+        if status & self.pyaudio.paInputOverflow:
+            self.input_overflows += 1
         data = np.frombuffer(in_data, dtype=np.float32)
-        self.callback(data)
-        return (in_data, pyaudio.paContinue)
+        if self.channels > 1:
+            # Muestras entrelazadas -> vista (canales, muestras), sin copiar
+            data = data.reshape(-1, self.channels).T
+        self.callback(data, self._capture_time(frame_count, time_info))
+        self.delivered += 1
+        return (in_data, self.pyaudio.paContinue)
+    
+    def _capture_time(self, frame_count, time_info):
+        """Instante (en time.perf_counter) en que se capturó la última muestra del buffer.
+
+        PortAudio da los tiempos en su propio reloj, así que se usa solo la
+        diferencia entre el ADC y el momento actual. Si la API de audio no
+        informa del tiempo de ADC, se toma el momento de la llamada.
+        """
+        now = time.perf_counter()
+        adc_time = time_info.get('input_buffer_adc_time', 0) if time_info else 0
+        if not adc_time:
+            return now
+        captured = now - (time_info['current_time'] - adc_time) + frame_count / self.rate
+        return min(captured, now)
     
     def _run(self):
         self.stream.start_stream()
@@ -116,3 +155,4 @@ class AudioCapture:
             self.thread.join(timeout=1.0)
         
         self.p.terminate()
+        self.finished_at = time.perf_counter()
@@ -0,0 +1,176 @@
+import threading
+import time
+import numpy as np
+
+# Políticas cuando el análisis no da abasto
+DROP_OLDEST = 'drop-oldest'  # Procesar todo lo que quede en el buffer (se pierde lo sobrescrito)
+SKIP_FRAMES = 'skip'         # Saltar directamente al fragmento más reciente
+OVERRUN_POLICIES = (DROP_OLDEST, SKIP_FRAMES)
+
+
+class RingBuffer:
+    """Buffer circular de fragmentos de audio preasignado, sin bloqueos.
+
+    Pensado para un único productor (el callback de PortAudio) y un único
+    consumidor (el hilo de análisis). El productor nunca espera: si el
+    consumidor se queda atrás, los fragmentos más antiguos se sobrescriben y
+    se cuentan como desbordamientos.
+    Con ``channels`` > 1 cada fragmento es una matriz (canales, muestras).
+    """
+
+    def __init__(self, capacity, chunk_size, dtype=np.float32, channels=1):
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.channels = channels
+        self.buffer = np.zeros((capacity, chunk_size) if channels == 1 else (capacity, channels, chunk_size),
+                               dtype=dtype)
+        # Instante de captura de cada fragmento (reloj time.perf_counter)
+        self.timestamps = np.zeros(capacity)
+        self.read_timestamp = 0.0
+        # Contadores monótonos: total de fragmentos escritos y leídos
+        self.write_index = 0
+        self.read_index = 0
+        # Fragmentos sobrescritos antes de leerse y fragmentos saltados a propósito
+        self.overruns = 0
+        self.skipped = 0
+        self.data_ready = threading.Event()
+
+    def write(self, data, timestamp=None):
+        """Copia un fragmento al buffer. Se llama desde el hilo de captura.
+
+        ``timestamp`` es el instante (en time.perf_counter) en que se capturó la
+        última muestra; por defecto, el momento de la escritura.
+        """
+        slot = self.write_index % self.capacity
+        if self.write_index - self.read_index >= self.capacity:
+            self.overruns += 1
+        n = min(data.shape[-1], self.chunk_size)
+        self.buffer[slot, ..., :n] = data[..., :n]
+        if n < self.chunk_size:
+            self.buffer[slot, ..., n:] = 0
+        self.timestamps[slot] = time.perf_counter() if timestamp is None else timestamp
+        # Publicar el fragmento solo después de copiarlo
+        self.write_index += 1
+        self.data_ready.set()
+
+    def available(self):
+        return self.write_index - self.read_index
+
+    def read(self, out, policy=DROP_OLDEST):
+        """Copia el siguiente fragmento en ``out``. Devuelve False si no hay datos.
+
+        El instante de captura del fragmento leído queda en ``read_timestamp``.
+        """
+        while True:
+            written = self.write_index
+            if written == self.read_index:
+                return False
+
+            if policy == SKIP_FRAMES and written - self.read_index > 1:
+                # Descartar el atraso y quedarse solo con el último fragmento
+                self.skipped += written - self.read_index - 1
+                self.read_index = written - 1
+            elif written - self.read_index >= self.capacity:
+                # Lo más antiguo ya se sobrescribió (o es el hueco que se escribe a
+                # continuación): continuar por lo más viejo que queda intacto
+                self.read_index = written - self.capacity + 1
+
+            index = self.read_index
+            out[:] = self.buffer[index % self.capacity]
+            timestamp = self.timestamps[index % self.capacity]
+            # Si el productor llegó a este hueco mientras copiábamos (o lo está
+            # escribiendo: write_index - index == capacity), el dato no es válido
+            if self.write_index - index < self.capacity:
+                self.read_index = index + 1
+                self.read_timestamp = timestamp
+                return True
+
+
+class AnalysisWorker:
+    """Hilo que consume el RingBuffer y ejecuta el análisis fuera del callback de audio"""
+
+    def __init__(self, ring, process, policy=DROP_OLDEST, profiler=None):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Política de desbordamiento no válida: {policy}")
+        self.ring = ring
+        self.process = process
+        self.policy = policy
+        # cProfile.Profile opcional: se activa dentro del hilo de análisis
+        self.profiler = profiler
+        self.processed = 0
+        self.is_running = False
+        self.thread = None
+        # Fragmento de trabajo reutilizado en cada lectura
+        self._chunk = np.zeros(ring.buffer.shape[1:], dtype=ring.buffer.dtype)
+
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            while self.is_running:
+                self.ring.data_ready.wait(timeout=0.1)
+                self.ring.data_ready.clear()
+                while self.is_running and self.ring.read(self._chunk, self.policy):
+                    self.process(self._chunk, self.ring.read_timestamp)
+                    self.processed += 1
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+
+    def drain(self, timeout=1.0):
+        """Espera (como mucho ``timeout`` segundos) a que se analice lo pendiente en el buffer"""
+        deadline = time.perf_counter() + timeout
+        while self.is_running and self.ring.available() and time.perf_counter() < deadline:
+            time.sleep(0.005)
+    
+    def stop(self):
+        if not self.is_running:
+            return
+        self.is_running = False
+        self.ring.data_ready.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def stats(self):
+        """Contadores del pipeline para monitorización"""
+        return {
+            'processed': self.processed,
+            'pending': self.ring.available(),
+            'overruns': self.ring.overruns,
+            'skipped': self.ring.skipped,
+        }
+
+
+class SlidingWindow:
+    """Ventana de análisis deslizante sobre un buffer de muestras preasignado.
+
+    Cada ``push`` desplaza la ventana ``hop`` muestras en el mismo array, sin
+    reservar memoria nueva, de modo que se puede analizar una ventana larga
+    (buena resolución en graves) con actualizaciones frecuentes. Con
+    ``channels`` > 1 la ventana es una matriz (canales, muestras).
+    """
+
+    def __init__(self, window_size, hop_size, dtype=np.float32, channels=1):
+        if hop_size <= 0 or window_size % hop_size != 0:
+            raise ValueError("El tamaño de ventana debe ser múltiplo del salto")
+        self.window_size = window_size
+        self.hop_size = hop_size
+        self.window = np.zeros(window_size if channels == 1 else (channels, window_size), dtype=dtype)
+        self.filled = 0
+
+    def push(self, chunk):
+        """Añade un salto de muestras. Devuelve True cuando la ventana está completa."""
+        hop = self.hop_size
+        # Desplazamiento en el propio buffer (numpy gestiona el solapamiento)
+        self.window[..., :-hop] = self.window[..., hop:]
+        self.window[..., -hop:] = chunk[..., :hop]
+        self.filled = min(self.window_size, self.filled + hop)
+        return self.filled == self.window_size
@@ -0,0 +1,199 @@
+import sys
+import threading
+import time
+import numpy as np
+from file_analysis import AudioFileReader, RAW_FORMATS
+
+
+class AudioSource:
+    """Interfaz común de las fuentes de audio.
+
+    Una fuente entrega fragmentos de ``chunk_size`` muestras float32 llamando a
+    ``callback(fragmento, instante_de_captura)`` desde su propio hilo. Con
+    ``free_run`` los fragmentos se entregan tan rápido como el callback los
+    consume, sin esperar al tiempo real. Con ``channels`` > 1 cada fragmento
+    es una matriz (canales, muestras).
+    """
+
+    free_run = False
+
+    def __init__(self, callback=None, rate=44100, chunk_size=4096, channels=1):
+        self.callback = callback
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.channels = channels
+        self.is_running = False
+        self.thread = None
+        # Contadores comunes a todas las fuentes
+        self.input_overflows = 0
+        self.delivered = 0
+        self.started_at = None
+        self.finished_at = None
+        # cProfile.Profile opcional para el hilo de la fuente (en modo libre, el del análisis)
+        self.profiler = None
+
+    def start(self, callback=None):
+        if self.is_running:
+            return
+        if callback is not None:
+            self.callback = callback
+        self.is_running = True
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            self._deliver()
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            self.is_running = False
+            self.finished_at = time.perf_counter()
+
+    def _deliver(self):
+        """Entrega fragmentos mientras la fuente esté activa (a implementar en cada fuente)"""
+        raise NotImplementedError
+
+    def stop(self):
+        if not self.is_running:
+            return
+        self.is_running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def elapsed(self):
+        """Segundos desde start hasta el final de la fuente (o hasta ahora)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+
+class ArraySource(AudioSource):
+    """Reproduce fragmentos de una señal en memoria, a tiempo real o en modo libre.
+
+    ``samples`` es un vector o, para varios canales, una matriz (canales, muestras).
+    """
+
+    def __init__(self, samples, callback=None, rate=44100, chunk_size=4096, free_run=False, loop=False):
+        channels = samples.shape[0] if getattr(samples, 'ndim', 1) == 2 else 1
+        super().__init__(callback, rate, chunk_size, channels=channels)
+        self.samples = samples
+        self.free_run = free_run
+        self.loop = loop
+
+    def _chunks(self):
+        """Genera los fragmentos de la señal (el último, incompleto, se descarta)"""
+        n_chunks = self.samples.shape[-1] // self.chunk_size
+        while True:
+            for i in range(n_chunks):
+                yield self.samples[..., i * self.chunk_size:(i + 1) * self.chunk_size]
+            if not self.loop or not n_chunks:
+                return
+
+    def _deliver(self):
+        period = self.chunk_size / self.rate
+        next_time = time.perf_counter()
+        for chunk in self._chunks():
+            if not self.is_running:
+                return
+            if not self.free_run:
+                # Ritmo de tiempo real: cada fragmento está disponible cuando "termina de sonar"
+                next_time += period
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            self.callback(chunk, time.perf_counter())
+            self.delivered += 1
+
+
+class FileSource(ArraySource):
+    """Reproduce un archivo WAV/FLAC o PCM crudo como si fuera un micrófono.
+
+    El archivo se lee fragmento a fragmento, sin cargarlo entero en memoria.
+    """
+
+    def __init__(self, path, callback=None, chunk_size=4096, free_run=False, loop=False,
+                 raw_rate=44100, raw_format='int16'):
+        self.reader = AudioFileReader(path, raw_rate=raw_rate, raw_format=raw_format)
+        super().__init__(None, callback, self.reader.rate, chunk_size, free_run=free_run, loop=loop)
+        self.path = path
+
+    def _chunks(self):
+        chunk = np.empty(self.chunk_size, dtype=np.float32)
+        n_chunks = self.reader.length // self.chunk_size
+        while True:
+            for i in range(n_chunks):
+                yield self.reader.read(i * self.chunk_size, self.chunk_size, out=chunk)
+            if not self.loop or not n_chunks:
+                return
+
+
+class SyntheticSource(ArraySource):
+    """Progresión de acordes sintéticos, útil para pruebas de carga deterministas.
+
+    ``chords`` es una lista de (raíz 0-11, intervalos); cada acorde suena
+    ``chord_duration`` segundos y la progresión se repite indefinidamente
+    salvo que se indique ``loop=False``. Con ``channels`` > 1 cada canal
+    empieza la progresión un acorde más adelante que el anterior.
+    """
+
+    DEFAULT_PROGRESSION = [(0, [0, 4, 7]), (9, [0, 3, 7]), (5, [0, 4, 7]), (7, [0, 4, 7, 10])]
+
+    def __init__(self, callback=None, rate=44100, chunk_size=4096, chords=None, chord_duration=1.0,
+                 free_run=False, loop=True, harmonics=4, detune_cents=0.0, noise=0.0, seed=0, channels=1):
+        from synthesis import chord_midi_notes, synthesize_chord
+        rng = np.random.default_rng(seed)
+        # Cada acorde ocupa un número entero de fragmentos
+        n_samples = max(1, int(round(chord_duration * rate / chunk_size))) * chunk_size
+        segments = [
+            synthesize_chord(chord_midi_notes(root, intervals), n_samples, rate, harmonics=harmonics,
+                             detune_cents=detune_cents, noise=noise, rng=rng)
+            for root, intervals in (chords or self.DEFAULT_PROGRESSION)
+        ]
+        samples = np.concatenate(segments)
+        if channels > 1:
+            samples = np.stack([np.roll(samples, -channel * n_samples) for channel in range(channels)])
+        super().__init__(samples, callback, rate, chunk_size, free_run=free_run, loop=loop)
+
+
+class StdinSource(AudioSource):
+    """Lee PCM crudo de la entrada estándar (por ejemplo, ``arecord ... | python main.py``).
+
+    El ritmo lo marca quien escribe en la tubería; la fuente termina al llegar
+    al final de la entrada. Una entrada de varios canales se mezcla a mono
+    salvo con ``mix=False``, que entrega la matriz (canales, muestras).
+    """
+
+    def __init__(self, callback=None, rate=44100, chunk_size=4096, sample_format='int16', channels=1,
+                 stream=None, free_run=False, mix=True):
+        super().__init__(callback, rate, chunk_size, channels=1 if mix else channels)
+        if sample_format not in RAW_FORMATS:
+            raise ValueError(f"Formato PCM no soportado: {sample_format}")
+        self.dtype, self.scale = RAW_FORMATS[sample_format]
+        self.input_channels = channels
+        self.stream = stream or sys.stdin.buffer
+        self.free_run = free_run
+        self._chunk = np.zeros(chunk_size if self.channels == 1 else (self.channels, chunk_size), dtype=np.float32)
+
+    def _deliver(self):
+        frame_bytes = np.dtype(self.dtype).itemsize * self.input_channels
+        chunk_bytes = self.chunk_size * frame_bytes
+        while self.is_running:
+            raw = self.stream.read(chunk_bytes)
+            if len(raw) < chunk_bytes:
+                return
+            data = np.frombuffer(raw, dtype=self.dtype).reshape(-1, self.input_channels)
+            # Escala a [-1, 1] en el fragmento reutilizado (mezclando a mono si corresponde)
+            if self.channels == 1:
+                np.mean(data, axis=1, dtype=np.float32, out=self._chunk)
+            else:
+                self._chunk[:] = data.T
+            if self.scale != 1.0:
+                self._chunk /= np.float32(self.scale)
+            self.callback(self._chunk, time.perf_counter())
+            self.delivered += 1
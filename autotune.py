@@ -0,0 +1,471 @@
+"""Ajuste automático de los parámetros del análisis con grabaciones etiquetadas o audio sintético.
+
+El espectro de cada ventana solo depende del audio, la ventana y el salto,
+así que se calcula una vez por grabación y de él se guardan sus máximos
+locales por encima de la menor sensibilidad del barrido y su máximo. Cada
+combinación de sensibilidad, umbral de confianza, tolerancia de frecuencia y
+distancia entre picos rehace solo las etapas que dependen de ella: el umbral
+de los picos (un filtro sobre los máximos guardados), la selección por
+distancia, la conversión a notas y la clasificación de acordes con
+persistencia. Las combinaciones se reparten en un pool de procesos.
+
+La precisión es la fracción de ventanas con acorde de referencia en las que
+el acorde mostrado (tras la persistencia, como en ``main.py --file``)
+coincide con él. El coste es el tiempo por fragmento de ``analyze`` más
+``classify_notes`` sobre una muestra de ventanas, medido en serie. Se
+muestra el frente de Pareto de precisión frente a coste y la configuración
+elegida (la más precisa, o la más precisa dentro de ``--max-cost``) se
+guarda en un JSON que se carga con ``main.py --config``.
+
+Cada grabación (WAV o PCM crudo) necesita sus etiquetas en un ``.lab`` con
+el mismo nombre: líneas ``inicio fin acorde`` con los acordes en el formato
+de ChordDetector (``A minor7``), como las que exporta ``timeline.py --export
+lab``; ``N`` marca los tramos sin acorde. Uso:
+
+    python autotune.py ensayo.wav [otra.wav ...] [--synthetic 120] [--search random --samples 80]
+        [--jobs 0] [--max-cost 300] [-o autotune.json]
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+from chord_detector import ChordDetector, load_vocabulary
+from file_analysis import AudioFileReader, count_windows, frame_signal, RAW_FORMATS
+from frequency_analyzer import FrequencyAnalyzer
+from synthesis import chord_progression
+
+# Valores de cada parámetro en el barrido por defecto
+DEFAULT_GRID = {
+    'sensitivity': [0.05, 0.1, 0.15, 0.2],
+    'threshold': [0.4, 0.5, 0.6, 0.7],
+    'freq_tolerance': [6.0, 10.0, 14.0],
+    'peak_distance': [8, 15, 24],
+}
+
+# Etiquetas de .lab que marcan un tramo sin acorde
+NO_CHORD_LABELS = ('N', 'N/A', 'X')
+
+
+def read_lab(path):
+    """Segmentos (inicio, fin, acorde o None) de un archivo .lab"""
+    segments = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fields = line.split(maxsplit=2)
+            if not fields:
+                continue
+            if len(fields) < 3:
+                raise ValueError(f"Línea no válida en {path}: {line.strip()}")
+            label = fields[2].strip()
+            segments.append((float(fields[0]), float(fields[1]), None if label in NO_CHORD_LABELS else label))
+    return segments
+
+
+def window_labels(segments, n_windows, window, hop, rate):
+    """Acorde de referencia (o None) en el centro de cada ventana"""
+    labels = [None] * n_windows
+    if not segments:
+        return labels
+    starts = np.array([start for start, _, _ in segments])
+    centers = (np.arange(n_windows) * hop + window / 2) / rate
+    indices = np.searchsorted(starts, centers, side='right') - 1
+    for i, (center, index) in enumerate(zip(centers, indices)):
+        if index >= 0 and center < segments[index][1]:
+            labels[i] = segments[index][2]
+    return labels
+
+
+class TuningSet:
+    """Lo que no depende de los parámetros ajustados, extraído una sola vez de todas las grabaciones.
+
+    De cada ventana con señal se guardan los máximos locales de su espectro
+    por encima de ``min_sensitivity`` veces su máximo (como filas, bins,
+    alturas y, con interpolación, desplazamientos entre bins) y el propio
+    máximo, del que sale el umbral de cualquier sensibilidad mayor. Las
+    grabaciones se concatenan; ``ranges`` guarda el rango de ventanas de cada
+    una. También se guarda una muestra de ``cost_frames`` ventanas con señal
+    para medir el coste por fragmento.
+    """
+
+    def __init__(self, rate, window, hop, min_sensitivity, fft_size=None, interpolate=False, vocabulary=None,
+                 cost_frames=256, seed=0):
+        self.rate = rate
+        self.window = window
+        self.hop = hop
+        self.fft_size = fft_size
+        self.interpolate = interpolate
+        self.vocabulary = vocabulary
+        self.analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=min_sensitivity, fft_size=fft_size,
+                                          interpolate=interpolate)
+        self.n_fft = max(window, fft_size or 0)
+        self.n_frames = 0
+        self.names = []
+        self.ranges = []
+        self.labels = []
+        self.cost_sample = []
+        self._cost_frames = cost_frames
+        self._seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._blocks = []
+
+    def add_recording(self, name, read, n_samples, segments, block_frames=256):
+        """Extrae las características de una grabación.
+
+        ``read(inicio, muestras)`` devuelve un tramo de la señal mono float32
+        (por ejemplo, ``AudioFileReader.read``) y ``segments`` son sus acordes
+        de referencia como (inicio, fin, acorde o None) en segundos.
+        """
+        n_windows = count_windows(n_samples, self.window, self.hop)
+        for first in range(0, n_windows, block_frames):
+            count = min(block_frames, n_windows - first)
+            frames = frame_signal(read(first * self.hop, (count - 1) * self.hop + self.window), self.window, self.hop)
+            active, magnitudes, _ = self.analyzer.frame_spectra(frames)
+            if len(active):
+                self._blocks.append((active + self.n_frames + first, magnitudes.max(axis=1),
+                                     self.analyzer.spectral_peaks(magnitudes)))
+                self._sample_frames(frames[active])
+        self.names.append(name)
+        self.ranges.append((self.n_frames, self.n_frames + n_windows))
+        self.labels += window_labels(segments, n_windows, self.window, self.hop, self.rate)
+        self.n_frames += n_windows
+
+    def _sample_frames(self, frames):
+        # Muestreo de reserva: cada ventana con señal tiene la misma probabilidad de quedarse
+        for frame in frames:
+            self._seen += 1
+            if len(self.cost_sample) < self._cost_frames:
+                self.cost_sample.append(np.array(frame))
+            else:
+                slot = self._rng.integers(self._seen)
+                if slot < self._cost_frames:
+                    self.cost_sample[slot] = np.array(frame)
+
+    def finish(self):
+        """Une los bloques extraídos; después de llamarlo ya no se pueden añadir grabaciones"""
+        self.n_labeled = sum(label is not None for label in self.labels)
+        if not self.n_labeled:
+            raise ValueError("Ninguna ventana tiene un acorde de referencia")
+        blocks = self._blocks
+        self.active = np.concatenate([active for active, _, _ in blocks]) if blocks else np.zeros(0, dtype=np.intp)
+        self.row_max = (np.concatenate([row_max for _, row_max, _ in blocks]) if blocks else
+                        np.zeros(0, dtype=np.float32))
+        rows, bins, heights, offsets = [], [], [], []
+        first_row = 0
+        for active, _, (block_rows, block_bins, block_heights, block_offsets) in blocks:
+            rows.append(block_rows + first_row)
+            bins.append(block_bins)
+            heights.append(block_heights)
+            offsets.append(block_offsets)
+            first_row += len(active)
+        self.peaks = (np.concatenate(rows or [np.zeros(0, dtype=np.intp)]),
+                      np.concatenate(bins or [np.zeros(0, dtype=np.intp)]),
+                      np.concatenate(heights or [np.zeros(0, dtype=np.float32)]),
+                      np.concatenate(offsets) if self.interpolate and offsets else None)
+        self._blocks = []
+        return self
+
+    def make_analyzer(self, sensitivity, freq_tolerance, peak_distance):
+        return FrequencyAnalyzer(sampling_rate=self.rate, sensitivity=sensitivity, freq_tolerance=freq_tolerance,
+                                 peak_distance=peak_distance, fft_size=self.fft_size, interpolate=self.interpolate)
+
+    def frame_notes(self, sensitivity, freq_tolerance, peak_distance):
+        """Notas de cada ventana con unos parámetros del analizador, idénticas a las de ``analyze_frames``"""
+        rows, bins, heights, offsets = self.peaks
+        # Mismo umbral que spectral_peaks con esta sensibilidad (mayor o igual que la de la extracción)
+        keep = heights >= self.row_max[rows] * sensitivity
+        peaks = rows[keep], bins[keep], heights[keep], None if offsets is None else offsets[keep]
+        analyzer = self.make_analyzer(sensitivity, freq_tolerance, peak_distance)
+        active_notes, _ = analyzer.peak_notes(len(self.active), peaks, self.n_fft)
+        notes = [[] for _ in range(self.n_frames)]
+        for frame, frame_notes in zip(self.active, active_notes):
+            notes[frame] = frame_notes
+        return notes
+
+    def accuracy(self, notes, threshold):
+        """Fracción de ventanas etiquetadas en las que el acorde mostrado es el de referencia"""
+        correct = 0
+        for start, stop in self.ranges:
+            # Un detector por grabación: la persistencia no pasa de una a otra
+            detector = ChordDetector(confidence_threshold=threshold, vocabulary=self.vocabulary)
+            chord = "N/A"
+            for frame_notes, label in zip(notes[start:stop], self.labels[start:stop]):
+                # Igual que iter_timeline: sin notas se conserva el acorde actual
+                if frame_notes:
+                    chord = detector.detect_chord(frame_notes)
+                correct += chord == label
+        return correct / self.n_labeled
+
+    def measure_cost(self, sensitivity, freq_tolerance, peak_distance, repeats=3):
+        """Segundos por fragmento de ``analyze`` y ``classify_notes`` sobre la muestra (el mejor de ``repeats``)"""
+        analyzer = self.make_analyzer(sensitivity, freq_tolerance, peak_distance)
+        detector = ChordDetector(vocabulary=self.vocabulary)
+        frames = self.cost_sample
+        if not frames:
+            return 0.0
+        # Calentamiento: espacios de trabajo y tablas fuera de la medición
+        for frame in frames[:8]:
+            detector.classify_notes(analyzer.analyze(frame))
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for frame in frames:
+                detector.classify_notes(analyzer.analyze(frame))
+            best = min(best, time.perf_counter() - start)
+        return best / len(frames)
+
+
+# Características compartidas por los procesos del pool (se rellenan en _init_worker)
+_worker_set = None
+
+
+def _init_worker(tuning_set):
+    global _worker_set
+    _worker_set = tuning_set
+
+
+def _evaluate(task):
+    """Precisión de una combinación de parámetros del analizador con cada umbral de confianza"""
+    sensitivity, freq_tolerance, peak_distance, thresholds = task
+    notes = _worker_set.frame_notes(sensitivity, freq_tolerance, peak_distance)
+    return [
+        {'sensitivity': sensitivity, 'threshold': threshold, 'freq_tolerance': freq_tolerance,
+         'peak_distance': peak_distance, 'accuracy': _worker_set.accuracy(notes, threshold)}
+        for threshold in thresholds
+    ]
+
+
+def grid_combinations(grid):
+    """Todas las combinaciones de los valores de cada parámetro"""
+    names = list(DEFAULT_GRID)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_combinations(grid, samples, seed=0):
+    """``samples`` combinaciones al azar entre el menor y el mayor valor de cada parámetro"""
+    rng = np.random.default_rng(seed)
+    combinations = []
+    for _ in range(samples):
+        combination = {}
+        for name in DEFAULT_GRID:
+            low, high = min(grid[name]), max(grid[name])
+            if name == 'peak_distance':
+                combination[name] = int(rng.integers(low, high + 1))
+            else:
+                combination[name] = round(float(rng.uniform(low, high)), 3)
+        combinations.append(combination)
+    return combinations
+
+
+def sweep(tuning_set, combinations, workers=1, progress=None):
+    """Evalúa las combinaciones agrupadas por parámetros del analizador, en ``workers`` procesos.
+
+    Las notas de cada grupo se calculan una vez para todos sus umbrales de
+    confianza. Devuelve un resultado (parámetros y precisión) por combinación.
+    ``progress(grupos_completados, grupos_totales)`` se llama tras cada grupo.
+    """
+    groups = {}
+    for combination in combinations:
+        key = (float(combination['sensitivity']), float(combination['freq_tolerance']),
+               int(combination['peak_distance']))
+        groups.setdefault(key, []).append(float(combination['threshold']))
+    tasks = [key + (sorted(set(thresholds)),) for key, thresholds in groups.items()]
+
+    if workers == 1:
+        _init_worker(tuning_set)
+        results = map(_evaluate, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(tuning_set,))
+        results = pool.imap_unordered(_evaluate, tasks)
+    try:
+        evaluated = []
+        for done, group in enumerate(results, 1):
+            evaluated += group
+            if progress is not None:
+                progress(done, len(tasks))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return evaluated
+
+
+def add_costs(tuning_set, results):
+    """Añade a cada resultado el coste por fragmento en µs, medido en serie una vez por analizador.
+
+    El umbral de confianza no cambia el coste (la clasificación es un acceso
+    a la tabla de acordes), así que todos los umbrales comparten la medida.
+    """
+    costs = {}
+    for result in results:
+        key = (result['sensitivity'], result['freq_tolerance'], result['peak_distance'])
+        if key not in costs:
+            costs[key] = tuning_set.measure_cost(*key) * 1e6
+        result['cost_us'] = costs[key]
+    return results
+
+
+def pareto_front(results):
+    """Resultados que ningún otro supera a la vez en precisión y coste, de menor a mayor coste"""
+    front = []
+    for result in sorted(results, key=lambda r: (r['cost_us'], -r['accuracy'])):
+        if not front or result['accuracy'] > front[-1]['accuracy']:
+            front.append(result)
+    return front
+
+
+def choose(front, max_cost=None):
+    """El resultado más preciso del frente dentro de ``max_cost`` µs (o el más barato si ninguno cabe)"""
+    affordable = [result for result in front if max_cost is None or result['cost_us'] <= max_cost]
+    return affordable[-1] if affordable else front[0]
+
+
+def write_config(path, result, tuning_set, vocabulary_path=None):
+    """Guarda los parámetros elegidos con los nombres de las opciones de main.py (para ``--config``)"""
+    config = {
+        'sensitivity': result['sensitivity'],
+        'threshold': result['threshold'],
+        'freq_tolerance': result['freq_tolerance'],
+        'peak_distance': result['peak_distance'],
+        'rate': tuning_set.rate,
+        'window': tuning_set.window,
+        'hop': tuning_set.hop,
+    }
+    if tuning_set.fft_size:
+        config['fft_size'] = tuning_set.fft_size
+    if tuning_set.interpolate:
+        config['interpolate'] = True
+    if vocabulary_path:
+        config['vocabulary'] = vocabulary_path
+    # Informativo: main.py ignora las claves que empiezan por '_'
+    config['_autotune'] = {
+        'accuracy': round(result['accuracy'], 4),
+        'cost_us': round(result['cost_us'], 1),
+        'labeled_windows': tuning_set.n_labeled,
+        'recordings': tuning_set.names,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def load_tuning_set(args, vocabulary):
+    """Extrae las características de las grabaciones y del audio sintético indicados"""
+    readers = [AudioFileReader(path, raw_rate=args.rate, raw_format=args.raw_format) for path in args.recordings]
+    rates = {reader.rate for reader in readers}
+    if len(rates) > 1:
+        raise ValueError("Todas las grabaciones deben tener la misma frecuencia de muestreo")
+    rate = rates.pop() if rates else args.rate
+    min_sensitivity = min(args.sensitivity)
+    tuning_set = TuningSet(rate, args.window, args.hop, min_sensitivity, fft_size=args.fft_size,
+                           interpolate=args.interpolate, vocabulary=vocabulary, cost_frames=args.cost_frames,
+                           seed=args.seed)
+    for path, reader in zip(args.recordings, readers):
+        lab_path = os.path.splitext(path)[0] + '.lab'
+        if not os.path.exists(lab_path):
+            raise ValueError(f"Falta el archivo de etiquetas {lab_path}")
+        tuning_set.add_recording(path, reader.read, reader.length, read_lab(lab_path))
+    if args.synthetic:
+        patterns = vocabulary['patterns'] if vocabulary is not None else ChordDetector.CHORD_PATTERNS
+        signal, segments = chord_progression(patterns, args.synthetic, rate, detune_cents=args.detune,
+                                             noise=args.noise, seed=args.seed)
+        tuning_set.add_recording(f"sintético ({args.synthetic:g} s)",
+                                 lambda start, count: signal[start:start + count], len(signal), segments)
+    return tuning_set.finish()
+
+
+def format_result(result):
+    return (f"{result['cost_us']:9.1f} {result['accuracy']:9.1%} {result['sensitivity']:12g} "
+            f"{result['threshold']:7g} {result['freq_tolerance']:11g} {result['peak_distance']:9d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajuste automático de los parámetros del análisis")
+    parser.add_argument("recordings", nargs='*',
+                        help="Grabaciones (WAV o PCM crudo), cada una con sus etiquetas en un .lab con el mismo nombre")
+    parser.add_argument("--synthetic", type=float, metavar="SECONDS",
+                        help="Añadir una progresión sintética al azar de esta duración, con sus etiquetas")
+    parser.add_argument("--detune", type=float, default=10.0, help="Desafinación máxima del audio sintético (cents)")
+    parser.add_argument("--noise", type=float, default=0.2, help="Ruido del audio sintético, relativo a la señal")
+    parser.add_argument("-r", "--rate", type=int, default=44100,
+                        help="Frecuencia de PCM crudo y del audio sintético (por defecto: 44100)")
+    parser.add_argument("--raw-format", choices=sorted(RAW_FORMATS), default="int16")
+    parser.add_argument("--window", type=int, default=4096, help="Ventana de análisis (por defecto: 4096)")
+    parser.add_argument("--hop", type=int, help="Salto entre ventanas (por defecto: la ventana)")
+    parser.add_argument("--fft-size", type=int, metavar="N", help="Rellenar con ceros cada ventana hasta N muestras")
+    parser.add_argument("--interpolate", action="store_true", help="Interpolación parabólica de los picos")
+    parser.add_argument("--vocabulary", metavar="FILE", help="Vocabulario de acordes en JSON")
+    for name, values in DEFAULT_GRID.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(values[0]), nargs='+', default=values,
+                            help=f"Valores del barrido (por defecto: {' '.join(map(str, values))})")
+    parser.add_argument("--search", choices=['grid', 'random'], default='grid',
+                        help="'grid' prueba todas las combinaciones; 'random' toma --samples al azar entre el "
+                             "menor y el mayor valor de cada parámetro (por defecto: grid)")
+    parser.add_argument("--samples", type=int, default=60, help="Combinaciones de la búsqueda al azar")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Procesos del barrido; 0 usa todas las CPU")
+    parser.add_argument("--cost-frames", type=int, default=256,
+                        help="Ventanas con las que se mide el coste por fragmento (por defecto: 256)")
+    parser.add_argument("--max-cost", type=float, metavar="US",
+                        help="Elegir la combinación más precisa que no supere este coste por fragmento en µs")
+    parser.add_argument("-o", "--output", default="autotune.json",
+                        help="Archivo de configuración para main.py --config (por defecto: autotune.json)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.recordings and not args.synthetic:
+        parser.error("Indique al menos una grabación etiquetada o --synthetic")
+    args.hop = args.hop or args.window
+    if args.window <= 0 or args.hop <= 0 or args.cost_frames <= 0 or args.samples <= 0 or args.jobs < 0:
+        parser.error("--window, --hop, --cost-frames y --samples deben ser positivos")
+    if not all(0 < s <= 1 for s in args.sensitivity) or not all(0.3 <= t <= 1 for t in args.threshold):
+        parser.error("La sensibilidad debe estar en (0, 1] y el umbral de confianza en [0.3, 1], como en main.py")
+    if min(args.freq_tolerance) <= 0 or min(args.peak_distance) < 1:
+        parser.error("--freq-tolerance debe ser positiva y --peak-distance al menos 1")
+
+    try:
+        vocabulary = load_vocabulary(args.vocabulary) if args.vocabulary else None
+        start = time.perf_counter()
+        tuning_set = load_tuning_set(args, vocabulary)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    n_peaks = len(tuning_set.peaks[0])
+    print(f"{len(tuning_set.names)} grabación(es), {tuning_set.n_frames} ventanas ({tuning_set.n_labeled} "
+          f"etiquetadas), {n_peaks} picos candidatos extraídos en {time.perf_counter() - start:.1f} s")
+
+    grid = {name: getattr(args, name) for name in DEFAULT_GRID}
+    if args.search == 'grid':
+        combinations = grid_combinations(grid)
+    else:
+        combinations = random_combinations(grid, args.samples, args.seed)
+
+    def progress(done, total):
+        print(f"\rBarrido: {done}/{total} analizadores", end='', file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    results = sweep(tuning_set, combinations, workers=args.jobs or os.cpu_count() or 1,
+                    progress=progress if sys.stderr.isatty() else None)
+    sweep_time = time.perf_counter() - start
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    start = time.perf_counter()
+    add_costs(tuning_set, results)
+    print(f"{len(results)} combinaciones evaluadas en {sweep_time:.1f} s; coste medido en "
+          f"{time.perf_counter() - start:.1f} s sobre {len(tuning_set.cost_sample)} ventanas")
+
+    front = pareto_front(results)
+    chosen = choose(front, args.max_cost)
+    header = f"{'µs/frag.':>9} {'precisión':>9} {'sensibilidad':>12} {'umbral':>7} {'tolerancia':>11} {'distancia':>9}"
+    print(f"\nFrente de Pareto (precisión frente a coste por fragmento):\n{header}")
+    for result in front:
+        print(format_result(result) + ("  <- elegida" if result is chosen else ""))
+    write_config(args.output, chosen, tuning_set, args.vocabulary)
+    print(f"\nConfiguración guardada en {args.output} (python main.py --config {args.output})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Comprobación de asignaciones de memoria por fragmento en FrequencyAnalyzer.analyze.
+
+Usa tracemalloc para medir, tras un calentamiento, cuánta memoria reserva cada
+llamada a analyze. Falla (código de salida 1) si el pico por fragmento supera
+el presupuesto o si la memoria retenida crece con el número de fragmentos.
+
+El pico por fragmento no es cero: con el motor 'scipy' (el predeterminado)
+scipy.fft.rfft no admite buffer de salida y reserva en cada llamada el
+espectro de n/2+1 complex64 (unos 16 KB de los ~25 KB por fragmento con 4096
+muestras). Con ``--fft-backend numpy`` la salida va al buffer preasignado,
+pero pocketfft reserva unos 64 KB temporales por llamada y el presupuesto
+por defecto no alcanza. Lo que se comprueba es que esa reserva no crezca ni
+se acumule.
+
+Uso:
+    python benchmarks/bench_allocations.py [--chunk 4096] [--frames 500]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frequency_analyzer import FrequencyAnalyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asignaciones de memoria por fragmento")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--fft-backend", choices=("scipy", "numpy"), default="scipy")
+    parser.add_argument("--budget", type=float, default=8.0,
+                        help="Pico máximo por fragmento, en bytes por muestra (por defecto: 8)")
+    args = parser.parse_args()
+
+    # Acorde de tres notas con algo de ruido, como una señal real
+    rng = np.random.default_rng(0)
+    t = np.arange(args.chunk) / args.rate
+    frames = [
+        (sum(np.sin(2 * np.pi * f * t) for f in (261.63, 329.63, 392.0))
+         + rng.normal(0, 0.05, args.chunk)).astype(np.float32)
+        for _ in range(8)
+    ]
+
+    analyzer = FrequencyAnalyzer(sampling_rate=args.rate, fft_backend=args.fft_backend)
+    tracemalloc.start()
+    # Calentamiento: crea el espacio de trabajo, la tabla de notas y llena las
+    # cachés internas de numpy antes de empezar a medir
+    for i in range(args.warmup):
+        analyzer.analyze(frames[i % len(frames)])
+    half = args.frames // 2
+    # Preasignado para que las mediciones no cuenten memoria del propio benchmark
+    peaks = np.zeros(args.frames, dtype=np.int64)
+    start_memory = tracemalloc.get_traced_memory()[0]
+    for i in range(args.frames):
+        if i == half:
+            # Se mide también el crecimiento en la segunda mitad, que debe ser nulo
+            half_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        analyzer.analyze(frames[i % len(frames)])
+        peaks[i] = tracemalloc.get_traced_memory()[1] - before
+    end_memory = tracemalloc.get_traced_memory()[0]
+    retained = end_memory - start_memory
+    growth = end_memory - half_memory
+    tracemalloc.stop()
+
+    budget = args.budget * args.chunk
+    print(f"Fragmentos:              {args.frames} (chunk={args.chunk}, fft={args.fft_backend})")
+    print(f"Pico por fragmento:      mediana {np.median(peaks):.0f} B, máximo {peaks.max()} B")
+    print(f"Presupuesto:             {budget:.0f} B")
+    print(f"Memoria retenida:        {retained} B (crecimiento en la 2ª mitad: {growth} B)")
+
+    failed = False
+    if peaks.max() > budget:
+        print("ERROR: el pico de memoria por fragmento supera el presupuesto")
+        failed = True
+    if peaks[half:].max() > peaks[:half].max() * 1.1:
+        print("ERROR: las asignaciones por fragmento crecen con el tiempo")
+        failed = True
+    if retained > budget or growth > 1024:
+        print("ERROR: la memoria retenida crece con el número de fragmentos")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
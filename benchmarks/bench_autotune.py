@@ -0,0 +1,97 @@
+"""Barrido de parámetros de autotune.py frente a repetir el análisis completo en cada combinación.
+
+Sobre una progresión sintética etiquetada (``synthesis.chord_progression``)
+mide:
+
+- la extracción única de TuningSet (FFT y máximos locales de cada ventana);
+- el barrido por defecto de autotune.py, que por cada combinación solo
+  filtra los picos guardados, los selecciona, los convierte en notas y
+  clasifica los acordes, en un proceso y en ``--jobs`` procesos;
+- el coste por combinación de repetir todo con ``analyze_frames`` (FFT
+  incluida), como haría lanzar ``main.py --file`` con cada combinación,
+  sobre las primeras ``--reference`` combinaciones.
+
+Comprueba que las precisiones de ambos caminos coinciden; termina con
+código 1 si alguna difiere.
+
+Uso:
+    python benchmarks/bench_autotune.py [--seconds 120] [--window 4096] [--hop 2048] [--jobs 2] [--reference 12]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autotune import DEFAULT_GRID, TuningSet, grid_combinations, sweep
+from chord_detector import ChordDetector
+from file_analysis import frame_signal
+from synthesis import chord_progression
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del barrido de parámetros")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Duración de la progresión sintética")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--window", type=int, default=4096)
+    parser.add_argument("--hop", type=int, default=2048)
+    parser.add_argument("--noise", type=float, default=0.2)
+    parser.add_argument("--jobs", type=int, default=2, help="Procesos del barrido en paralelo")
+    parser.add_argument("--reference", type=int, default=12,
+                        help="Combinaciones que se repiten con el análisis completo")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    signal, segments = chord_progression(ChordDetector.CHORD_PATTERNS, args.seconds, args.rate,
+                                         detune_cents=10, noise=args.noise, seed=args.seed)
+    combinations = grid_combinations(DEFAULT_GRID)
+
+    start = time.perf_counter()
+    tuning_set = TuningSet(args.rate, args.window, args.hop, min(DEFAULT_GRID['sensitivity']))
+    tuning_set.add_recording('sintético', lambda first, count: signal[first:first + count], len(signal), segments)
+    tuning_set.finish()
+    extraction = time.perf_counter() - start
+    print(f"{args.seconds:g} s de audio, {tuning_set.n_frames} ventanas de {args.window} (salto {args.hop}), "
+          f"{len(combinations)} combinaciones")
+    print(f"Extracción única: {extraction:.2f} s ({len(tuning_set.peaks[0])} picos candidatos)")
+
+    timings = {}
+    results = None
+    for workers in sorted({1, max(1, args.jobs)}):
+        start = time.perf_counter()
+        results = sweep(tuning_set, combinations, workers=workers)
+        timings[workers] = time.perf_counter() - start
+        print(f"Barrido con {workers} proceso(s): {timings[workers]:.2f} s "
+              f"({timings[workers] / len(combinations) * 1e3:.1f} ms por combinación)")
+    accuracy = {(r['sensitivity'], r['threshold'], r['freq_tolerance'], r['peak_distance']): r['accuracy']
+                for r in results}
+
+    # Análisis completo (FFT incluida) de cada combinación
+    frames = frame_signal(signal, args.window, args.hop)
+    reference = combinations[:args.reference]
+    mismatches = 0
+    start = time.perf_counter()
+    for combination in reference:
+        analyzer = tuning_set.make_analyzer(combination['sensitivity'], combination['freq_tolerance'],
+                                            combination['peak_distance'])
+        notes = analyzer.analyze_frames(frames)
+        result = tuning_set.accuracy(notes, combination['threshold'])
+        key = tuple(combination[name] for name in DEFAULT_GRID)
+        mismatches += result != accuracy[key]
+    full = (time.perf_counter() - start) / len(reference)
+    reused = timings[1] / len(combinations)
+    print(f"Análisis completo por combinación: {full * 1e3:.1f} ms ({full / reused:.1f}x el barrido en un proceso)")
+    print(f"Tiempo total estimado sin reutilizar: {full * len(combinations):.1f} s frente a "
+          f"{extraction + min(timings.values()):.1f} s")
+    print(f"Discrepancias de precisión en {len(reference)} combinaciones: {mismatches}")
+    best = max(results, key=lambda r: r['accuracy'])
+    print(f"Mejor combinación: {best['accuracy']:.1%} (sensibilidad {best['sensitivity']:g}, umbral "
+          f"{best['threshold']:g}, tolerancia {best['freq_tolerance']:g}, distancia {best['peak_distance']})")
+    if mismatches:
+        print("ERROR: el barrido no coincide con el análisis completo")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
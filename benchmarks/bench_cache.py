@@ -0,0 +1,99 @@
+"""Reanálisis de una grabación con y sin la caché de notas por ventana.
+
+Escribe una progresión sintética como PCM crudo y la analiza con
+iter_timeline para varios umbrales de confianza: primero sin caché, después
+con una caché vacía (se calculan y guardan las notas) y por último con la
+caché ya llena, donde solo se repite la detección de acordes. Comprueba que
+las líneas de tiempo coinciden con las del análisis sin caché, repite la
+prueba con varios procesos escribiendo en la misma caché y verifica que la
+evicción LRU respeta el tamaño máximo. Termina con código 1 si algo no
+coincide.
+
+Uso:
+    python benchmarks/bench_cache.py [--minutes 5] [--thresholds 0.5 0.6 0.7] [--jobs 2]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_file_memory import write_recording
+from chord_detector import ChordDetector
+from feature_cache import FeatureCache
+from file_analysis import analyze_file
+from parallel_analysis import analyze_files
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la caché de notas por ventana")
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--thresholds", type=float, nargs='+', default=[0.5, 0.6, 0.7])
+    parser.add_argument("--jobs", type=int, default=2, help="Procesos para la prueba en paralelo")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chord_cache_")
+    failed = False
+    try:
+        path = os.path.join(workdir, "grabacion.raw")
+        write_recording(path, args.minutes, args.rate)
+        cache_dir = os.path.join(workdir, "cache")
+        options = dict(chunk_size=args.chunk, raw_rate=args.rate)
+
+        # Espacio de trabajo, tabla de notas e importaciones fuera de la medición
+        analyze_file(path, **options)
+        print(f"{args.minutes:g} min de audio, ventana {args.chunk}")
+        print(f"{'umbral':>6} {'sin caché (s)':>14} {'caché vacía (s)':>16} {'caché llena (s)':>16} {'iguales':>8}")
+        for threshold in args.thresholds:
+            # La tabla de acordes de cada umbral se construye fuera de la medición
+            ChordDetector(confidence_threshold=threshold).classify_notes(['C4', 'E4', 'G4'])
+            expected, plain = timed(analyze_file, path, confidence_threshold=threshold, **options)
+            # Caché nueva en cada umbral para medir también el coste de guardar
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cold_result, cold = timed(analyze_file, path, confidence_threshold=threshold,
+                                      cache=FeatureCache(cache_dir), **options)
+            warm_result, warm = timed(analyze_file, path, confidence_threshold=threshold,
+                                      cache=FeatureCache(cache_dir), **options)
+            same = expected == cold_result == warm_result
+            failed |= not same
+            print(f"{threshold:6.2f} {plain:14.2f} {cold:16.2f} {warm:16.2f} {'sí' if same else 'NO':>8}")
+        cache = FeatureCache(cache_dir)
+        print(f"Entrada en disco: {cache.size() / 1024:.1f} KB")
+
+        # Varios procesos leyendo y escribiendo tramos en la misma caché
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        expected = analyze_files([path], workers=args.jobs, segment_frames=256, **options)
+        for label in ("vacía", "llena"):
+            result, elapsed = timed(analyze_files, [path], workers=args.jobs, segment_frames=256,
+                                    cache_dir=cache_dir, **options)
+            same = result == expected
+            failed |= not same
+            print(f"{args.jobs} procesos, caché {label}: {elapsed:.2f} s, {'iguales' if same else 'DISTINTOS'}")
+
+        # LRU: con un límite de ~3 tramos solo quedan los usados más recientemente
+        entries = sorted(FeatureCache(cache_dir).entries())
+        limit = sum(size for _, size, _ in entries[-3:])
+        small = FeatureCache(cache_dir, max_bytes=limit)
+        small.evict()
+        kept = {entry_path for _, _, entry_path in small.entries()}
+        ok = small.size() <= limit and kept == {entry_path for _, _, entry_path in entries[-3:]}
+        failed |= not ok
+        print(f"Evicción LRU: {len(entries)} -> {len(kept)} entradas, {'correcta' if ok else 'INCORRECTA'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Coste del análisis multicanal frente a analizar cada canal por separado.
+
+Para cada número de canales genera una progresión distinta por canal, la
+entrelaza como la entregaría PortAudio y la analiza de dos formas: con
+MultiChannelDetector (una FFT 2-D sobre la vista (canales, muestras)) y con
+un FrequencyAnalyzer/ChordDetector por canal. Comprueba que los acordes y las
+notas de cada canal coinciden en cada fragmento y muestra el tiempo por
+fragmento y cuánto crece respecto a un solo canal. Termina con código 1 si
+algún canal no coincide.
+
+Uso:
+    python benchmarks/bench_channels.py [--channels 1 2 4 8 16] [--seconds 4] [--repeat 5] [--mix]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chord_detector import ChordDetector
+from frequency_analyzer import FrequencyAnalyzer
+from multichannel import MultiChannelDetector
+from synthesis import chord_midi_notes, synthesize_chord
+
+
+def interleaved_input(n_channels, seconds, rate, seed):
+    """Una progresión aleatoria por canal, entrelazada como un flujo de PortAudio"""
+    rng = np.random.default_rng(seed)
+    channels = []
+    for _ in range(n_channels):
+        chords = [synthesize_chord(chord_midi_notes(int(rng.integers(12)), [[0, 4, 7], [0, 3, 7]][rng.integers(2)]),
+                                   rate // 2, rate, noise=0.05, rng=rng)
+                  for _ in range(seconds * 2)]
+        channels.append(np.concatenate(chords))
+    return np.ascontiguousarray(np.stack(channels, axis=1)).ravel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del análisis multicanal")
+    parser.add_argument("--channels", type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=int, default=4)
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones (se toma la más rápida)")
+    parser.add_argument("--mix", action="store_true", help="Analizar también la mezcla de los canales")
+    args = parser.parse_args()
+
+    print(f"{'Canales':>7} {'multicanal (ms)':>16} {'por separado (ms)':>18} {'x 1 canal':>10} {'iguales':>8}")
+    baseline = None
+    failed = False
+    for n_channels in args.channels:
+        interleaved = interleaved_input(n_channels, args.seconds, args.rate, seed=n_channels)
+        n_chunks = len(interleaved) // (n_channels * args.chunk)
+        # Vistas (canales, muestras) de cada fragmento, sin copias, como en AudioCapture
+        blocks = [interleaved[i * n_channels * args.chunk:(i + 1) * n_channels * args.chunk]
+                  .reshape(-1, n_channels).T for i in range(n_chunks)]
+
+        # Primera FFT y tabla de acordes (compartida entre detectores) fuera de la medición
+        FrequencyAnalyzer(sampling_rate=args.rate).analyze_frames(blocks[0])
+        ChordDetector().classify_notes(['C4', 'E4', 'G4'])
+        joint_time = separate_time = float('inf')
+        for _ in range(args.repeat):
+            multichannel = MultiChannelDetector(FrequencyAnalyzer(sampling_rate=args.rate), n_channels, mix=args.mix)
+            joint = []
+            start = time.perf_counter()
+            for block in blocks:
+                multichannel.process(block)
+                joint.append((multichannel.current_chords[:n_channels], multichannel.current_notes[:n_channels]))
+            joint_time = min(joint_time, (time.perf_counter() - start) / n_chunks)
+
+            analyzers = [FrequencyAnalyzer(sampling_rate=args.rate) for _ in range(n_channels)]
+            detectors = [ChordDetector() for _ in range(n_channels)]
+            chords = ["N/A"] * n_channels
+            separate = []
+            start = time.perf_counter()
+            for block in blocks:
+                notes = []
+                for channel in range(n_channels):
+                    # Cada canal por separado necesita su propia copia contigua
+                    channel_notes = analyzers[channel].analyze(np.ascontiguousarray(block[channel]))
+                    if channel_notes:
+                        chords[channel] = detectors[channel].detect_chord(channel_notes)
+                    notes.append(channel_notes)
+                separate.append((list(chords), notes))
+            separate_time = min(separate_time, (time.perf_counter() - start) / n_chunks)
+
+        same = joint == separate
+        failed |= not same
+        baseline = baseline or joint_time
+        print(f"{n_channels:7d} {joint_time * 1e3:16.3f} {separate_time * 1e3:18.3f} "
+              f"{joint_time / baseline:10.2f} {'sí' if same else 'NO':>8}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: puntuación por plantillas (matriz) frente al bucle raíz x patrón.
+
+Uso:
+    python benchmarks/bench_chord_scoring.py [--frames 5000]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chord_detector import ChordDetector
+
+
+def reference_best(detector, notes):
+    """Mejor candidato con el bucle original sobre cada raíz y cada patrón"""
+    unique_notes = sorted(set(notes), key=detector.NOTES.index)
+    candidates = []
+    for root_idx, root_note in enumerate(unique_notes):
+        reordered = unique_notes[root_idx:] + unique_notes[:root_idx]
+        intervals = detector._notes_to_intervals(reordered)
+        for chord_type, pattern in detector.CHORD_PATTERNS.items():
+            score = detector._calculate_match_score(intervals, pattern)
+            if score > 0.3:
+                if chord_type.startswith('sus') and score < detector.sus_threshold:
+                    continue
+                bonus = detector.CHORD_TYPE_PRIORITY.get(chord_type, 0) * 0.01
+                candidates.append((f"{root_note} {chord_type}", score + bonus))
+    candidates.sort(key=lambda x: x[1], reverse=True)
+    return candidates[0] if candidates else (None, 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de puntuación de acordes")
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    args = parser.parse_args()
+
+    detector = ChordDetector(confidence_threshold=args.threshold)
+    rng = np.random.default_rng(0)
+    chroma = np.zeros((args.frames, 12))
+    for row in chroma:
+        row[rng.choice(12, size=rng.integers(2, 6), replace=False)] = 1.0
+    note_lists = [[detector.NOTES[i] for i in np.flatnonzero(row)] for row in chroma]
+
+    start = time.perf_counter()
+    reference = [reference_best(detector, notes) for notes in note_lists]
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    best, scores, _ = detector.best_candidates(chroma)
+    batch_time = time.perf_counter() - start
+
+    mismatches = sum(
+        (detector.chord_labels[b] if b >= 0 else None) != label
+        for b, (label, _) in zip(best, reference)
+    )
+    print(f"Fragmentos:               {args.frames}")
+    print(f"Bucle raíz x patrón:      {reference_time / args.frames * 1e6:8.1f} us/fragmento")
+    print(f"Plantillas (lote N x 12): {batch_time / args.frames * 1e6:8.1f} us/fragmento")
+    print(f"Aceleración:              {reference_time / batch_time:8.1f}x")
+    print(f"Discrepancias:            {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
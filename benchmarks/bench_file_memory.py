@@ -0,0 +1,106 @@
+"""Memoria residente al analizar grabaciones largas con iter_timeline.
+
+Genera archivos PCM crudo (int16 mono) de distintas duraciones, analiza cada
+uno en un proceso aparte y compara el pico de memoria residente. Cada archivo
+se analiza sin caché, con una FeatureCache vacía (que se llena) y con la
+caché ya llena. Falla (código de salida 1) si en alguno de los tres casos el
+pico crece más que la tolerancia indicada entre el archivo más corto y el
+más largo.
+
+Uso:
+    python benchmarks/bench_file_memory.py [--minutes 10 60] [--block-frames 256]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def write_recording(path, minutes, rate):
+    """Escribe una progresión de acordes sintética de la duración indicada, por tramos"""
+    from synthesis import chord_midi_notes, synthesize_chord
+    rng = np.random.default_rng(0)
+    segment = np.concatenate([
+        synthesize_chord(chord_midi_notes(root, intervals), rate, rate, noise=0.05, rng=rng)
+        for root, intervals in ((0, [0, 4, 7]), (9, [0, 3, 7]), (5, [0, 4, 7]), (7, [0, 4, 7, 10]))
+    ])
+    segment = (segment * 32767).astype('<i2').tobytes()
+    total = int(minutes * 60 * rate) * 2
+    with open(path, 'wb') as f:
+        written = 0
+        while written < total:
+            data = segment[:total - written]
+            f.write(data)
+            written += len(data)
+
+
+def analyze(path, rate, chunk, block_frames, cache_dir=None):
+    """Analiza el archivo en este proceso y devuelve (ventanas, segundos, pico de RSS en MB)"""
+    from file_analysis import iter_timeline
+    from feature_cache import FeatureCache
+    cache = FeatureCache(cache_dir) if cache_dir is not None else None
+    start = time.perf_counter()
+    windows = sum(1 for _ in iter_timeline(path, chunk_size=chunk, raw_rate=rate, block_frames=block_frames,
+                                           cache=cache))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss está en KB en Linux
+    return windows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria al analizar archivos largos")
+    parser.add_argument("--minutes", type=float, nargs='+', default=[10, 60])
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--block-frames", type=int, default=256)
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Crecimiento relativo tolerado del pico de memoria (por defecto: 0.15)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(*analyze(args.child, args.rate, args.chunk, args.block_frames, args.cache_dir))
+        return
+
+    modes = ('sin caché', 'caché vacía', 'caché llena')
+    peaks = {mode: [] for mode in modes}
+    with tempfile.TemporaryDirectory() as directory:
+        for minutes in args.minutes:
+            path = os.path.join(directory, f"{minutes:g}min.raw")
+            write_recording(path, minutes, args.rate)
+            size_mb = os.path.getsize(path) / 2**20
+            cache_dir = os.path.join(directory, f"{minutes:g}min-cache")
+            print(f"{minutes:g} min ({size_mb:.1f} MB):")
+            for mode in modes:
+                # Cada análisis en un proceso nuevo para que el pico de RSS sea independiente
+                command = [sys.executable, __file__, '--child', path, '--rate', str(args.rate),
+                           '--chunk', str(args.chunk), '--block-frames', str(args.block_frames)]
+                if mode != 'sin caché':
+                    command += ['--cache-dir', cache_dir]
+                output = subprocess.run(command, check=True, capture_output=True, text=True).stdout.split()
+                windows, elapsed, peak = int(output[0]), float(output[1]), float(output[2])
+                peaks[mode].append(peak)
+                print(f"  {mode:<12} {windows} ventanas en {elapsed:6.1f} s, "
+                      f"pico de memoria residente {peak:6.1f} MB")
+            os.remove(path)
+
+    failed = False
+    for mode in modes:
+        growth = peaks[mode][-1] / peaks[mode][0] - 1
+        print(f"Crecimiento del pico de memoria ({mode}): {growth:+.1%}")
+        failed |= growth > args.tolerance
+    if failed:
+        print("ERROR: la memoria crece con la duración del archivo")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Puerta de silencio y control de carga del análisis en vivo.
+
+Tres pruebas con ChordDetectorApp sin visualización:
+
+1. Puerta: una progresión con pausas de solo ruido de fondo, analizada
+   fragmento a fragmento con y sin ``--gate``. Compara el tiempo de proceso
+   total, los fragmentos silenciados y los cambios de acorde espurios dentro
+   de las pausas. Comprueba además, en uno y en dos canales, que con la
+   puerta cerrada el acorde (y el de cada canal) es N/A y que ese paso a N/A
+   se cuenta en ``chord_changes``; termina con código 1 si no es así.
+2. Modos: la misma progresión (sin pausas) analizada en cada modo de
+   LOAD_MODES fijado de antemano (``--repeats`` pasadas). Muestra la
+   mediana del coste de un fragmento analizado, la CPU por segundo de audio
+   (la mejor pasada, contando los fragmentos descartados) y los fragmentos
+   con el acorde correcto.
+3. Tiempo real: la aplicación con SyntheticSource a tiempo real y un salto
+   corto. En el tercio central se simula una máquina más lenta: cada
+   análisis se alarga (con espera activa) hasta que el análisis completo
+   cuesta ``--overload`` veces el periodo de un fragmento, y los modos más
+   baratos se alargan en la misma proporción. Se ejecuta con y sin
+   ``--adaptive`` y se cuentan los fragmentos perdidos por desbordamiento
+   frente a los descartados a propósito, junto con los modos por los que
+   pasa el controlador. Termina con código 1 si con ``--adaptive`` el
+   controlador no degrada el análisis durante la sobrecarga o no vuelve a
+   ``full`` al terminar.
+
+Uso:
+    python benchmarks/bench_load_shedding.py [--seconds 12] [--hop 512] [--realtime-hop 256] [--gate -40]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_sources import SyntheticSource
+from chord_detector import ChordDetector
+from file_analysis import frame_signal
+from load_control import LOAD_MODES
+from main import ChordDetectorApp
+from synthesis import chord_midi_notes, synthesize_chord
+
+PROGRESSION = [(0, 'major'), (9, 'minor'), (5, 'major'), (7, 'major')]
+
+
+def progression(rate, seconds_per_chord, repeats, pause, noise_db, seed, chord_noise=0.05):
+    """Progresión con pausas de ruido opcionales; devuelve la señal y el acorde (o None) de cada muestra"""
+    rng = np.random.default_rng(seed)
+    n_chord = int(seconds_per_chord * rate)
+    n_pause = int(pause * rate)
+    signals, labels = [], []
+    for _ in range(repeats):
+        for root, chord_type in PROGRESSION:
+            chord = synthesize_chord(chord_midi_notes(root, ChordDetector.CHORD_PATTERNS[chord_type]), n_chord,
+                                     rate, detune_cents=5, noise=chord_noise, rng=rng)
+            signals.append(0.5 * chord / np.abs(chord).max())
+            labels += [f"{ChordDetector.NOTES[root]} {chord_type}"] * n_chord
+            if n_pause:
+                signals.append(rng.normal(0, 10 ** (noise_db / 20), n_pause))
+                labels += [None] * n_pause
+    return np.concatenate(signals).astype(np.float32), labels
+
+
+def offline_app(args, **options):
+    source = SyntheticSource(rate=args.rate, chunk_size=args.hop, channels=options.get('channels', 1))
+    app = ChordDetectorApp(rate=args.rate, chunk_size=args.hop, window_size=args.window, hop_size=args.hop,
+                           source=source, visual=False, **options)
+    # Tablas del analizador y del detector fuera de la medición
+    warm = synthesize_chord(chord_midi_notes(0, [0, 4, 7]), args.window, args.rate)
+    app.detector.classify_notes(app.analyzer.analyze(warm))
+    if app.cheap_analyzer is not None:
+        app.detector.classify_notes(app.cheap_analyzer.analyze(warm))
+    return app
+
+
+def run_offline(app, hops):
+    """Procesa los saltos uno a uno; devuelve el acorde tras cada uno y el tiempo total"""
+    chords = []
+    start = time.perf_counter()
+    for hop in hops:
+        app.process_audio(hop)
+        chords.append(app.current_chord)
+    return chords, time.perf_counter() - start
+
+
+def gate_test(args):
+    signal, labels = progression(args.rate, 1.0, 3, 1.0, args.noise_db, args.seed)
+    hops = frame_signal(signal, args.hop)
+    # Ventanas completamente dentro de una pausa (del principio al final de la ventana)
+    ends = np.minimum(len(labels) - 1, (np.arange(len(hops)) + 1) * args.hop - 1)
+    in_pause = [labels[end] is None and labels[max(0, end - args.window + 1)] is None for end in ends]
+    print(f"1. Puerta de silencio: {len(hops)} saltos, pausas con ruido a {args.noise_db:g} dBFS")
+    print(f"{'':<14} {'tiempo':>8} {'silenciados':>12} {'cambios en pausas':>18}")
+    for name, gate_db in (('sin puerta', None), (f'--gate {args.gate:g}', args.gate)):
+        app = offline_app(args, gate_db=gate_db)
+        chords, elapsed = run_offline(app, hops)
+        # El paso a N/A al cerrarse la puerta no es espurio
+        spurious = sum(1 for i in range(1, len(chords))
+                       if in_pause[i] and chords[i] != chords[i - 1] and chords[i] != "N/A")
+        gated = app.gate.gated if app.gate is not None else 0
+        print(f"{name:<14} {elapsed:7.2f}s {gated:12d} {spurious:18d}")
+    return gate_reset_check(args, hops)
+
+
+def gate_reset_check(args, hops):
+    """Con la puerta cerrada el acorde de todos los canales debe ser N/A; devuelve False si falla"""
+    ok = True
+    for channels in (1, 2):
+        app = offline_app(args, gate_db=args.gate, channels=channels)
+        closings = wrong = 0
+        was_open = False
+        for hop in hops:
+            block = np.tile(hop, (channels, 1)) if channels > 1 else hop
+            changes = app.stats.counters.get('chord_changes', 0)
+            app.process_audio(block)
+            if app.gate.is_open:
+                was_open = True
+                continue
+            chords = app.multichannel.current_chords if channels > 1 else [app.current_chord]
+            wrong += any(chord != "N/A" for chord in chords)
+            if was_open:
+                # Cierre de la puerta: el paso a N/A cuenta como cambio en cada canal
+                closings += 1
+                wrong += app.stats.counters.get('chord_changes', 0) - changes != channels
+            was_open = False
+        print(f"   {channels} canal(es): {closings} cierres de la puerta, {wrong} saltos con un acorde distinto de N/A "
+              f"o sin contar el cambio")
+        ok = ok and closings > 0 and wrong == 0
+    if not ok:
+        print("ERROR: con la puerta cerrada el acorde no pasa a N/A")
+    return ok
+
+
+def modes_test(args):
+    signal, labels = progression(args.rate, 2.0, 2, 0.0, args.noise_db, args.seed, args.chord_noise)
+    hops = frame_signal(signal, args.hop)
+    expected = [labels[min(len(labels) - 1, (i + 1) * args.hop - 1)] for i in range(len(hops))]
+    audio_seconds = len(hops) * args.hop / args.rate
+    print(f"\n2. Modos de carga fijados: {len(hops)} saltos de {args.hop} muestras (ventana {args.window}), "
+          f"ruido {args.chord_noise:g} relativo a la señal")
+    print(f"{'Modo':<16} {'ms/analizado':>13} {'CPU ms/s':>9} {'aciertos':>9}")
+    for level, mode in enumerate(LOAD_MODES):
+        best = None
+        analyzed_times = []
+        for _ in range(args.repeats):
+            app = offline_app(args, adaptive=True)
+            controller = app.load_controller
+            # Fijar el modo: sin recuperación posible
+            controller.level = level
+            controller.recover = controller.high = float('inf')
+            app._apply_load_mode()
+            chords = []
+            start = time.perf_counter()
+            for hop in hops:
+                analyzed = controller.analyzed_by_mode[mode]
+                hop_start = time.perf_counter()
+                app.process_audio(hop)
+                if controller.analyzed_by_mode[mode] > analyzed:
+                    analyzed_times.append(time.perf_counter() - hop_start)
+                chords.append(app.current_chord)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        accuracy = np.mean([c == e for c, e in zip(chords, expected)])
+        print(f"{mode:<16} {np.median(analyzed_times) * 1e3:13.3f} {best / audio_seconds * 1e3:9.1f} "
+              f"{accuracy:9.1%}")
+
+
+def slow_down(analyzer, factor, active):
+    """Alarga cada análisis ``factor`` veces (espera activa) mientras ``active`` está activo"""
+    analyze = analyzer.analyze
+
+    def slowed(*args, **kwargs):
+        start = time.perf_counter()
+        result = analyze(*args, **kwargs)
+        if active.is_set():
+            end = start + (time.perf_counter() - start) * factor
+            while time.perf_counter() < end:
+                pass
+        return result
+    analyzer.analyze = slowed
+
+
+def analysis_cost(analyzer, signal, repeats=200):
+    """Mediana del tiempo de analyze sobre una ventana de acorde"""
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        analyzer.analyze(signal)
+        times[i] = time.perf_counter() - start
+    return float(np.median(times))
+
+
+def realtime_test(args):
+    period = args.realtime_hop / args.rate
+    warm = synthesize_chord(chord_midi_notes(0, [0, 4, 7]), args.window, args.rate, noise=args.chord_noise,
+                            rng=np.random.default_rng(args.seed)).astype(np.float32)
+    print(f"\n3. Tiempo real: {args.seconds:g} s, salto {args.realtime_hop} ({period * 1e3:.1f} ms), "
+          f"análisis completo a {args.overload:g}x el periodo en el tercio central")
+    print(f"{'':<12} {'procesados':>10} {'perdidos':>9} {'descartados':>12} {'cambios':>8}  modos")
+    ok = True
+    for adaptive in (False, True):
+        source = SyntheticSource(rate=args.rate, chunk_size=args.realtime_hop, noise=args.chord_noise)
+        app = ChordDetectorApp(rate=args.rate, chunk_size=args.realtime_hop, window_size=args.window,
+                               hop_size=args.realtime_hop, source=source, visual=False, adaptive=adaptive)
+        app.detector.classify_notes(app.analyzer.analyze(warm))
+        # Máquina más lenta en la misma proporción para todos los front ends
+        factor = args.overload * period / analysis_cost(app.analyzer, warm)
+        overloaded = threading.Event()
+        for analyzer in (app.analyzer, app.cheap_analyzer):
+            if analyzer is not None:
+                slow_down(analyzer, factor, overloaded)
+        modes = []
+        app.start()
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < args.seconds:
+            if args.seconds / 3 < elapsed < 2 * args.seconds / 3:
+                overloaded.set()
+            else:
+                overloaded.clear()
+            if adaptive and (not modes or modes[-1] != app.load_controller.mode):
+                modes.append(app.load_controller.mode)
+            time.sleep(0.05)
+        overloaded.clear()
+        app.stop()
+        stats = app.pipeline_stats()
+        load = stats['load'] or {}
+        lost = stats['overruns'] + stats['skipped'] + stats['input_overflows']
+        name = '--adaptive' if adaptive else 'fijo'
+        print(f"{name:<12} {stats['processed']:10d} {lost:9d} {load.get('shed', 0):12d} "
+              f"{load.get('transitions', 0):8d}  {' > '.join(modes) or '-'}")
+        if adaptive and (len(modes) < 3 or modes[-1] != LOAD_MODES[0]):
+            print("ERROR: el controlador no degradó el análisis en la sobrecarga o no volvió a full")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la puerta de silencio y el control de carga")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--window", type=int, default=4096)
+    parser.add_argument("--hop", type=int, default=512)
+    parser.add_argument("--realtime-hop", type=int, default=256, help="Salto de la prueba en tiempo real")
+    parser.add_argument("--gate", type=float, default=-40.0, help="Umbral de apertura de la puerta (dBFS)")
+    parser.add_argument("--noise-db", type=float, default=-50.0, help="Nivel del ruido de las pausas (dBFS)")
+    parser.add_argument("--chord-noise", type=float, default=0.3,
+                        help="Ruido de los acordes de las pruebas 2 y 3, relativo a su valor eficaz")
+    parser.add_argument("--seconds", type=float, default=12.0, help="Duración de la prueba en tiempo real")
+    parser.add_argument("--overload", type=float, default=2.0,
+                        help="Coste del análisis completo en la sobrecarga, en periodos de fragmento")
+    parser.add_argument("--repeats", type=int, default=3, help="Pasadas de cada modo fijado (se toma la mejor)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    gate_ok = gate_test(args)
+    modes_test(args)
+    realtime_ok = realtime_test(args)
+    if not (gate_ok and realtime_ok):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Latencia frente a precisión con ventanas cortas, relleno con ceros e interpolación de picos.
+
+Para cada tamaño de ventana compara el análisis FFT normal con la ventana
+rellenada con ceros hasta ``--fft-size`` muestras y con el relleno más la
+interpolación parabólica de los picos (``FrequencyAnalyzer(fft_size=...,
+interpolate=True)``). La configuración actual por defecto es la ventana de
+4096 muestras sin relleno.
+
+Para cada configuración muestra:
+
+- la latencia de la ventana (lo que tarda en llenarse de audio nuevo tras un
+  cambio de acorde) y el coste por fragmento del análisis y la clasificación;
+- el error de tono del pico más fuerte en tonos puros desafinados al azar
+  (mediana y p95, en cents) y los tonos cuya nota principal es la correcta;
+- los acordes de ChordDetector.CHORD_PATTERNS sobre las 12 raíces que se
+  detectan bien y aquellos cuyo conjunto de clases de altura es exacto.
+
+Uso:
+    python benchmarks/bench_low_latency.py [--windows 512 1024 2048 4096] [--fft-size 4096] [--octave 4]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chord_detector import ChordDetector
+from frequency_analyzer import FrequencyAnalyzer, _peak_offsets
+from synthesis import chord_test_set, midi_to_frequency
+
+
+def configurations(windows, fft_size):
+    """(ventana, tamaño de FFT o None, interpolar) de cada configuración comparada"""
+    for window in windows:
+        yield window, None, False
+        if fft_size > window:
+            yield window, fft_size, False
+        yield window, fft_size if fft_size > window else None, True
+
+
+def tone_test(analyzer, window, rate, rng):
+    """Errores de tono (cents) del pico más fuerte y aciertos de la nota principal en tonos puros"""
+    errors = []
+    hits = 0
+    midis = np.arange(36, 85)
+    for midi in midis:
+        frequency = midi_to_frequency(midi) * 2 ** (rng.uniform(-20, 20) / 1200)
+        t = np.arange(window) / rate
+        signal = (0.5 * np.sin(2 * np.pi * frequency * t + rng.uniform(0, 2 * np.pi))).astype(np.float32)
+        notes = analyzer.analyze(signal)
+        hits += bool(notes) and notes[0] == f"{ChordDetector.NOTES[midi % 12]}{midi // 12 - 1}"
+        # Frecuencia del pico más fuerte, como la estima el analizador
+        magnitude = analyzer.spectrum
+        peak = np.array([np.argmax(magnitude[1:-1]) + 1])
+        position = peak + _peak_offsets(magnitude, peak) if analyzer.interpolate else peak
+        estimate = float(position[0]) * rate / (2 * (len(magnitude) - 1))
+        errors.append(abs(1200 * np.log2(estimate / frequency)))
+    return np.percentile(errors, [50, 95]), hits / len(midis)
+
+
+def chord_test(analyzer, window, rate, args):
+    """Tiempo por fragmento y aciertos de acorde y de clases de altura"""
+    detector = ChordDetector(confidence_threshold=args.confidence)
+    cases = chord_test_set(ChordDetector.CHORD_PATTERNS, window, rate, inversions=False, octave=args.octave,
+                           detune_cents=args.detune, noise=args.noise, seed=args.seed)
+    for _, _, signal in cases[:4]:
+        detector.classify_notes(analyzer.analyze(signal))
+    chord_hits = set_hits = 0
+    elapsed = 0.0
+    for expected, _, signal in cases:
+        start = time.perf_counter()
+        notes = analyzer.analyze(signal)
+        status, label, _ = detector.classify_notes(notes)
+        elapsed += time.perf_counter() - start
+        chord_hits += status == detector.CHORD and detector.chord_labels[label] == expected
+        root, chord_type = expected.split(' ', 1)
+        root = detector.NOTES.index(root)
+        expected_set = {(root + i) % 12 for i in detector.CHORD_PATTERNS[chord_type]}
+        set_hits += {detector.PITCH_CLASSES[n[:-1]] for n in notes} == expected_set
+    return elapsed / len(cases), chord_hits / len(cases), set_hits / len(cases)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de latencia y precisión con ventanas cortas")
+    parser.add_argument("--windows", type=int, nargs='+', default=[512, 1024, 2048, 4096])
+    parser.add_argument("--fft-size", type=int, default=4096, help="Tamaño de la FFT con relleno de ceros")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--octave", type=int, default=4, help="Octava de la raíz de los acordes")
+    parser.add_argument("--detune", type=float, default=5.0, help="Desafinación aleatoria máxima (cents)")
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--confidence", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Frecuencia {args.rate} Hz; tonos puros MIDI 36-84 desafinados hasta ±20 cents; "
+          f"acordes en la octava {args.octave}")
+    print(f"{'Ventana':>7} {'FFT':>6} {'interp.':>7} {'latencia':>9} {'µs/frag.':>9} "
+          f"{'error p50/p95 (cents)':>22} {'notas':>7} {'acordes':>8} {'clases':>7}")
+    for window, fft_size, interpolate in configurations(args.windows, args.fft_size):
+        rng = np.random.default_rng(args.seed)
+        analyzer = FrequencyAnalyzer(sampling_rate=args.rate, fft_size=fft_size, interpolate=interpolate)
+        (error_p50, error_p95), note_accuracy = tone_test(analyzer, window, args.rate, rng)
+        cost, chord_accuracy, set_accuracy = chord_test(analyzer, window, args.rate, args)
+        latency = window / args.rate * 1e3
+        print(f"{window:7d} {fft_size or window:6d} {'sí' if interpolate else 'no':>7} {latency:7.1f}ms "
+              f"{cost * 1e6:9.0f} {error_p50:10.1f} / {error_p95:8.1f} {note_accuracy:7.1%} "
+              f"{chord_accuracy:8.1%} {set_accuracy:7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Micro-benchmark: búsqueda de notas por bin (tabla) frente a _find_closest_note.
+
+Uso:
+    python benchmarks/bench_note_lookup.py [--rate 44100] [--chunk 4096]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frequency_analyzer import FrequencyAnalyzer
+
+
+def reference_lookup(analyzer, freqs, peaks):
+    """Resolución original: un recorrido de all_notes por cada pico"""
+    notes = []
+    for peak_idx in peaks:
+        freq = freqs[peak_idx]
+        if 50 <= freq <= 5000:
+            notes.append(analyzer._find_closest_note(freq))
+        else:
+            notes.append("Unknown")
+    return notes
+
+
+def table_lookup(analyzer, chunk_size, peaks):
+    """Resolución con la tabla precalculada: un único acceso vectorizado"""
+    indices = analyzer._note_table(chunk_size)[peaks]
+    return [analyzer._note_names[i] if i >= 0 else "Unknown" for i in indices]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la tabla bin -> nota")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    analyzer = FrequencyAnalyzer(sampling_rate=args.rate)
+    freqs = np.fft.rfftfreq(args.chunk, 1/args.rate)
+
+    # Verificar que la tabla reproduce las reglas originales en todos los bins
+    all_bins = np.arange(len(freqs))
+    if reference_lookup(analyzer, freqs, all_bins) != table_lookup(analyzer, args.chunk, all_bins):
+        print("ERROR: la tabla no coincide con _find_closest_note")
+        sys.exit(1)
+
+    # Hasta 12 picos por fragmento, como en analyze
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, len(freqs), size=12) for _ in range(args.frames)]
+
+    start = time.perf_counter()
+    for peaks in frames:
+        reference_lookup(analyzer, freqs, peaks)
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for peaks in frames:
+        table_lookup(analyzer, args.chunk, peaks)
+    table_time = time.perf_counter() - start
+
+    print(f"Bins verificados: {len(freqs)} (rate={args.rate}, chunk={args.chunk})")
+    print(f"_find_closest_note: {reference_time / args.frames * 1e6:8.1f} us/fragmento")
+    print(f"Tabla por bin:      {table_time / args.frames * 1e6:8.1f} us/fragmento")
+    print(f"Aceleración:        {reference_time / table_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Análisis en paralelo de un corpus frente al análisis en serie.
+
+Genera varios archivos WAV sintéticos, los analiza con analyze_file uno tras
+otro y con iter_file_timelines en un pool de procesos, y comprueba que las
+líneas de tiempo son idénticas. Termina con código 1 si hay discrepancias.
+
+Uso:
+    python benchmarks/bench_parallel.py [--files 4] [--minutes 2] [--workers 1 2 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_analysis import analyze_file
+from parallel_analysis import analyze_files
+from synthesis import chord_midi_notes, synthesize_chord
+
+
+def write_wav(path, minutes, rate, seed):
+    """Progresión aleatoria de acordes de un segundo, en WAV de 16 bits"""
+    rng = np.random.default_rng(seed)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        for _ in range(int(minutes * 60)):
+            intervals = [[0, 4, 7], [0, 3, 7], [0, 4, 7, 10]][rng.integers(3)]
+            chord = synthesize_chord(chord_midi_notes(int(rng.integers(12)), intervals), rate, rate,
+                                     noise=0.05, rng=rng)
+            wav.writeframes((chord * 32767).astype('<i2').tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del análisis en paralelo")
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--minutes", type=float, default=2.0)
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, os.cpu_count() or 1])
+    parser.add_argument("--segment-frames", type=int, default=512)
+    parser.add_argument("--tasks-per-dispatch", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(args.files):
+            paths.append(os.path.join(directory, f"corpus_{i}.wav"))
+            write_wav(paths[-1], args.minutes, args.rate, seed=i)
+
+        analyze_file(paths[0])  # Calentamiento: importaciones y tablas en el proceso principal
+        start = time.perf_counter()
+        serial = {path: analyze_file(path) for path in paths}
+        serial_time = time.perf_counter() - start
+        windows = sum(len(timeline) for timeline in serial.values())
+        print(f"Corpus: {args.files} archivos x {args.minutes:g} min ({windows} ventanas), "
+              f"{os.cpu_count()} CPU")
+        print(f"En serie:            {serial_time:6.2f} s ({windows / serial_time:7.0f} ventanas/s)")
+
+        failed = False
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            parallel = analyze_files(paths, workers=workers, segment_frames=args.segment_frames,
+                                     tasks_per_dispatch=args.tasks_per_dispatch)
+            elapsed = time.perf_counter() - start
+            identical = parallel == serial
+            failed |= not identical
+            print(f"{workers:2d} proceso(s):        {elapsed:6.2f} s ({windows / elapsed:7.0f} ventanas/s, "
+                  f"{serial_time / elapsed:4.1f}x) {'idéntico' if identical else 'DISCREPANCIAS'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
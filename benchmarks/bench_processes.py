@@ -0,0 +1,110 @@
+"""Jitter y uso de CPU del pipeline en un proceso frente a procesos separados.
+
+Ejecuta la aplicación con una progresión sintética a tiempo real mientras el
+hilo principal dibuja la visualización con matplotlib (backend Agg) a un ritmo
+fijo, primero con captura y análisis en hilos del mismo proceso y después con
+--processes. Para cada modo muestra la latencia de extremo a extremo (desde
+que termina de sonar el fragmento hasta tener el acorde), su dispersión
+(p99 - p50) como medida del jitter, los fragmentos perdidos y la CPU usada por
+todos los procesos.
+
+Uso:
+    python benchmarks/bench_processes.py [--seconds 10] [--render-fps 30] [--window 8192 --hop 2048]
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_sources import SyntheticSource
+from main import ChordDetectorApp
+from synthesis import chord_midi_notes, synthesize_chord
+
+
+def cpu_seconds():
+    """CPU (usuario + sistema) de este proceso y de los hijos ya terminados"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def warm_up(app, window_size, rate):
+    """Primera FFT y tabla de acordes fuera de la medición (los procesos hijos las heredan)"""
+    chord = synthesize_chord(chord_midi_notes(0, [0, 4, 7]), window_size, rate)
+    stats, app.analyzer.stats = app.analyzer.stats, None
+    app.detector.classify_notes(app.analyzer.analyze(chord))
+    app.analyzer.stats = stats
+
+
+def run_mode(args, processes):
+    source = SyntheticSource(rate=args.rate, chunk_size=args.hop)
+    app = ChordDetectorApp(rate=args.rate, chunk_size=args.hop, window_size=args.window, hop_size=args.hop,
+                           source=source, processes=processes)
+    warm_up(app, args.window, args.rate)
+
+    cpu_start = cpu_seconds()
+    start = time.perf_counter()
+    app.start()
+    # Dibujar en el hilo principal, como haría la ventana de matplotlib
+    frames = 0
+    period = 1.0 / args.render_fps
+    next_frame = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        app.visualizer.update_plot(frames)
+        app.visualizer.fig.canvas.draw()
+        frames += 1
+        next_frame += period
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    app.stop()
+    elapsed = time.perf_counter() - start
+    cpu = cpu_seconds() - cpu_start
+
+    stats = app.pipeline_stats()
+    return {
+        'latency': stats['latency_ms'].get('end_to_end', {'count': 0}),
+        'process': stats['latency_ms'].get('process', {'count': 0}),
+        'processed': stats['processed'],
+        'lost': stats['overruns'] + stats['skipped'] + stats['input_overflows'],
+        'frames': frames / elapsed,
+        'cpu': cpu / elapsed * 100,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de jitter: un proceso frente a procesos separados")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--render-fps", type=float, default=30.0, help="Fotogramas por segundo a dibujar")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--window", type=int, default=4096)
+    parser.add_argument("--hop", type=int, help="Salto entre análisis (por defecto, igual a la ventana)")
+    args = parser.parse_args()
+    args.hop = args.hop or args.window
+
+    print(f"{args.seconds:.0f} s a tiempo real, ventana {args.window}, salto {args.hop}, "
+          f"dibujando a {args.render_fps:.0f} fps")
+    print(f"{'Modo':<10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'jitter':>8} "
+          f"{'análisis p99':>13} {'frag.':>6} {'perdidos':>9} {'fps':>5} {'CPU %':>6}")
+    for name, processes in (('hilos', False), ('procesos', True)):
+        result = run_mode(args, processes)
+        latency = result['latency']
+        if not latency['count']:
+            print(f"{name:<10} sin resultados")
+            continue
+        print(f"{name:<10} {latency['p50']:9.2f} {latency['p95']:9.2f} {latency['p99']:9.2f} "
+              f"{latency['p99'] - latency['p50']:8.2f} {result['process']['p99']:13.2f} "
+              f"{result['processed']:6d} {result['lost']:9d} {result['frames']:5.1f} {result['cpu']:6.1f}")
+    print("jitter = p99 - p50 de la latencia de extremo a extremo")
+
+
+if __name__ == "__main__":
+    main()
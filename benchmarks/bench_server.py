@@ -0,0 +1,162 @@
+"""Generador de carga para server.py.
+
+Arranca el servidor en un proceso aparte, abre varias entradas que envían
+acordes sintéticos (a tiempo real o tan rápido como acepte el servidor) y un
+suscriptor que recibe un evento por fragmento. Mide el rendimiento total y la
+latencia por entrada desde que se envía cada fragmento hasta que llega su
+evento, y consulta al final los contadores de descartes del servidor.
+
+Uso:
+    python benchmarks/bench_server.py [--streams 8] [--seconds 10] [--free-run] [--workers 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthesis import chord_midi_notes, synthesize_chord
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(port, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            await query_stats(port)
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def ingest(port, name, chunks, args, sent_at):
+    """Envía los fragmentos de una entrada, anotando el instante de envío de cada uno"""
+    _, writer = await asyncio.open_connection('127.0.0.1', port)
+    header = {'role': 'ingest', 'stream': name, 'rate': args.rate, 'chunk': args.chunk, 'format': 'int16'}
+    writer.write((json.dumps(header) + '\n').encode())
+    period = args.chunk / args.rate
+    start = time.perf_counter()
+    for seq in range(args.seconds * args.rate // args.chunk):
+        if not args.free_run:
+            delay = start + seq * period - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        sent_at[seq] = time.perf_counter()
+        writer.write(chunks[seq % len(chunks)])
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def subscribe(port, latencies, sent_at, done):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'{"role": "subscribe", "changes_only": false}\n')
+    await writer.drain()
+    while not done.is_set():
+        try:
+            line = await asyncio.wait_for(reader.readline(), 0.2)
+        except asyncio.TimeoutError:
+            continue
+        if not line:
+            break
+        now = time.perf_counter()
+        event = json.loads(line)
+        latencies[event['stream']].append(now - sent_at[event['stream']][event['seq']])
+    writer.close()
+
+
+async def query_stats(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b'{"role": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run(args, port):
+    rng = np.random.default_rng(0)
+    # Un segundo de cada acorde, en fragmentos ya codificados
+    signal = np.concatenate([
+        synthesize_chord(chord_midi_notes(root, [0, 4, 7]), args.rate, args.rate, noise=0.05, rng=rng)
+        for root in (0, 9, 5, 7)
+    ])
+    pcm = (signal * 32767).astype('<i2')
+    chunks = [pcm[i:i + args.chunk].tobytes() for i in range(0, len(pcm) - args.chunk + 1, args.chunk)]
+
+    await wait_for_server(port)
+    names = [f"stream-{i}" for i in range(args.streams)]
+    sent_at = {name: {} for name in names}
+    latencies = {name: [] for name in names}
+    done = asyncio.Event()
+    subscriber = asyncio.ensure_future(subscribe(port, latencies, sent_at, done))
+    await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ingest(port, name, chunks, args, sent_at[name]) for name in names))
+    # Esperar a que lleguen los eventos pendientes
+    expected = sum(len(s) for s in sent_at.values())
+    deadline = time.perf_counter() + 10
+    while sum(len(l) for l in latencies.values()) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    stats = await query_stats(port)
+    done.set()
+    await subscriber
+    return expected, elapsed, latencies, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para el servidor de acordes")
+    parser.add_argument("--streams", type=int, default=8)
+    parser.add_argument("--seconds", type=int, default=10, help="Audio enviado por entrada, en segundos")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--free-run", action="store_true", help="Enviar sin esperar al tiempo real")
+    parser.add_argument("--workers", type=int, help="Hilos de análisis del servidor")
+    args = parser.parse_args()
+
+    port = free_port()
+    command = [sys.executable, os.path.join(ROOT, 'server.py'), '--port', str(port)]
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    server = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+    try:
+        expected, elapsed, latencies, stats = asyncio.run(run(args, port))
+    finally:
+        server.terminate()
+        server.wait()
+
+    received = sum(len(l) for l in latencies.values())
+    print(f"Entradas: {args.streams}, fragmentos enviados: {expected}, eventos recibidos: {received}")
+    print(f"Rendimiento: {received / elapsed:.0f} fragmentos/s "
+          f"({received * args.chunk / args.rate / elapsed:.1f}x tiempo real en total)")
+    print(f"{'Entrada':<10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for name, values in latencies.items():
+        if values:
+            p50, p95, p99 = np.percentile(np.array(values) * 1e3, (50, 95, 99))
+            print(f"{name:<10} {p50:9.2f} {p95:9.2f} {p99:9.2f}")
+    everything = np.concatenate([np.array(v) for v in latencies.values() if v] or [np.zeros(1)]) * 1e3
+    p50, p95, p99 = np.percentile(everything, (50, 95, 99))
+    print(f"{'total':<10} {p50:9.2f} {p95:9.2f} {p99:9.2f}")
+    print(f"Eventos descartados por el servidor: {stats['events_dropped']}")
+    # Las entradas ya cerradas no aparecen en las estadísticas; los descartes son los fragmentos sin evento
+    print(f"Fragmentos sin evento (descartados por retraso del análisis): {expected - received}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Línea de tiempo binaria por columnas frente a NDJSON.
+
+Genera una línea de tiempo sintética de varios millones de filas (acordes que
+duran unas cuantas ventanas, con 3 o 4 notas y confianza), la escribe con
+TimelineWriter y con NDJSONWriter (un evento por fila) y compara el tamaño en
+disco y el tiempo de escritura. Después mide las consultas de Timeline
+(acorde en un instante, segmentos de un intervalo y apariciones de un acorde)
+y las comprueba contra una búsqueda por fuerza bruta sobre los arrays
+originales. Termina con código 1 si alguna consulta no coincide.
+
+Uso:
+    python benchmarks/bench_timeline.py [--rows 2000000] [--queries 10000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_output import NDJSONWriter
+from timeline import Timeline, TimelineWriter, chord_vocabulary
+
+
+def synthetic_rows(n_rows, hop, seed):
+    """Arrays (instantes, índice de acorde, confianza) y las notas de cada acorde"""
+    rng = np.random.default_rng(seed)
+    labels = chord_vocabulary()
+    # Cada acorde dura entre 1 y 40 ventanas
+    lengths = rng.integers(1, 41, size=n_rows // 10 + 1)
+    codes = np.repeat(rng.integers(0, 48, size=len(lengths)), lengths)[:n_rows]
+    times = np.arange(n_rows) * hop
+    confidence = rng.uniform(0.6, 1.5, size=n_rows).astype(np.float32)
+    chord_notes = [[f"{label.split()[0]}{octave}" for octave in (3, 4, 5)] for label in labels]
+    return times, codes, confidence, labels, chord_notes
+
+
+def directory_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la línea de tiempo binaria")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Filas de la línea de tiempo")
+    parser.add_argument("--hop", type=float, default=4096 / 44100, help="Segundos entre filas")
+    parser.add_argument("--queries", type=int, default=10_000, help="Consultas de cada tipo")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    times, codes, confidence, labels, chord_notes = synthetic_rows(args.rows, args.hop, args.seed)
+    end_time = float(times[-1]) + args.hop
+    workdir = tempfile.mkdtemp(prefix='bench_timeline_')
+    ok = True
+    try:
+        path = os.path.join(workdir, 'timeline')
+        start = time.perf_counter()
+        with TimelineWriter(path) as writer:
+            for t, code, score in zip(times.tolist(), codes.tolist(), confidence.tolist()):
+                writer.append(t, labels[code], chord_notes[code], score)
+            writer.close(end_time)
+        binary_time = time.perf_counter() - start
+        binary_size = directory_size(path)
+
+        ndjson_path = os.path.join(workdir, 'timeline.ndjson')
+        start = time.perf_counter()
+        events = NDJSONWriter(ndjson_path)
+        for t, code, score in zip(times.tolist(), codes.tolist(), confidence.tolist()):
+            events.write_event(t, labels[code], chord_notes[code], score)
+        events.close()
+        ndjson_time = time.perf_counter() - start
+        ndjson_size = os.path.getsize(ndjson_path)
+
+        print(f"{args.rows} filas ({end_time / 3600:.1f} h de audio)")
+        print(f"{'Formato':<10} {'escritura':>10} {'tamaño':>12} {'bytes/fila':>11}")
+        print(f"{'binario':<10} {binary_time:9.2f}s {binary_size / 2 ** 20:10.1f}MB {binary_size / args.rows:11.1f}")
+        print(f"{'NDJSON':<10} {ndjson_time:9.2f}s {ndjson_size / 2 ** 20:10.1f}MB {ndjson_size / args.rows:11.1f}")
+
+        start = time.perf_counter()
+        timeline = Timeline(path)
+        open_time = time.perf_counter() - start
+        print(f"\nApertura: {open_time * 1e3:.2f} ms")
+
+        # Referencia por fuerza bruta: comienzos de segmento y acorde de cada uno
+        rng = np.random.default_rng(args.seed + 1)
+        segment_start = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+        segment_end = np.append(times[segment_start[1:]], end_time)
+
+        instants = rng.uniform(0, end_time, args.queries)
+        start = time.perf_counter()
+        found = [timeline.chord_at(t) for t in instants]
+        elapsed = time.perf_counter() - start
+        expected_rows = np.searchsorted(times, instants, side='right') - 1
+        mismatches = sum(row is None or row[1] != labels[codes[i]] or row[0] != times[i]
+                         for row, i in zip(found, expected_rows))
+        print(f"chord_at:    {elapsed / args.queries * 1e6:8.1f} µs/consulta, {mismatches} discrepancias")
+        ok &= mismatches == 0
+
+        spans = np.sort(rng.uniform(0, end_time, (args.queries, 2)), axis=1)
+        spans[:, 1] = np.minimum(spans[:, 0] + rng.uniform(0, 60, args.queries), end_time)
+        start = time.perf_counter()
+        found = [timeline.segments(t0, t1) for t0, t1 in spans]
+        elapsed = time.perf_counter() - start
+        mismatches = 0
+        for segments, (t0, t1) in zip(found, spans):
+            overlap = np.flatnonzero((segment_end > t0) & (times[segment_start] <= t1))
+            mismatches += [(s, e, c) for s, e, c in segments] != [
+                (float(times[segment_start[i]]), float(segment_end[i]), labels[codes[segment_start[i]]])
+                for i in overlap]
+        print(f"segments:    {elapsed / args.queries * 1e6:8.1f} µs/consulta, {mismatches} discrepancias")
+        ok &= mismatches == 0
+
+        start = time.perf_counter()
+        found = {label: timeline.occurrences(label) for label in labels[:48]}
+        elapsed = time.perf_counter() - start
+        segment_codes = codes[segment_start]
+        mismatches = 0
+        for code, label in enumerate(labels[:48]):
+            indices = np.flatnonzero(segment_codes == code)
+            mismatches += found[label] != [(float(times[segment_start[i]]), float(segment_end[i])) for i in indices]
+        n_occurrences = sum(len(occurrences) for occurrences in found.values())
+        print(f"occurrences: {elapsed / 48 * 1e3:8.2f} ms/acorde ({n_occurrences} segmentos), "
+              f"{mismatches} discrepancias")
+        ok &= mismatches == 0
+
+        start = time.perf_counter()
+        n_read = sum(1 for _ in timeline.iter_rows())
+        elapsed = time.perf_counter() - start
+        print(f"iter_rows:   {elapsed:8.2f} s para {n_read} filas")
+        ok &= n_read == args.rows
+    finally:
+        shutil.rmtree(workdir)
+    if not ok:
+        print("ERROR: la línea de tiempo no coincide con la referencia")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
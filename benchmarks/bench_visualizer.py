@@ -0,0 +1,116 @@
+"""Coste del dibujo de la visualización frente al del análisis.
+
+Analiza una progresión sintética fragmento a fragmento y entrega cada
+resultado a AudioVisualizer (backend Agg) como lo haría el hilo de análisis,
+con el espectro que ya calculó el análisis. Al ritmo de ``fps`` cuadros por
+segundo de audio se llama a ``refresh``, que solo dibuja (con blit de los
+ejes que cambian sobre el fondo guardado) si llegó un resultado nuevo.
+Compara el coste por fragmento del análisis y de la entrega (``update_data``)
+con el de cada cuadro (preparación y blit) y con el dibujo de la forma de onda
+completa sin reducir, como hacía antes la visualización, y resume la CPU por
+segundo de audio y el coste total del dibujo frente al del análisis.
+
+Uso:
+    python benchmarks/bench_visualizer.py [--seconds 20] [--fps 30] [--window 4096 --hop 4096]
+"""
+import argparse
+import os
+import sys
+import time
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chord_detector import ChordDetector
+from file_analysis import frame_signal
+from frequency_analyzer import FrequencyAnalyzer
+from stats import LatencyHistogram, PipelineStats, format_latency
+from synthesis import chord_midi_notes, synthesize_chord
+from visualizer import AudioVisualizer
+
+
+def progression(seconds, rate, seed):
+    rng = np.random.default_rng(seed)
+    signals = []
+    for _ in range(max(1, int(seconds / 2))):
+        root = int(rng.integers(12))
+        intervals = ChordDetector.CHORD_PATTERNS[['major', 'minor'][rng.integers(2)]]
+        signals.append(synthesize_chord(chord_midi_notes(root, intervals), 2 * rate, rate, noise=0.2, rng=rng))
+    return np.concatenate(signals).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del dibujo de la visualización")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Duración del audio analizado")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--window", type=int, default=4096)
+    parser.add_argument("--hop", type=int, default=None, help="Salto entre análisis (por defecto, la ventana)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    hop = args.hop or args.window
+
+    frames = frame_signal(progression(args.seconds, args.rate, args.seed), args.window, hop)
+    analyzer = FrequencyAnalyzer(sampling_rate=args.rate)
+    detector = ChordDetector()
+    visualizer = AudioVisualizer(sampling_rate=args.rate, window_size=args.window, fps=args.fps)
+    # Primer dibujo completo: guarda el fondo para el blit
+    visualizer.fig.canvas.draw()
+    # Forma de onda sin reducir, como antes: todas las muestras y un eje x nuevo en cada cuadro
+    full_line, = visualizer.ax.plot([], [], lw=1, color='cyan', animated=True)
+
+    # Calentamiento: tablas del analizador y del detector
+    detector.classify_notes(analyzer.analyze(frames[0]))
+    visualizer.update_data(frames[0], "N/A", [], spectrum=analyzer.spectrum)
+    visualizer.refresh()
+    visualizer.stats = PipelineStats()
+
+    timings = {name: LatencyHistogram(4096) for name in ('análisis', 'update_data', 'forma sin reducir')}
+    chunk_seconds = hop / args.rate
+    next_frame = 0.0
+    refreshes = 0
+    for i, frame in enumerate(frames):
+        start = time.perf_counter()
+        notes = analyzer.analyze(frame)
+        chord = detector.detect_chord(notes) if notes else "N/A"
+        analyzed = time.perf_counter()
+        visualizer.update_data(frame, chord, notes, spectrum=analyzer.spectrum)
+        timings['análisis'].record(analyzed - start)
+        timings['update_data'].record(time.perf_counter() - analyzed)
+        # Cuadros del temporizador que caen dentro de este fragmento (el primero ve el resultado nuevo)
+        while next_frame < (i + 1) * chunk_seconds:
+            next_frame += 1 / args.fps
+            refreshes += 1
+            if visualizer.refresh():
+                start = time.perf_counter()
+                full_line.set_data(np.arange(len(frame)), frame)
+                visualizer.ax.draw_artist(full_line)
+                timings['forma sin reducir'].record(time.perf_counter() - start)
+
+    render = visualizer.stats.snapshot()
+    counters = render['counters']
+    print(f"{len(frames)} fragmentos de {args.window} muestras (salto {hop}); {refreshes} cuadros del "
+          f"temporizador a {args.fps:g} FPS: {counters.get('frames', 0)} dibujados, "
+          f"{counters.get('repeated_frames', 0)} sin datos nuevos")
+    print(format_latency({name: h.summary() for name, h in timings.items()}))
+    print(f"\nEtapas de cada cuadro:\n{format_latency(render['latency_ms'])}")
+
+    # CPU por segundo de audio: análisis de todos los fragmentos frente a entrega y dibujo de los cuadros
+    def total(histogram):
+        return histogram.samples[:min(histogram.count, len(histogram.samples))].sum() * histogram.count / max(
+            1, min(histogram.count, len(histogram.samples)))
+    audio_seconds = len(frames) * chunk_seconds
+    analysis = total(timings['análisis']) / audio_seconds
+    delivery = total(timings['update_data']) / audio_seconds
+    prepare = total(visualizer.stats.histograms['render']) / audio_seconds
+    blit = total(visualizer.stats.histograms['blit']) / audio_seconds
+    print(f"\nCPU por segundo de audio: análisis {analysis * 1e3:.1f} ms, entrega {delivery * 1e3:.2f} ms, "
+          f"preparación de cuadros {prepare * 1e3:.1f} ms, rasterizado (blit) {blit * 1e3:.1f} ms")
+    print(f"Dibujo total (preparación + blit): {(prepare + blit) * 1e3:.1f} ms por segundo de audio, "
+          f"{(prepare + blit) / max(analysis, 1e-9):.1f} veces el análisis")
+
+
+if __name__ == "__main__":
+    main()
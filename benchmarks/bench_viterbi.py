@@ -0,0 +1,112 @@
+"""Decodificación de Viterbi frente a la persistencia fragmento a fragmento.
+
+Sintetiza una progresión ruidosa de acordes mayores y menores con duración
+conocida, la analiza con FrequencyAnalyzer.analyze_frames y compara la
+persistencia de ChordDetector.detect_chord con ViterbiDecoder (varias
+penalizaciones por cambio) y con OnlineViterbi (retardo fijo): fragmentos con
+el acorde correcto y número de segmentos frente a los reales. Después mide
+cuánto tarda en decodificarse una hora de cromagramas.
+
+Uso:
+    python benchmarks/bench_viterbi.py [--chords 40] [--noise 0.5] [--penalties 0.5 1 2 4] [--lag 8]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chord_detector import ChordDetector
+from decoding import OnlineViterbi, ViterbiDecoder, path_segments
+from file_analysis import frame_signal
+from frequency_analyzer import FrequencyAnalyzer
+from synthesis import chord_midi_notes, synthesize_chord
+
+
+def noisy_progression(n_chords, seconds, rate, noise, seed):
+    """Progresión aleatoria de tríadas y la etiqueta esperada de cada muestra"""
+    rng = np.random.default_rng(seed)
+    samples = int(seconds * rate)
+    signals, labels = [], []
+    for _ in range(n_chords):
+        root = int(rng.integers(12))
+        chord_type = ['major', 'minor'][rng.integers(2)]
+        intervals = ChordDetector.CHORD_PATTERNS[chord_type]
+        signals.append(synthesize_chord(chord_midi_notes(root, intervals, inversion=int(rng.integers(3))),
+                                        samples, rate, detune_cents=10, noise=noise, rng=rng))
+        labels.append(f"{ChordDetector.NOTES[root]} {chord_type}")
+    return np.concatenate(signals).astype(np.float32), labels, samples
+
+
+def summary(name, predicted, expected, n_segments):
+    accuracy = np.mean([p == e for p, e in zip(predicted, expected)])
+    print(f"{name:<24} {accuracy:9.1%} {n_segments:10d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la decodificación de Viterbi")
+    parser.add_argument("--chords", type=int, default=40, help="Acordes de la progresión")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duración de cada acorde")
+    parser.add_argument("--noise", type=float, default=0.5, help="Ruido relativo al valor eficaz")
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--penalties", type=float, nargs='+', default=[0.5, 1.0, 2.0, 4.0])
+    parser.add_argument("--lag", type=int, default=8, help="Retardo en fragmentos de OnlineViterbi")
+    parser.add_argument("--hours", type=float, default=1.0, help="Duración de la prueba de velocidad")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    signal, labels, samples_per_chord = noisy_progression(args.chords, args.seconds, args.rate, args.noise,
+                                                          args.seed)
+    frames = frame_signal(signal, args.chunk)
+    # Acorde esperado en el centro de cada fragmento
+    centers = np.arange(len(frames)) * args.chunk + args.chunk // 2
+    expected = [labels[i] for i in centers // samples_per_chord]
+    notes = FrequencyAnalyzer(sampling_rate=args.rate).analyze_frames(frames)
+    detector = ChordDetector()
+    chroma = detector.pitch_class_matrix(notes)
+
+    print(f"{args.chords} acordes de {args.seconds:.1f} s con ruido {args.noise}: {len(frames)} fragmentos")
+    print(f"{'Método':<24} {'aciertos':>9} {'segmentos':>10}")
+    print(f"{'(real)':<24} {'':>9} {args.chords:10d}")
+
+    # Persistencia fragmento a fragmento, como en el modo archivo
+    chord = "N/A"
+    framewise = []
+    for window_notes in notes:
+        if window_notes:
+            chord = detector.detect_chord(window_notes)
+        framewise.append(chord)
+    summary("persistencia", framewise, expected, 1 + sum(a != b for a, b in zip(framewise, framewise[1:])))
+
+    for penalty in args.penalties:
+        decoder = ViterbiDecoder(detector, penalty)
+        decoder.push(chroma)
+        path = decoder.decode()
+        summary(f"viterbi p={penalty:g}", [decoder.labels[s] for s in path], expected,
+                len(path_segments(path, decoder.labels, 1.0)))
+
+    for penalty in args.penalties:
+        online = OnlineViterbi(detector, penalty, lag=args.lag)
+        # La decisión de cada fragmento llega ``lag`` fragmentos después (los últimos quedan sin decidir)
+        decided = [online.push(row) for row in chroma][args.lag:]
+        summary(f"online lag={args.lag} p={penalty:g}", decided, expected,
+                1 + sum(a != b for a, b in zip(decided, decided[1:])))
+
+    # Velocidad: una hora de cromagramas (la progresión repetida) decodificada por bloques de 256
+    n_frames = int(args.hours * 3600 * args.rate / args.chunk)
+    tiled = np.resize(chroma, (n_frames, 12))
+    decoder = ViterbiDecoder(detector, args.penalties[0])
+    start = time.perf_counter()
+    for first in range(0, n_frames, 256):
+        decoder.push(tiled[first:first + 256])
+    segments = decoder.segments(args.chunk / args.rate)
+    elapsed = time.perf_counter() - start
+    print(f"\n{args.hours:g} h ({n_frames} fragmentos x {len(decoder.labels)} estados) decodificada en "
+          f"{elapsed:.2f} s: {len(segments)} segmentos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Coste de la clasificación de acordes según el tamaño del vocabulario.
+
+Compara el vocabulario por defecto, ``vocabularies/extended.json`` y
+vocabularios sintéticos de cientos de tipos (conjuntos de intervalos al
+azar, con extensiones de 9ª, 11ª y 13ª). Para cada uno mide:
+
+- la compilación de las plantillas (crear el ChordDetector);
+- la construcción de la tabla por máscara y de las 12 tablas por bajo, que se
+  hacen una sola vez;
+- el coste por fragmento de ``classify_notes`` sin bajo y con bajo, que no
+  depende del tamaño del vocabulario;
+- el coste por fragmento del bucle raíz x patrón con _calculate_match_score
+  (la clasificación original), que crece con cada patrón, y las
+  discrepancias entre su mejor candidato y el de las plantillas. Termina con
+  código 1 si hay alguna (un empate exacto resuelto distinto por redondeo
+  no cuenta).
+
+Uso:
+    python benchmarks/bench_vocabulary.py [--sizes 100 300] [--frames 20000] [--reference-frames 200]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_chord_scoring import reference_best
+from chord_detector import ChordDetector, load_vocabulary
+
+EXTENDED = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vocabularies',
+                        'extended.json')
+
+
+def synthetic_vocabulary(n_types, seed):
+    """Vocabulario de ``n_types`` tipos distintos con tónica y 2 a 5 intervalos más (incluidas extensiones)"""
+    rng = np.random.default_rng(seed)
+    candidates = [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 14, 15, 17, 18, 20, 21]
+    patterns = {}
+    seen = set()
+    while len(patterns) < n_types:
+        intervals = sorted(rng.choice(candidates, size=rng.integers(2, 6), replace=False).tolist())
+        pitch_classes = frozenset(i % 12 for i in intervals)
+        if len(pitch_classes) < len(intervals) or pitch_classes in seen:
+            continue
+        seen.add(pitch_classes)
+        patterns[f"t{len(patterns)}"] = [0] + intervals
+    return {'patterns': patterns, 'interval_weights': {}, 'priorities': {}, 'match_extensions': True,
+            'extra_note_penalty': 0.6}
+
+
+def random_note_lists(n_frames, seed):
+    """Listas de 2 a 6 notas al azar, con octava, y la más grave de cada una como bajo"""
+    rng = np.random.default_rng(seed)
+    note_lists, basses = [], []
+    for _ in range(n_frames):
+        midis = rng.choice(np.arange(36, 84), size=rng.integers(2, 7), replace=False)
+        note_lists.append([f"{ChordDetector.NOTES[m % 12]}{m // 12 - 1}" for m in midis])
+        lowest = midis.min()
+        basses.append(f"{ChordDetector.NOTES[lowest % 12]}{lowest // 12 - 1}")
+    return note_lists, basses
+
+
+def per_frame(function, items):
+    start = time.perf_counter()
+    for item in items:
+        function(*item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del tamaño del vocabulario de acordes")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[100, 300],
+                        help="Tipos de acorde de los vocabularios sintéticos")
+    parser.add_argument("--frames", type=int, default=20000, help="Fragmentos clasificados por vocabulario")
+    parser.add_argument("--reference-frames", type=int, default=200,
+                        help="Fragmentos clasificados con el bucle raíz x patrón")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vocabularies = [('por defecto', None), ('extended.json', load_vocabulary(EXTENDED))]
+    vocabularies += [(f"sintético {n}", synthetic_vocabulary(n, args.seed + n)) for n in args.sizes]
+    note_lists, basses = random_note_lists(args.frames, args.seed)
+    reference_lists = note_lists[:args.reference_frames]
+
+    print(f"{args.frames} fragmentos de 2 a 6 notas al azar; bucle original sobre {len(reference_lists)}")
+    print(f"{'Vocabulario':<15} {'tipos':>5} {'etiquetas':>9} {'compilar':>9} {'tabla':>8} {'12 bajos':>9} "
+          f"{'µs/frag.':>9} {'con bajo':>9} {'bucle µs':>9} {'discrep.':>9}")
+    failed = False
+    for name, vocabulary in vocabularies:
+        start = time.perf_counter()
+        detector = ChordDetector(vocabulary=vocabulary)
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        detector.classify_notes(['C4', 'E4', 'G4'])
+        table_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for bass in detector.NOTES:
+            detector.classify_notes(['C4', 'E4', 'G4'], f"{bass}2")
+        bass_time = time.perf_counter() - start
+
+        plain = per_frame(detector.classify_notes, [(notes,) for notes in note_lists])
+        with_bass = per_frame(detector.classify_notes, list(zip(note_lists, basses)))
+
+        # Bucle original: cada raíz x cada patrón en Python
+        start = time.perf_counter()
+        reference = [reference_best(detector, [detector._extract_note_name(n) for n in notes])
+                     for notes in reference_lists]
+        loop = (time.perf_counter() - start) / len(reference_lists)
+        best, best_score, _ = detector.best_candidates(detector.pitch_class_matrix(reference_lists))
+        # Un empate exacto entre dos acordes se puede resolver distinto por redondeo: solo cuenta
+        # como discrepancia si la puntuación también difiere
+        mismatches = sum((detector.chord_labels[b] if b >= 0 else None) != label and not np.isclose(score, s)
+                         for b, score, (label, s) in zip(best, best_score, reference))
+        failed |= mismatches > 0
+
+        print(f"{name:<15} {len(detector.chord_types):5d} {len(detector.chord_labels):9d} "
+              f"{compile_time * 1e3:7.1f}ms {table_time:7.2f}s {bass_time:8.2f}s {plain * 1e6:9.2f} "
+              f"{with_bass * 1e6:9.2f} {loop * 1e6:9.0f} {mismatches:9d}")
+    if failed:
+        print("ERROR: las plantillas no coinciden con el bucle original")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Suite de rendimiento y precisión con acordes sintéticos.
+
+Genera audio para cada tipo de ChordDetector.CHORD_PATTERNS sobre las 12
+raíces (con inversiones, armónicos, desafinación y ruido configurables), lo
+pasa por el front end de análisis (FrequencyAnalyzer con 'fft' o
+ChromaAnalyzer con 'cqt') + ChordDetector y mide fragmentos por segundo,
+percentiles de latencia por etapa y precisión para cada combinación de front
+end, frecuencia de muestreo y tamaño de fragmento.
+
+Los resultados se pueden guardar como línea base JSON y comparar con ella:
+el script termina con código 1 si el rendimiento o la precisión empeoran más
+allá de los márgenes indicados.
+
+Uso:
+    python benchmarks/chord_suite.py [--rates 44100 48000] [--chunks 2048 4096] [--front-end fft cqt]
+        [--save-baseline benchmarks/baselines/chord_suite.json]
+        [--baseline benchmarks/baselines/chord_suite.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frequency_analyzer import FrequencyAnalyzer
+from chroma import ChromaAnalyzer
+from chord_detector import ChordDetector
+from synthesis import chord_test_set
+
+PERCENTILES = (50, 95, 99)
+
+# Sensibilidad por defecto de cada front end (la misma que usa main.py)
+FRONT_END_SENSITIVITY = {'fft': 0.1, 'cqt': 0.3}
+
+
+def latency_summary(seconds):
+    """Percentiles de latencia en microsegundos"""
+    values = np.percentile(np.asarray(seconds) * 1e6, PERCENTILES)
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, values)}
+
+
+def run_config(front_end, rate, chunk, args):
+    """Ejecuta todos los casos sintéticos con un front end, una frecuencia y un tamaño de fragmento"""
+    cases = chord_test_set(ChordDetector.CHORD_PATTERNS, chunk, rate, inversions=not args.no_inversions,
+                           octave=args.octave, harmonics=args.harmonics, rolloff=args.rolloff,
+                           detune_cents=args.detune, noise=args.noise, seed=args.seed)
+    sensitivity = args.sensitivity or FRONT_END_SENSITIVITY[front_end]
+    detector = ChordDetector(confidence_threshold=args.confidence)
+    if front_end == 'cqt':
+        # El cromagrama del último fragmento se clasifica directamente
+        analyzer = ChromaAnalyzer(sampling_rate=rate, sensitivity=sensitivity)
+        classify = lambda notes: detector.classify_chroma(analyzer.chroma)
+    else:
+        analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=sensitivity)
+        classify = detector.classify_notes
+    expected_sets = {
+        f"{detector.NOTES[root]} {chord_type}": {(root + i) % 12 for i in intervals}
+        for chord_type, intervals in detector.CHORD_PATTERNS.items() for root in range(12)
+    }
+
+    # Calentamiento: espacio de trabajo o núcleo disperso, tabla de notas y tabla de acordes
+    for _, _, signal in cases[:8]:
+        classify(analyzer.analyze(signal))
+
+    analyze_times = []
+    classify_times = []
+    chord_hits = 0
+    set_hits = 0
+    by_type = {chord_type: [0, 0] for chord_type in detector.CHORD_PATTERNS}
+    clock = time.perf_counter
+    for repeat in range(args.repeat):
+        for expected, _, signal in cases:
+            t0 = clock()
+            notes = analyzer.analyze(signal)
+            t1 = clock()
+            status, label, _ = classify(notes)
+            t2 = clock()
+            analyze_times.append(t1 - t0)
+            classify_times.append(t2 - t1)
+            if repeat:
+                continue
+            # La precisión solo se cuenta en la primera pasada (el resultado es determinista)
+            hit = status == detector.CHORD and detector.chord_labels[label] == expected
+            chord_hits += hit
+            set_hits += {detector.PITCH_CLASSES[n[:-1]] for n in notes} == expected_sets[expected]
+            counts = by_type[expected.split(' ', 1)[1]]
+            counts[0] += hit
+            counts[1] += 1
+
+    total_times = np.add(analyze_times, classify_times)
+    return {
+        'front_end': front_end,
+        'rate': rate,
+        'chunk': chunk,
+        'cases': len(cases),
+        'fps': round(len(total_times) / float(total_times.sum()), 1),
+        'latency_us': {
+            'analyze': latency_summary(analyze_times),
+            'classify': latency_summary(classify_times),
+            'total': latency_summary(total_times),
+        },
+        'accuracy': {
+            'chord': round(chord_hits / len(cases), 4),
+            'pitch_classes': round(set_hits / len(cases), 4),
+            'by_type': {t: round(hits / n, 4) for t, (hits, n) in by_type.items()},
+        },
+    }
+
+
+def compare(results, baseline, max_slowdown, max_accuracy_drop):
+    """Devuelve la lista de regresiones respecto a la línea base"""
+    if baseline['settings'] != results['settings']:
+        return ["la configuración de síntesis no coincide con la línea base"]
+    # Las líneas base anteriores al front end 'cqt' son todas 'fft'
+    previous = {(r.get('front_end', 'fft'), r['rate'], r['chunk']): r for r in baseline['configs']}
+    regressions = []
+    for current in results['configs']:
+        old = previous.get((current['front_end'], current['rate'], current['chunk']))
+        if old is None:
+            continue
+        name = f"{current['front_end']} {current['rate']} Hz / {current['chunk']}"
+        if current['fps'] < old['fps'] * (1 - max_slowdown):
+            regressions.append(f"{name}: {current['fps']} fps frente a {old['fps']} en la línea base")
+        for key in ('chord', 'pitch_classes'):
+            if current['accuracy'][key] < old['accuracy'][key] - max_accuracy_drop:
+                regressions.append(f"{name}: precisión '{key}' {current['accuracy'][key]:.2%} "
+                                   f"frente a {old['accuracy'][key]:.2%} en la línea base")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de acordes sintéticos")
+    parser.add_argument("--rates", type=int, nargs='+', default=[44100, 48000])
+    parser.add_argument("--chunks", type=int, nargs='+', default=[2048, 4096, 8192])
+    parser.add_argument("--octave", type=int, default=3, help="Octava de la fundamental (por defecto: 3)")
+    parser.add_argument("--harmonics", type=int, default=4)
+    parser.add_argument("--rolloff", type=float, default=0.6, help="Caída de amplitud por armónico")
+    parser.add_argument("--detune", type=float, default=5.0, help="Desafinación máxima en cents")
+    parser.add_argument("--noise", type=float, default=0.05, help="Ruido relativo al valor eficaz")
+    parser.add_argument("--no-inversions", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--front-end", nargs='+', choices=sorted(FRONT_END_SENSITIVITY), default=['fft'],
+                        help="Front ends de análisis a comparar (por defecto: fft)")
+    parser.add_argument("--sensitivity", type=float,
+                        help="Sensibilidad (por defecto: 0.1 con fft y 0.3 con cqt)")
+    parser.add_argument("--confidence", type=float, default=0.6)
+    parser.add_argument("--repeat", type=int, default=3, help="Pasadas para medir tiempos")
+    parser.add_argument("--baseline", help="Línea base JSON con la que comparar")
+    parser.add_argument("--save-baseline", help="Guardar los resultados como línea base JSON")
+    parser.add_argument("--max-slowdown", type=float, default=0.25,
+                        help="Caída de fps tolerada respecto a la línea base (por defecto: 0.25)")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                        help="Caída de precisión tolerada respecto a la línea base (por defecto: 0.01)")
+    args = parser.parse_args()
+
+    settings = {key: getattr(args, key) for key in (
+        'octave', 'harmonics', 'rolloff', 'detune', 'noise', 'no_inversions', 'seed', 'sensitivity', 'confidence')}
+    # Sin --sensitivity, la línea base registra la sensibilidad por defecto de fft, como antes
+    if settings['sensitivity'] is None:
+        settings['sensitivity'] = FRONT_END_SENSITIVITY['fft']
+    results = {
+        'settings': settings,
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'cpu': platform.processor()},
+        'configs': [],
+    }
+
+    print(f"{'front':>5} {'Hz':>6} {'chunk':>6} {'fps':>9} {'analyze p50/p95/p99 (us)':>27} "
+          f"{'classify p50 (us)':>18} {'acorde':>7} {'notas':>7}")
+    for front_end in args.front_end:
+        for rate in args.rates:
+            for chunk in args.chunks:
+                result = run_config(front_end, rate, chunk, args)
+                results['configs'].append(result)
+                analyze = result['latency_us']['analyze']
+                print(f"{front_end:>5} {rate:>6} {chunk:>6} {result['fps']:>9.1f} "
+                      f"{analyze['p50']:>9.1f}/{analyze['p95']:>7.1f}/{analyze['p99']:>7.1f} "
+                      f"{result['latency_us']['classify']['p50']:>18.1f} "
+                      f"{result['accuracy']['chord']:>7.1%} {result['accuracy']['pitch_classes']:>7.1%}")
+
+    # Precisión por tipo de acorde (media de las configuraciones de cada front end)
+    print("\nPrecisión por tipo de acorde:")
+    print(f"  {'':<11}" + ''.join(f" {front_end:>7}" for front_end in args.front_end))
+    for chord_type in ChordDetector.CHORD_PATTERNS:
+        values = [np.mean([r['accuracy']['by_type'][chord_type] for r in results['configs']
+                           if r['front_end'] == front_end]) for front_end in args.front_end]
+        print(f"  {chord_type:<11}" + ''.join(f" {value:7.1%}" for value in values))
+
+    if args.save_baseline:
+        directory = os.path.dirname(args.save_baseline)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nLínea base guardada en {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_slowdown, args.max_accuracy_drop)
+        if regressions:
+            print("\nERROR: regresiones respecto a la línea base:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nSin regresiones respecto a la línea base")
+
+
+if __name__ == "__main__":
+    main()
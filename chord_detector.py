@@ -1,6 +1,37 @@
+import json
+import os
 import re
+import tempfile
 import numpy as np
 
+
+def load_vocabulary(path):
+    """Lee un vocabulario de acordes en JSON para ``ChordDetector(vocabulary=...)``.
+
+    El archivo es un objeto con ``patterns`` (tipo -> intervalos en
+    semitonos, obligatorio) y, opcionalmente, ``interval_weights`` y
+    ``priorities`` (se combinan con los valores por defecto),
+    ``match_extensions`` (los intervalos de 12 o más, como la 9ª = 14, cuentan
+    por su clase de altura) y ``extra_note_penalty`` (penalización por cada
+    nota detectada que no está en el patrón).
+    """
+    with open(path, encoding='utf-8') as f:
+        vocabulary = json.load(f)
+    patterns = vocabulary.get('patterns') if isinstance(vocabulary, dict) else None
+    if not patterns or not isinstance(patterns, dict):
+        raise ValueError(f"{path}: el vocabulario necesita un objeto 'patterns' no vacío")
+    for chord_type, intervals in patterns.items():
+        if not intervals or not all(isinstance(i, int) and i >= 0 for i in intervals):
+            raise ValueError(f"{path}: los intervalos de '{chord_type}' deben ser enteros no negativos")
+    return {
+        'patterns': {chord_type: list(intervals) for chord_type, intervals in patterns.items()},
+        'interval_weights': {int(i): float(w) for i, w in vocabulary.get('interval_weights', {}).items()},
+        'priorities': {t: float(p) for t, p in vocabulary.get('priorities', {}).items()},
+        'match_extensions': bool(vocabulary.get('match_extensions', False)),
+        'extra_note_penalty': float(vocabulary.get('extra_note_penalty', 0.0)),
+    }
+
+
 class ChordDetector:
     # Patrones básicos de acordes (intervalos relativos)
     CHORD_PATTERNS = {
@@ -48,32 +79,449 @@ class ChordDetector:
         'sus2': 1,       # La prioridad más baja para sus2
     }
     
+    # Reglas opcionales para vocabularios ampliados (por defecto, desactivadas):
+    # las extensiones de 12 o más semitonos cuentan por su clase de altura y cada
+    # nota detectada fuera del patrón resta esta penalización
+    MATCH_EXTENSIONS = False
+    EXTRA_NOTE_PENALTY = 0.0
+    
+    # Ventaja, al elegir entre candidatos, del acorde cuya raíz es el bajo detectado
+    BASS_ROOT_BONUS = 0.05
+    
     # Notas musicales en orden cromático
     NOTES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
     
-    def __init__(self, confidence_threshold=0.6):
+    # Clase de altura de cada nombre de nota, incluidas las enarmonías con bemol
+    PITCH_CLASSES = {
+        'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
+        'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
+    }
+    
+    # Resultados posibles de classify_notes
+    FEW_NOTES = 0       # Menos de 2 notas
+    FEW_UNIQUE = 1      # Menos de 2 notas distintas
+    CHORD = 2           # Acorde con confianza suficiente
+    LOW_CONFIDENCE = 3  # Mejor candidato por debajo del umbral
+    UNRECOGNIZED = 4    # Ningún candidato
+    
+    # Tablas de resultados por configuración, compartidas entre instancias
+    _table_cache = {}
+    
+    def __init__(self, confidence_threshold=0.6, table_path=None, vocabulary=None):
         self.confidence_threshold = confidence_threshold
+        # Vocabulario propio (de load_vocabulary) en lugar de los patrones de la clase
+        if vocabulary is not None:
+            self.CHORD_PATTERNS = vocabulary['patterns']
+            self.INTERVAL_WEIGHTS = {**self.INTERVAL_WEIGHTS, **vocabulary.get('interval_weights', {})}
+            self.CHORD_TYPE_PRIORITY = {**self.CHORD_TYPE_PRIORITY, **vocabulary.get('priorities', {})}
+            self.MATCH_EXTENSIONS = vocabulary.get('match_extensions', self.MATCH_EXTENSIONS)
+            self.EXTRA_NOTE_PENALTY = vocabulary.get('extra_note_penalty', self.EXTRA_NOTE_PENALTY)
         # Para evitar cambios bruscos de acordes (memoria)
         self.previous_chord = None
         self.persistence_count = 0
         # Umbral especial para acordes sus (debe ser más alto para evitar falsos positivos)
         self.sus_threshold = confidence_threshold * 1.2
+        # Confianza del último acorde evaluado
+        self.last_score = 0.0
+        # Plantillas rotadas para puntuar todas las raíces y tipos de una vez
+        self._build_templates()
+        
+        # Cachés para convertir notas en bits de la máscara de clases de altura
+        self._note_name_cache = {}
+        self._note_bits = {name: 1 << pitch_class for name, pitch_class in self.PITCH_CLASSES.items()}
+        
+        # Tabla de resultados en uso, umbrales con los que se obtuvo y tablas por bajo
+        self._table = None
+        self._table_thresholds = None
+        self._bass_tables = {}
+        
+        # Reutilizar una tabla de resultados guardada, o crearla y guardarla
+        if table_path is not None:
+            if not (os.path.exists(table_path) and self.load_table(table_path)):
+                self.save_table(table_path)
+    
+    def _build_templates(self):
+        """Precalcula las plantillas (raíz x tipo) usadas por score_chroma.
+
+        Cada plantilla es un vector de 12 clases de altura. Se apilan en una sola
+        matriz con tres bloques: pesos de intervalo, intervalos del patrón e
+        intervalos esenciales (tónica, tercera y quinta).
+        """
+        self.chord_types = list(self.CHORD_PATTERNS)
+        vocabulary = [self.CHORD_PATTERNS, self.INTERVAL_WEIGHTS, self.CHORD_TYPE_PRIORITY]
+        if self.MATCH_EXTENSIONS or self.EXTRA_NOTE_PENALTY:
+            vocabulary += [self.MATCH_EXTENSIONS, self.EXTRA_NOTE_PENALTY]
+        self._vocabulary_key = json.dumps(vocabulary, sort_keys=True)
+        self.chord_labels = [f"{root} {chord_type}" for root in self.NOTES for chord_type in self.chord_types]
+        n_types = len(self.chord_types)
+        
+        weights = np.zeros((12, n_types, 12))
+        members = np.zeros((12, n_types, 12))
+        essentials = np.zeros((12, n_types, 12))
+        for t, chord_type in enumerate(self.chord_types):
+            for interval in self.CHORD_PATTERNS[chord_type]:
+                # Los intervalos de 12 o más nunca coinciden (se comparan en 0-11),
+                # salvo si el vocabulario hace contar las extensiones
+                if interval >= 12 and not self.MATCH_EXTENSIONS:
+                    continue
+                for root in range(12):
+                    pitch_class = (root + interval) % 12
+                    weights[root, t, pitch_class] = self.INTERVAL_WEIGHTS.get(interval, 0.5)
+                    members[root, t, pitch_class] = 1
+                    if interval in (0, 3, 4, 7):
+                        essentials[root, t, pitch_class] = 1
+        n_templates = 12 * n_types
+        self._template_matrix = np.zeros((24, 3 * n_templates))
+        self._template_matrix[:12, :n_templates] = weights.reshape(-1, 12).T
+        self._template_matrix[12:, n_templates:2 * n_templates] = members.reshape(-1, 12).T
+        self._template_matrix[12:, 2 * n_templates:] = essentials.reshape(-1, 12).T
+        
+        patterns = [self.CHORD_PATTERNS[t] for t in self.chord_types]
+        self._pattern_sizes = np.array([len(p) for p in patterns], dtype=float)
+        self._pattern_has_fifth = np.array([7 in p for p in patterns])
+        self._pattern_has_third = np.array([3 in p or 4 in p for p in patterns])
+        self._pattern_has_sus = np.array([2 in p or 5 in p for p in patterns])
+        self._essential_counts = np.array([sum(i in (0, 3, 4, 7) for i in p) for p in patterns])
+        self._priority_bonus = np.array([self.CHORD_TYPE_PRIORITY.get(t, 0) * 0.01 for t in self.chord_types])
+        self._is_sus_type = np.array([t.startswith('sus') for t in self.chord_types])
+        
+        # Propiedades por etiqueta (raíz x tipo) usadas al elegir el mejor candidato
+        self._label_roots = np.repeat(np.arange(12), n_types)
+        self._label_has_sus = np.array(['sus' in label for label in self.chord_labels])
+        self._label_major_minor = np.array([
+            ('major' in label or 'minor' in label) and 'sus' not in label for label in self.chord_labels
+        ])
+    
+    def pitch_class_vector(self, notes, energies=None):
+        """Convierte una lista de notas en un vector de 12 clases de altura.
+
+        Con ``energies`` el vector acumula la energía de cada nota; si no, es binario.
+        """
+        chroma = np.zeros(12)
+        for i, note in enumerate(notes):
+            name = self._extract_note_name(note)
+            pitch_class = self.PITCH_CLASSES.get(name)
+            if pitch_class is not None:
+                chroma[pitch_class] += energies[i] if energies is not None else 1.0
+        if energies is None:
+            np.minimum(chroma, 1.0, out=chroma)
+        return chroma
+    
+    def score_chroma(self, chroma):
+        """Puntúa las 12 raíces x todos los tipos de acorde con un producto matricial.
+
+        Acepta un vector (12,) o un lote (N, 12), binario o ponderado por energía.
+        Devuelve las puntuaciones de coincidencia (N, 12, tipos) con las mismas
+        reglas que _calculate_match_score; las raíces ausentes valen -inf.
+        """
+        chroma = np.atleast_2d(np.asarray(chroma, dtype=float))
+        n_frames = len(chroma)
+        shape = (n_frames, 12, len(self.chord_types))
+        present = (chroma > 0).astype(float)
+        # Normalizar la energía para que la nota más fuerte pese 1
+        peak = chroma.max(axis=1, keepdims=True)
+        weighted = np.divide(chroma, peak, out=np.zeros_like(chroma), where=peak > 0)
+        
+        # Un único producto: [pesos | presencia] x [plantillas de pesos | patrón | esenciales]
+        products = np.concatenate([weighted, present], axis=1) @ self._template_matrix
+        score, matches, essentials = (block.reshape(shape) for block in np.split(products, 3, axis=1))
+        
+        # Rasgos que dependen solo de la raíz: quinta y tercera presentes
+        roots = np.arange(12)
+        has_root = present[:, roots, None] > 0
+        has_fifth = present[:, (roots + 7) % 12, None] > 0
+        has_third = (present[:, (roots + 3) % 12, None] + present[:, (roots + 4) % 12, None]) > 0
+        
+        score = score - 0.5 * (self._pattern_has_fifth & ~has_fifth)
+        score = score + 0.3 * (self._pattern_has_third & has_third)
+        score = score - 0.2 * (self._pattern_has_sus & has_third)
+        if self.EXTRA_NOTE_PENALTY:
+            # Notas detectadas que el patrón no explica
+            extra = present.sum(axis=1)[:, None, None] - matches
+            score = score - self.EXTRA_NOTE_PENALTY * extra
+        score = np.where(matches < self._pattern_sizes * 0.6, score * 0.7, score)
+        score = score / self._pattern_sizes
+        complete = (self._essential_counts > 0) & (essentials == self._essential_counts)
+        score = score + 0.15 * complete
+        
+        # Solo se consideran como raíz las notas detectadas
+        return np.where(has_root, score, -np.inf)
+    
+    def label_scores(self, chroma):
+        """Puntuación ajustada (N, etiquetas) de cada acorde de chord_labels.
+
+        Incluye la prioridad por tipo; los candidatos no válidos (puntuación
+        mínima o umbral de los sus) valen -inf. Es la matriz sobre la que
+        best_candidates elige y la que usa la decodificación de Viterbi.
+        """
+        scores = self.score_chroma(chroma)
+        # Candidatos válidos: puntuación mínima y umbral más alto para los sus
+        valid = scores > 0.3
+        valid &= ~(self._is_sus_type & (scores < self.sus_threshold))
+        return np.where(valid, scores + self._priority_bonus, -np.inf).reshape(len(scores), -1)
+    
+    def pitch_class_matrix(self, note_lists):
+        """Vectores binarios (N, 12) de clases de altura para una lista de listas de notas"""
+        chroma = np.zeros((len(note_lists), 12))
+        for row, notes in enumerate(note_lists):
+            for note in notes:
+                name = self._note_name_cache.get(note)
+                if name is None:
+                    name = self._note_name_cache[note] = self._extract_note_name(note)
+                pitch_class = self.PITCH_CLASSES.get(name)
+                if pitch_class is not None:
+                    chroma[row, pitch_class] = 1.0
+        return chroma
+    
+    def best_candidates(self, chroma, bass=None):
+        """Elige el mejor acorde para cada vector de clases de altura de un lote.
+
+        Devuelve tres arrays (N,): índice en chord_labels del mejor candidato
+        (-1 si no hay ninguno), su puntuación ajustada y el índice final tras
+        preferir un acorde mayor/menor cercano frente a un sus. Con ``bass``
+        (N,), la clase de altura de la nota más grave de cada vector, los
+        acordes con raíz en el bajo parten con BASS_ROOT_BONUS de ventaja (la
+        puntuación devuelta no la incluye).
+        """
+        adjusted = self.label_scores(chroma)
+        n_frames = len(adjusted)
+        rows = np.arange(n_frames)
+        ranking = adjusted
+        if bass is not None:
+            ranking = adjusted + self.BASS_ROOT_BONUS * (self._label_roots[None, :] == np.asarray(bass)[:, None])
+        
+        # argmax devuelve el primero en caso de empate, en el mismo orden raíz/tipo
+        best = np.argmax(ranking, axis=1)
+        best_rank = ranking[rows, best]
+        has_candidate = np.isfinite(best_rank)
+        best = np.where(has_candidate, best, -1)
+        best_rank = np.where(has_candidate, best_rank, 0.0)
+        best_score = np.where(has_candidate, adjusted[rows, best], 0.0)
+        
+        # Si el mejor es sus, preferir el mejor mayor/menor si está a menos de 0.1
+        major_minor = np.where(self._label_major_minor, ranking, -np.inf)
+        alternative = np.argmax(major_minor, axis=1)
+        alternative_rank = major_minor[rows, alternative]
+        override = (has_candidate & self._label_has_sus[best]
+                    & (best_score >= self.confidence_threshold)
+                    & (best_rank - alternative_rank < 0.1))
+        final = np.where(override, alternative, best)
+        return best, best_score, final
+    
+    def _classify_batch(self, chroma, bass=None):
+        """Estado, etiqueta y puntuación de cada vector de un lote con al menos 2 clases"""
+        best, best_score, final = self.best_candidates(chroma, bass)
+        confident = best_score >= self.confidence_threshold
+        status = np.where(confident, self.CHORD,
+                          np.where(best >= 0, self.LOW_CONFIDENCE, self.UNRECOGNIZED))
+        labels = np.where(confident, final, best)
+        return status, labels, best_score
+    
+    def _classify_masks(self, bass=None):
+        """Clasifica los 4096 conjuntos de clases de altura (con ``bass`` incluido en todos).
+
+        Se evalúan por bloques de máscaras para que la memoria no crezca con el
+        producto máscaras x etiquetas en vocabularios de cientos de acordes.
+        Devuelve los arrays (estado, etiqueta, puntuación) indexados por máscara;
+        con ``bass`` solo se evalúan las 2048 máscaras que lo contienen y cada
+        máscara sin él toma el resultado de la misma máscara con el bajo.
+        """
+        masks = np.arange(4096)
+        if bass is not None:
+            masks = masks[(masks >> bass) & 1 == 1]
+        chroma = ((masks[:, None] >> np.arange(12)) & 1).astype(float)
+        block = max(1, (1 << 22) // (3 * len(self.chord_labels)))
+        results = []
+        for start in range(0, len(chroma), block):
+            rows = chroma[start:start + block]
+            results.append(self._classify_batch(rows, None if bass is None else np.full(len(rows), bass)))
+        columns = tuple(np.concatenate(column) for column in zip(*results))
+        if bass is not None:
+            # Las máscaras con el bajo están ordenadas: posición de (máscara | bajo) entre ellas
+            position = np.searchsorted(masks, np.arange(4096) | (1 << bass))
+            columns = tuple(column[position] for column in columns)
+        return columns
     
-    def detect_chord(self, notes):
-        if not notes or len(notes) < 2:  # Permitir detección con solo 2 notas
+    def _result_table(self):
+        """Devuelve la tabla de resultados para los 4096 conjuntos de clases de altura.
+
+        Para cada máscara de 12 bits guarda el estado (acorde, baja confianza o no
+        reconocido), la etiqueta elegida y su puntuación con los umbrales actuales.
+        Se calcula en un solo lote la primera vez y se comparte entre detectores
+        con la misma configuración.
+        """
+        key = self._table_key()
+        table = self._table_cache.get(key)
+        if table is None:
+            status, labels, best_score = self._classify_masks()
+            table = (status.astype(np.uint8), labels.astype(np.int16), best_score)
+            self._table_cache[key] = table
+        return table
+    
+    def _bass_table(self, bass):
+        """Tabla como la de _result_table para los conjuntos cuya nota más grave es ``bass``.
+
+        Las 12 tablas (una por clase de altura del bajo) se construyen solo al
+        usarse por primera vez. Si la raíz elegida no es el bajo, la etiqueta
+        pasa a ser la del acorde con bajo (ver label_name).
+        """
+        key = self._table_key() + (bass,)
+        table = self._table_cache.get(key)
+        if table is None:
+            status, labels, best_score = self._classify_masks(bass)
+            slash = (labels >= 0) & (self._label_roots[labels] != bass)
+            labels = np.where(slash, len(self.chord_labels) + labels * 12 + bass, labels)
+            table = (status.astype(np.uint8), labels.astype(np.int32), best_score)
+            self._table_cache[key] = table
+        return table
+    
+    def label_name(self, label):
+        """Nombre de una etiqueta de classify_notes.
+
+        Las de acordes con bajo (``len(chord_labels) + acorde * 12 + bajo``)
+        se escriben como "C major/E".
+        """
+        n_labels = len(self.chord_labels)
+        if label < n_labels:
+            return self.chord_labels[label]
+        chord, bass = divmod(label - n_labels, 12)
+        return f"{self.chord_labels[chord]}/{self.NOTES[bass]}"
+    
+    def _table_key(self):
+        """Clave que identifica la tabla de resultados: umbrales y vocabulario"""
+        return (float(self.confidence_threshold), float(self.sus_threshold), self._vocabulary_key)
+    
+    def save_table(self, path):
+        """Guarda la tabla de resultados en un archivo .npz.
+
+        Se escribe exactamente en ``path`` (np.savez añadiría ``.npz`` a un
+        nombre de archivo sin esa extensión) a través de un archivo temporal
+        que se renombra con ``os.replace``, así que otro proceso nunca lee
+        una tabla a medias.
+        """
+        status, labels, scores = self._result_table()
+        confidence, sus, vocabulary = self._table_key()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, status=status, labels=labels, scores=scores,
+                         confidence=confidence, sus=sus, vocabulary=vocabulary)
+            # mkstemp crea el archivo solo legible por su dueño
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def load_table(self, path):
+        """Carga una tabla guardada con save_table si coincide con la configuración actual.
+
+        Devuelve False (sin cargar nada) si el archivo corresponde a otros umbrales
+        u otro vocabulario de acordes.
+        """
+        with np.load(path) as data:
+            key = (float(data['confidence']), float(data['sus']), str(data['vocabulary']))
+            if key != self._table_key():
+                return False
+            self._table_cache[key] = (data['status'], data['labels'], data['scores'])
+        return True
+    
+    def classify_notes(self, notes, bass=None):
+        """Clasifica un conjunto de notas sin tocar el estado de persistencia.
+
+        Devuelve (estado, índice en chord_labels o -1, puntuación). Con
+        ``bass`` (la nota más grave detectada, p. ej. ``FrequencyAnalyzer.bass_note``)
+        se usa la tabla de ese bajo y la etiqueta puede ser la de un acorde
+        con bajo (ver label_name).
+        """
+        if not notes or len(notes) < 2:
+            return self.FEW_NOTES, -1, 0.0
+        
+        # Construir la máscara de clases de altura y contar nombres distintos
+        mask = 0
+        unique_notes = set()
+        for note in notes:
+            name = self._note_name_cache.get(note)
+            if name is None:
+                name = self._note_name_cache[note] = self._extract_note_name(note)
+            unique_notes.add(name)
+            mask |= self._note_bits.get(name, 0)
+        
+        if len(unique_notes) < 2:  # Permitir acordes con solo 2 notas
+            return self.FEW_UNIQUE, -1, 0.0
+        
+        # Reutilizar las tablas mientras no cambien los umbrales
+        thresholds = (self.confidence_threshold, self.sus_threshold)
+        if self._table is None or self._table_thresholds != thresholds:
+            self._table = self._result_table()
+            self._table_thresholds = thresholds
+            self._bass_tables.clear()
+        if bass is None:
+            status, labels, scores = self._table
+        else:
+            bass_class = self.PITCH_CLASSES.get(self._extract_note_name(bass))
+            if bass_class is None:
+                status, labels, scores = self._table
+            else:
+                table = self._bass_tables.get(bass_class)
+                if table is None:
+                    table = self._bass_tables[bass_class] = self._bass_table(bass_class)
+                status, labels, scores = table
+                mask |= 1 << bass_class
+        return int(status[mask]), int(labels[mask]), float(scores[mask])
+    
+    def detect_chord(self, notes, bass=None):
+        status, label, score = self.classify_notes(notes, bass)
+        self.last_score = score
+        return self.update_state(status, label)
+    
+    def classify_chromas(self, chromas):
+        """Clasifica un lote (N, 12) de cromagramas ponderados sin tocar la persistencia.
+
+        A diferencia de classify_notes no pasa por la tabla de máscaras: la
+        energía de cada clase pondera la puntuación. Devuelve tres arrays (N,):
+        estado, índice en chord_labels (o -1) y puntuación.
+        """
+        chromas = np.atleast_2d(np.asarray(chromas, dtype=float))
+        status = np.full(len(chromas), self.FEW_NOTES)
+        labels = np.full(len(chromas), -1)
+        scores = np.zeros(len(chromas))
+        # Igual que con notas: hacen falta al menos 2 clases de altura
+        enough = np.flatnonzero(np.count_nonzero(chromas > 0, axis=1) >= 2)
+        if len(enough):
+            status[enough], labels[enough], scores[enough] = self._classify_batch(chromas[enough])
+        return status, labels, scores
+    
+    def classify_chroma(self, chroma):
+        """classify_chromas para un único cromagrama (12,): devuelve (estado, índice, puntuación)"""
+        status, labels, scores = self.classify_chromas(chroma)
+        return int(status[0]), int(labels[0]), float(scores[0])
+    
+    def detect_chroma(self, chroma):
+        """Como detect_chord, pero a partir de un cromagrama (p. ej. de ChromaAnalyzer)"""
+        status, label, score = self.classify_chroma(chroma)
+        self.last_score = score
+        return self.update_state(status, label)
+    
+    def reset(self):
+        """Olvida el acorde anterior (p. ej. tras un silencio) para no prolongarlo al volver el sonido"""
+        self.previous_chord = None
+        self.persistence_count = 0
+        self.last_score = 0.0
+    
+    def update_state(self, status, label):
+        """Aplica la persistencia temporal al resultado de classify_notes"""
+        if status == self.FEW_NOTES:  # Permitir detección con solo 2 notas
             if self.previous_chord and self.persistence_count < 3:
                 self.persistence_count += 1
                 return self.previous_chord  # Mantener el acorde anterior por estabilidad
             self.previous_chord = None
             return "Insuficientes notas para detectar acorde"
         
-        # Extraer solo los nombres de las notas (sin octava)
-        note_names = [self._extract_note_name(note) for note in notes]
-        
-        # Eliminar duplicados y ordenar
-        unique_notes = sorted(list(set(note_names)), key=lambda x: self.NOTES.index(x) if x in self.NOTES else -1)
-        
-        if len(unique_notes) < 2:  # Permitir acordes con solo 2 notas
+        if status == self.FEW_UNIQUE:
             if self.previous_chord:
                 self.persistence_count += 1
                 if self.persistence_count < 3:
@@ -81,63 +529,20 @@ class ChordDetector:
             self.previous_chord = None
             return "Insuficientes notas únicas para detectar acorde"
         
-        # Probar cada nota como raíz potencial del acorde
-        best_score = 0
-        best_chord = None
-        chord_candidates = []
-        
-        for root_idx, root_note in enumerate(unique_notes):
-            # Reorganizar notas para que la posible raíz sea la primera
-            reordered_notes = unique_notes[root_idx:] + unique_notes[:root_idx]
-            
-            # Convertir a intervalos relativos (semitonos desde la raíz)
-            intervals = self._notes_to_intervals(reordered_notes)
-            
-            # Verificar contra patrones de acordes
-            for chord_type, pattern in self.CHORD_PATTERNS.items():
-                match_score = self._calculate_match_score(intervals, pattern)
-                
-                # Si tiene buena puntuación, agregarlo como candidato
-                if match_score > 0.3:  # Umbral mínimo para considerar un candidato
-                    # Para acordes sus, requerir una puntuación más alta
-                    if chord_type.startswith('sus') and match_score < self.sus_threshold:
-                        continue
-                    
-                    # Aplicar bono de prioridad por tipo de acorde
-                    priority_bonus = self.CHORD_TYPE_PRIORITY.get(chord_type, 0) * 0.01
-                    adjusted_score = match_score + priority_bonus
-                    
-                    chord_candidates.append((f"{root_note} {chord_type}", adjusted_score))
-        
-        # Ordenar candidatos por puntuación (de mayor a menor)
-        chord_candidates.sort(key=lambda x: x[1], reverse=True)
-        
-        # Seleccionar el mejor candidato
-        if chord_candidates:
-            best_chord, best_score = chord_candidates[0]
-        
         # Solo actualizar el acorde anterior si tenemos suficiente confianza
-        if best_score >= self.confidence_threshold:
-            # Verificación adicional: si el mejor acorde es "sus" y hay un acorde mayor/menor cercano,
-            # favorecer el acorde mayor/menor si la diferencia de puntuación es pequeña
-            if best_chord and ('sus' in best_chord):
-                for candidate, score in chord_candidates:
-                    if ('major' in candidate or 'minor' in candidate) and not 'sus' in candidate:
-                        if best_score - score < 0.1:  # Si la diferencia es pequeña
-                            best_chord = candidate
-                            break
-            
-            self.previous_chord = best_chord
+        # (la tabla ya ha favorecido un mayor/menor cercano frente a un sus)
+        if status == self.CHORD:
+            self.previous_chord = self.label_name(label) if label >= 0 else None
             self.persistence_count = 0
-            return best_chord
+            return self.previous_chord
         elif self.previous_chord and self.persistence_count < 3:
             # Mantener el acorde anterior por estabilidad
             self.persistence_count += 1
             return self.previous_chord
         else:
             self.persistence_count = 0
-            if best_chord:
-                return f"{best_chord} (baja confianza)"
+            if status == self.LOW_CONFIDENCE:
+                return f"{self.label_name(label)} (baja confianza)"
             return "Acorde no reconocido"
     
     def _extract_note_name(self, note_with_octave):
@@ -172,7 +577,10 @@ class ChordDetector:
         return intervals
     
     def _calculate_match_score(self, detected_intervals, pattern_intervals):
-        """Calcula una puntuación de coincidencia entre los intervalos detectados y un patrón de acorde"""
+        """Calcula una puntuación de coincidencia entre los intervalos detectados y un patrón de acorde.
+
+        Es la referencia escalar de las reglas que score_chroma aplica de forma vectorizada.
+        """
         if not detected_intervals or not pattern_intervals:
             return 0.0
             
@@ -181,7 +589,7 @@ class ChordDetector:
         # Verificar cuántos intervalos del patrón están presentes
         pattern_matches = 0
         for interval in pattern_intervals:
-            if interval in detected_intervals:
+            if (interval % 12 if self.MATCH_EXTENSIONS else interval) in detected_intervals:
                 # Usar pesos para darle más importancia a ciertos intervalos
                 weight = self.INTERVAL_WEIGHTS.get(interval, 0.5)
                 score += weight
@@ -206,6 +614,9 @@ class ChordDetector:
         if (2 in pattern_intervals or 5 in pattern_intervals) and has_third:
             score -= 0.2
         
+        # Penalización (opcional) por las notas detectadas que el patrón no explica
+        score -= self.EXTRA_NOTE_PENALTY * (len(set(detected_intervals)) - pattern_matches)
+        
         # Si detectamos muy pocos de los intervalos del patrón, fuerte penalización
         if pattern_matches < len(pattern_intervals) * 0.6:
             score *= 0.7
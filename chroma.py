@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class _SpectralKernel:
+    """Núcleo constant-Q disperso para un tamaño de fragmento y una frecuencia de muestreo.
+
+    Cada fila es el espectro (conjugado) de una sinusoide compleja con ventana
+    de Hann centrada en la frecuencia de un semitono. Aplicado al espectro de
+    la rfft de un fragmento da la magnitud de cada semitono con resolución
+    constante en escala logarítmica (Brown y Puckette, 1992). Casi todos los
+    coeficientes son despreciables, así que se guarda como matriz CSR.
+    """
+
+    def __init__(self, n_samples, sampling_rate, fmin, n_bins, sparsity):
+        # Q de un filtro por semitono: la ventana de cada bin abarca Q periodos
+        q = 1 / (2 ** (1 / 12) - 1)
+        freqs = fmin * 2 ** (np.arange(n_bins) / 12)
+        rows = np.zeros((n_bins, n_samples // 2 + 1), dtype=np.complex64)
+        frame = np.zeros(n_samples, dtype=np.complex128)
+        for k, freq in enumerate(freqs):
+            # Las frecuencias graves se limitan al tamaño del fragmento (menos resolución)
+            length = min(n_samples, int(np.ceil(q * sampling_rate / freq)))
+            window = np.hanning(length)
+            start = (n_samples - length) // 2
+            frame[:] = 0
+            frame[start:start + length] = window / window.sum() * np.exp(2j * np.pi * freq * np.arange(length) / sampling_rate)
+            spectrum = np.fft.fft(frame)[:n_samples // 2 + 1]
+            magnitude = np.abs(spectrum)
+            spectrum[magnitude < sparsity * magnitude.max()] = 0
+            rows[k] = np.conj(spectrum)
+        # Se aplica como X @ matrix: (fragmentos, bins de rfft) -> (fragmentos, semitonos).
+        # scipy se importa aquí para que --list y el front end fft no lo carguen
+        import scipy.sparse
+        self.matrix = scipy.sparse.csr_matrix(rows.T)
+        self.freqs = freqs
+
+
+class ChromaAnalyzer:
+    """Front end constant-Q: del audio a un cromagrama de 12 clases de altura.
+
+    Alternativa a FrequencyAnalyzer que, en lugar de buscar picos en el
+    espectro lineal de la FFT, proyecta el espectro sobre un semitono por bin
+    (de C1 a B7) con un único producto por una matriz dispersa precalculada una
+    vez por (frecuencia de muestreo, tamaño de fragmento). Los semitonos que
+    son máximos locales y superan ``sensitivity`` veces el más fuerte se
+    pliegan a su clase de altura; el vector resultante (``chroma``) alimenta
+    directamente a ``ChordDetector.detect_chroma``.
+    """
+
+    # Primer semitono (C1) y número de octavas analizadas
+    FMIN = 32.703
+    OCTAVES = 7
+
+    NOTES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+    # Núcleos por configuración, compartidos entre instancias
+    _kernel_cache = {}
+
+    def __init__(self, sampling_rate=44100, sensitivity=0.3, sparsity=0.01):
+        self.sampling_rate = sampling_rate
+        self.sensitivity = sensitivity  # Umbral relativo al semitono más fuerte (0.01-1.0)
+        self.sparsity = sparsity  # Coeficientes del núcleo por debajo de esta fracción se descartan
+        n_bins = 12 * self.OCTAVES
+        # Solo semitonos por debajo de la frecuencia de Nyquist
+        while n_bins > 12 and self.FMIN * 2 ** ((n_bins - 1) / 12) >= sampling_rate / 2:
+            n_bins -= 12
+        self.n_bins = n_bins
+        self._note_names = [f"{self.NOTES[k % 12]}{1 + k // 12}" for k in range(n_bins)]
+        # Cromagrama del último fragmento y de la última matriz analizada
+        self.chroma = np.zeros(12)
+        self.chromas = np.zeros((0, 12))
+        # PipelineStats opcional para medir cada etapa de analyze
+        self.stats = None
+
+    def _kernel(self, n_samples):
+        """Devuelve (creándolo la primera vez) el núcleo disperso para un tamaño"""
+        key = (self.sampling_rate, n_samples, self.FMIN, self.n_bins, self.sparsity)
+        kernel = self._kernel_cache.get(key)
+        if kernel is None:
+            kernel = self._kernel_cache[key] = _SpectralKernel(n_samples, self.sampling_rate, self.FMIN,
+                                                               self.n_bins, self.sparsity)
+        return kernel
+
+    def constant_q(self, frames):
+        """Magnitud constant-Q (fragmentos, semitonos) de una matriz (fragmentos, muestras)"""
+        import scipy.fft
+        frames = np.atleast_2d(frames)
+        spectrum = scipy.fft.rfft(frames.astype(np.float32, copy=False), axis=-1)
+        return np.abs(spectrum @ self._kernel(frames.shape[-1]).matrix)
+
+    def analyze(self, audio_data, min_amplitude=0.005):
+        """Analiza un fragmento: deja su cromagrama en ``chroma`` y devuelve sus notas"""
+        notes = self.analyze_frames(audio_data[None, :], min_amplitude)[0]
+        self.chroma = self.chromas[0]
+        return notes
+
+    def analyze_frames(self, frames, min_amplitude=0.005):
+        """Analiza una matriz (fragmentos, muestras) con un único producto disperso.
+
+        Deja los cromagramas en ``chromas`` (fragmentos, 12), normalizados para
+        que la clase más fuerte valga 1, y devuelve una lista de notas por
+        fragmento: una por clase presente, con la octava de su semitono más
+        fuerte, de mayor a menor energía.
+        """
+        stats = self.stats
+        frames = np.atleast_2d(frames)
+        n_frames = len(frames)
+        self.chromas = chromas = np.zeros((n_frames, 12))
+        results = [[] for _ in range(n_frames)]
+        if n_frames == 0:
+            return results
+        amplitudes = np.maximum(frames.max(axis=1), -frames.min(axis=1))
+        active = np.flatnonzero(amplitudes > min_amplitude)
+        if len(active) == 0:
+            if stats is not None:
+                stats.lap('normalize')
+            return results
+
+        # Energía por semitono; el umbral es relativo, así que no hace falta normalizar la señal
+        energy = self.constant_q(frames[active]) ** 2
+        if stats is not None:
+            stats.lap('constant_q')
+
+        # Solo los máximos locales entre semitonos vecinos (descarta la fuga a los adyacentes)
+        peaks = np.zeros_like(energy)
+        inner = energy[:, 1:-1]
+        local_max = (inner >= energy[:, :-2]) & (inner >= energy[:, 2:])
+        peaks[:, 1:-1] = np.where(local_max, inner, 0.0)
+        peaks /= peaks.max(axis=1, keepdims=True) + 1e-20
+        peaks[peaks < self.sensitivity] = 0.0
+
+        # Plegar las octavas: cada clase toma su semitono más fuerte
+        by_octave = peaks.reshape(len(active), -1, 12)
+        strongest = by_octave.argmax(axis=1)
+        chromas[active] = by_octave.max(axis=1)
+        names = self._note_names
+        for row, frame in enumerate(active):
+            chroma = chromas[frame]
+            for pitch_class in np.argsort(-chroma, kind='stable')[:np.count_nonzero(chroma)]:
+                results[frame].append(names[strongest[row, pitch_class] * 12 + pitch_class])
+        if stats is not None:
+            stats.lap('notes')
+        return results
@@ -0,0 +1,168 @@
+import numpy as np
+
+# Etiqueta del estado sin acorde (el primero, así que gana los empates)
+NO_CHORD = "Sin acorde"
+
+
+def _forward(delta, emissions, switch_penalty, stay, jump):
+    """Avanza la recursión de Viterbi en espacio logarítmico por un bloque de fragmentos.
+
+    Con una penalización uniforme por cambio de acorde, el mejor predecesor de
+    cada estado es él mismo o el mejor estado del fragmento anterior, así que
+    cada paso cuesta O(etiquetas) en lugar de O(etiquetas²). Escribe en
+    ``stay`` (fragmentos, etiquetas) si cada estado viene de sí mismo y en
+    ``jump`` (fragmentos,) el mejor estado anterior. Devuelve el nuevo ``delta``.
+    """
+    for t, emission in enumerate(emissions):
+        if delta is None:
+            stay[t] = True
+            jump[t] = 0
+            delta = emission.copy()
+        else:
+            best = int(np.argmax(delta))
+            threshold = delta[best] - switch_penalty
+            np.greater_equal(delta, threshold, out=stay[t])
+            jump[t] = best
+            np.maximum(delta, threshold, out=delta)
+            delta += emission
+        # Renormalizar para que los valores no crezcan sin límite en archivos largos
+        delta -= delta.max()
+    return delta
+
+
+def _backtrack(stay, jump, state, path):
+    """Recorre los punteros hacia atrás desde ``state`` y rellena ``path``"""
+    for t in range(len(stay) - 1, -1, -1):
+        path[t] = state
+        if not stay[t, state]:
+            state = jump[t]
+    return state
+
+
+def viterbi_path(emissions, switch_penalty=1.0):
+    """Secuencia de estados más probable para una matriz (fragmentos, estados) de log-puntuaciones.
+
+    Cada cambio de estado entre fragmentos consecutivos cuesta ``switch_penalty``.
+    """
+    emissions = np.asarray(emissions, dtype=float)
+    n_frames, n_states = emissions.shape
+    path = np.zeros(n_frames, dtype=np.intp)
+    if n_frames == 0:
+        return path
+    stay = np.empty((n_frames, n_states), dtype=bool)
+    jump = np.empty(n_frames, dtype=np.intp)
+    delta = _forward(None, emissions, switch_penalty, stay, jump)
+    _backtrack(stay, jump, int(np.argmax(delta)), path)
+    return path
+
+
+class ViterbiDecoder:
+    """Decodificación de Viterbi de la secuencia de acordes de un archivo completo.
+
+    Los estados son "sin acorde" más todas las etiquetas de ChordDetector. La
+    emisión de cada fragmento es la puntuación ajustada de ``label_scores``
+    (el estado sin acorde vale el umbral de confianza) y los fragmentos con
+    menos de 2 clases de altura no aportan información. Los cromagramas se
+    añaden por bloques con ``push``: solo se guardan los punteros hacia atrás
+    (un booleano por fragmento y estado), nunca la matriz de puntuaciones.
+    """
+
+    def __init__(self, detector, switch_penalty=1.0):
+        self.detector = detector
+        self.switch_penalty = switch_penalty
+        self.labels = [NO_CHORD] + detector.chord_labels
+        self._delta = None
+        self._stay = []
+        self._jump = []
+
+    def emissions(self, chroma):
+        """Log-puntuaciones (fragmentos, estados) de un lote de cromagramas (fragmentos, 12)"""
+        chroma = np.atleast_2d(chroma)
+        emissions = np.zeros((len(chroma), len(self.labels)))
+        informative = np.count_nonzero(chroma > 0, axis=1) >= 2
+        if informative.any():
+            emissions[informative, 0] = self.detector.confidence_threshold
+            emissions[informative, 1:] = self.detector.label_scores(chroma[informative])
+        return emissions
+
+    def push(self, chroma):
+        """Avanza la decodificación con un bloque de cromagramas (fragmentos, 12)"""
+        emissions = self.emissions(chroma)
+        stay = np.empty(emissions.shape, dtype=bool)
+        jump = np.empty(len(emissions), dtype=np.intp)
+        self._delta = _forward(self._delta, emissions, self.switch_penalty, stay, jump)
+        self._stay.append(stay)
+        self._jump.append(jump)
+
+    def decode(self):
+        """Devuelve el índice de estado (en ``labels``) de cada fragmento añadido"""
+        if self._delta is None:
+            return np.zeros(0, dtype=np.intp)
+        stay = np.concatenate(self._stay)
+        jump = np.concatenate(self._jump)
+        path = np.empty(len(stay), dtype=np.intp)
+        _backtrack(stay, jump, int(np.argmax(self._delta)), path)
+        return path
+
+    def segments(self, frame_duration, window_duration=None):
+        """Decodifica y agrupa los fragmentos en segmentos (inicio, fin, acorde) en segundos.
+
+        El fragmento i empieza en ``i * frame_duration``; el último segmento
+        termina al acabar su ventana (``window_duration``, por defecto un salto).
+        """
+        return path_segments(self.decode(), self.labels, frame_duration, window_duration)
+
+
+def path_segments(path, labels, frame_duration, window_duration=None):
+    """Agrupa una secuencia de estados en segmentos (inicio, fin, etiqueta) en segundos"""
+    if len(path) == 0:
+        return []
+    window_duration = frame_duration if window_duration is None else window_duration
+    starts = np.concatenate(([0], np.flatnonzero(path[1:] != path[:-1]) + 1))
+    ends = np.append(starts[1:] * frame_duration, (len(path) - 1) * frame_duration + window_duration)
+    return [(float(start * frame_duration), float(end), labels[path[start]]) for start, end in zip(starts, ends)]
+
+
+class OnlineViterbi:
+    """Viterbi de retardo fijo para el análisis en vivo.
+
+    Cada fragmento avanza la recursión y se decide el estado de hace ``lag``
+    fragmentos recorriendo solo los últimos ``lag`` punteros, guardados en un
+    buffer circular: la latencia añadida es de ``lag`` saltos y el coste por
+    fragmento no depende de la duración de la sesión.
+    """
+
+    def __init__(self, detector, switch_penalty=1.0, lag=8):
+        self.decoder = ViterbiDecoder(detector, switch_penalty)
+        self.labels = self.decoder.labels
+        self.lag = lag
+        n_states = len(self.labels)
+        self._stay = np.empty((lag + 1, n_states), dtype=bool)
+        self._jump = np.empty(lag + 1, dtype=np.intp)
+        self._path = np.empty(lag + 1, dtype=np.intp)
+        self._order = np.arange(lag + 1)
+        self._emissions = np.empty((lag + 1, n_states))
+        self._delta = None
+        self.frames = 0
+        # Puntuación del estado decidido en su fragmento (la confianza que se muestra)
+        self.last_score = 0.0
+
+    def push(self, chroma):
+        """Añade un cromagrama (12,) y devuelve la etiqueta decidida para hace ``lag`` fragmentos.
+
+        Devuelve None mientras no hay fragmentos suficientes.
+        """
+        emission = self.decoder.emissions(chroma)
+        slot = self.frames % (self.lag + 1)
+        self._delta = _forward(self._delta, emission, self.decoder.switch_penalty,
+                               self._stay[slot:slot + 1], self._jump[slot:slot + 1])
+        self._emissions[slot] = emission[0]
+        self.frames += 1
+        if self.frames <= self.lag:
+            return None
+        # Punteros en orden cronológico: el más antiguo está justo después del actual
+        order = np.roll(self._order, -(slot + 1))
+        _backtrack(self._stay[order], self._jump[order], int(np.argmax(self._delta)), self._path)
+        state = self._path[0]
+        self.last_score = float(self._emissions[order[0], state])
+        return self.labels[state]
@@ -0,0 +1,60 @@
+import json
+import sys
+
+
+class NDJSONWriter:
+    """Escribe eventos de cambio de acorde como JSON delimitado por líneas (NDJSON).
+
+    Cada línea es un objeto independiente con ``timestamp``, ``chord``, ``notes``
+    y ``confidence``, de modo que otro proceso puede consumir la salida en vivo.
+    """
+
+    def __init__(self, path=None):
+        # Sin ruta (o con '-') se escribe en la salida estándar
+        self.path = path
+        if path in (None, '-'):
+            self.stream = sys.stdout
+            self._owns_stream = False
+        else:
+            self.stream = open(path, 'w', encoding='utf-8')
+            self._owns_stream = True
+        self.last_chord = None
+
+    def write_event(self, timestamp, chord, notes, confidence, file=None, channel=None):
+        """Escribe un evento y vacía el buffer para que el consumidor lo vea al instante.
+
+        Con ``file`` el evento indica de qué archivo procede (análisis de varios
+        archivos) y con ``channel``, de qué canal (entrada multicanal).
+        """
+        event = {
+            'timestamp': round(timestamp, 6),
+            'chord': chord,
+            'notes': list(notes),
+            'confidence': round(float(confidence), 4),
+        }
+        if file is not None:
+            event['file'] = file
+        if channel is not None:
+            event['channel'] = channel
+        self.stream.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+    def write_segment(self, start, end, chord, file=None):
+        """Escribe un segmento de acorde (inicio y fin en segundos) de la decodificación Viterbi"""
+        event = {'start': round(start, 6), 'end': round(end, 6), 'chord': chord}
+        if file is not None:
+            event['file'] = file
+        self.stream.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+    def write_change(self, timestamp, chord, notes, confidence):
+        """Escribe el evento solo si el acorde cambió respecto al último escrito"""
+        if chord == self.last_chord:
+            return False
+        self.last_chord = chord
+        self.write_event(timestamp, chord, notes, confidence)
+        return True
+
+    def close(self):
+        if self._owns_stream:
+            self.stream.close()
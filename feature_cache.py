@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+import numpy as np
+
+# Versión del formato de los archivos de la caché (forma parte de la clave)
+CACHE_VERSION = 1
+
+# Tamaño máximo por defecto de la caché en disco
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+class FeatureCache:
+    """Caché en disco de las notas por ventana de un archivo de audio.
+
+    Cada entrada guarda las notas detectadas en cada ventana de un archivo (o
+    de un tramo) y se identifica por el hash del contenido del archivo más la
+    configuración de análisis (frecuencia, ventana, salto, sensibilidad...).
+    Cambiar solo los parámetros del detector reutiliza las notas y evita
+    repetir la FFT y la búsqueda de picos.
+
+    Las entradas son .npz sin comprimir con las notas como índices uint8 en
+    una tabla de nombres y los desplazamientos de cada ventana. Se escriben en
+    un archivo temporal que se renombra con ``os.replace``, así que varios
+    procesos pueden leer y escribir a la vez sin ver nunca una entrada a
+    medias. Cada lectura actualiza la fecha de modificación y, al superar
+    ``max_bytes``, se borran las entradas usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def content_hash(path, block_size=1 << 20):
+        """Hash BLAKE2b del contenido de un archivo, leído por bloques"""
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def key(self, content_hash, **settings):
+        """Clave de una entrada: hash del contenido más la configuración de análisis"""
+        description = json.dumps([CACHE_VERSION, content_hash, settings], sort_keys=True)
+        return hashlib.blake2b(description.encode(), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def load(self, key):
+        """Devuelve la lista de notas por ventana guardada con ``key``, o None si no existe"""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                names = data['names'].tolist()
+                offsets = data['offsets'].tolist()
+                flat = [names[i] for i in data['notes'].tolist()]
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Ausente, borrada por otro proceso o dañada: se recalcula
+            self.misses += 1
+            return None
+        try:
+            # Marcar la entrada como usada recientemente (para el LRU)
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return [flat[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def store(self, key, note_lists):
+        """Guarda la lista de notas por ventana de forma atómica y aplica el límite de tamaño"""
+        names = sorted({note for notes in note_lists for note in notes})
+        index = {name: i for i, name in enumerate(names)}
+        offsets = np.zeros(len(note_lists) + 1, dtype=np.int64)
+        np.cumsum([len(notes) for notes in note_lists], out=offsets[1:])
+        notes = np.fromiter((index[note] for window in note_lists for note in window), dtype=np.uint8,
+                            count=int(offsets[-1]))
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, names=np.array(names, dtype=str), offsets=offsets, notes=notes)
+            # mkstemp crea el archivo solo legible por su dueño; la caché puede ser compartida
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def entries(self):
+        """Lista (fecha de uso, tamaño, ruta) de las entradas de la caché"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.npz'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        """Bytes ocupados por las entradas de la caché"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Borra las entradas usadas hace más tiempo hasta quedar por debajo de ``max_bytes``"""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Otro proceso la borró antes
+                pass
+            total -= size
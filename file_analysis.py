@@ -0,0 +1,345 @@
+import os
+import struct
+import numpy as np
+from frequency_analyzer import FrequencyAnalyzer
+from chord_detector import ChordDetector
+from decoding import ViterbiDecoder
+
+# Extensiones tratadas como PCM crudo (sin cabecera)
+RAW_EXTENSIONS = ('.raw', '.pcm')
+
+# Formatos de muestra admitidos para PCM crudo y su factor de escala a [-1, 1]
+RAW_FORMATS = {
+    'int16': (np.int16, 32768.0),
+    'int32': (np.int32, 2147483648.0),
+    'float32': (np.float32, 1.0),
+}
+
+
+# Códigos de formato de la cabecera WAV
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioFileReader:
+    """Lectura por bloques de WAV o PCM crudo mediante ``np.memmap``.
+
+    Cada lectura proyecta solo el tramo pedido del archivo y lo convierte a
+    mono float32, así que la memoria usada depende del tamaño del bloque y no
+    de la duración de la grabación. Los formatos que no se pueden proyectar
+    (FLAC, WAV comprimido) se cargan enteros con soundfile.
+    """
+
+    def __init__(self, path, raw_rate=44100, raw_format='int16', raw_channels=1):
+        self.path = path
+        self._samples = None
+        ext = os.path.splitext(path)[1].lower()
+        if ext in RAW_EXTENSIONS:
+            if raw_format not in RAW_FORMATS:
+                raise ValueError(f"Formato PCM no soportado: {raw_format}")
+            dtype, self.scale = RAW_FORMATS[raw_format]
+            self.dtype = np.dtype(dtype)
+            self.rate = raw_rate
+            self.channels = raw_channels
+            self.offset = 0
+            data_size = os.path.getsize(path)
+        else:
+            header = _parse_wav_header(path) if ext == '.wav' else None
+            if header is None:
+                # Sin proyección posible: toda la señal en memoria
+                self._samples, self.rate = _load_soundfile(path)
+                self.channels = 1
+                self.length = len(self._samples)
+                return
+            self.dtype, self.scale, self.rate, self.channels, self.offset, data_size = header
+        self.frame_bytes = self.dtype.itemsize * self.channels
+        self.length = (data_size // self.frame_bytes) if self.frame_bytes else 0
+
+    def read(self, start, count, out=None):
+        """Devuelve ``count`` muestras mono float32 desde la muestra ``start``"""
+        count = max(0, min(count, self.length - start))
+        if self._samples is not None:
+            if out is None:
+                return self._samples[start:start + count]
+            out[:count] = self._samples[start:start + count]
+            return out[:count]
+        if out is None:
+            out = np.empty(count, dtype=np.float32)
+        if not count:
+            return out[:0]
+        # Proyectar solo este tramo; al salir de la función se libera la proyección
+        data = np.memmap(self.path, dtype=self.dtype, mode='r', offset=self.offset + start * self.frame_bytes,
+                         shape=(count, self.channels))
+        return _to_mono(data, self.scale, out=out[:count])
+
+
+def _parse_wav_header(path):
+    """Localiza el formato y el bloque de datos de un WAV sin leer las muestras.
+
+    Devuelve (dtype, escala, frecuencia, canales, desplazamiento, bytes de
+    datos), o None si el WAV no es PCM entero o float de 32 bits.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        # RF64 es la variante de WAV para archivos de más de 4 GB
+        if len(riff) < 12 or riff[:4] not in (b'RIFF', b'RF64') or riff[8:12] != b'WAVE':
+            raise ValueError(f"No es un archivo WAV válido: {path}")
+        fmt = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                f.seek(chunk_size % 2, 1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    return None
+                offset = f.tell()
+                # Grabaciones muy largas o en curso pueden declarar un tamaño inválido
+                if chunk_size in (0, 0xFFFFFFFF) or offset + chunk_size > file_size:
+                    chunk_size = file_size - offset
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+    format_code, channels, rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+    if format_code == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_code = struct.unpack('<H', fmt[24:26])[0]
+    if format_code == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        dtype, scale = np.dtype('<f4'), 1.0
+    elif format_code != WAVE_FORMAT_PCM:
+        return None
+    elif bits == 8:
+        dtype, scale = np.dtype(np.uint8), 128.0
+    elif bits == 16:
+        dtype, scale = np.dtype('<i2'), 32768.0
+    elif bits == 24:
+        # Se proyecta como bytes y se expande a 32 bits al convertir
+        dtype, scale = np.dtype('V3'), 2147483648.0
+    elif bits == 32:
+        dtype, scale = np.dtype('<i4'), 2147483648.0
+    else:
+        raise ValueError(f"Ancho de muestra no soportado: {bits} bits")
+    return dtype, scale, rate, channels, offset, chunk_size
+
+
+def load_audio(path, raw_rate=44100, raw_format='int16', raw_channels=1):
+    """Carga un archivo WAV, FLAC o PCM crudo como señal mono float32.
+
+    Devuelve una tupla (muestras, frecuencia_de_muestreo).
+    """
+    reader = AudioFileReader(path, raw_rate=raw_rate, raw_format=raw_format, raw_channels=raw_channels)
+    return reader.read(0, reader.length), reader.rate
+
+
+def _load_soundfile(path):
+    """Lee FLAC (y WAV no enteros) mediante soundfile, si está instalado"""
+    try:
+        import soundfile
+    except ImportError:
+        raise RuntimeError(f"Se necesita el paquete 'soundfile' para leer {path}")
+    data, rate = soundfile.read(path, dtype='float32', always_2d=True)
+    return _to_mono(data, 1.0), rate
+
+
+def _to_mono(data, scale, out=None):
+    """Convierte un array (muestras, canales) a mono float32 en [-1, 1]"""
+    if data.dtype == np.uint8:
+        # PCM de 8 bits sin signo, centrado en 128
+        data = data.astype(np.int16) - 128
+    elif data.dtype.kind == 'V':
+        # Expandir muestras de 24 bits a enteros de 32 bits
+        packed = data.view(np.uint8).reshape(len(data), data.shape[1], 3)
+        expanded = np.zeros(packed.shape[:2] + (4,), dtype=np.uint8)
+        expanded[..., 1:] = packed
+        data = expanded.view('<i4')[..., 0]
+    if out is None:
+        out = np.empty(len(data), dtype=np.float32)
+    if data.shape[1] == 1:
+        out[:] = data[:, 0]
+    else:
+        np.mean(data, axis=1, dtype=np.float32, out=out)
+    if scale != 1.0:
+        out /= np.float32(scale)
+    return out
+
+
+def frame_signal(samples, chunk_size, hop_size=None):
+    """Divide la señal en ventanas de ``chunk_size`` cada ``hop_size`` muestras sin copiar.
+
+    Devuelve una vista 2-D (ventanas, muestras). La última ventana incompleta se
+    descarta, igual que en la captura en vivo, donde PortAudio solo entrega
+    bloques completos.
+    """
+    hop_size = hop_size or chunk_size
+    n_frames = max(0, (len(samples) - chunk_size) // hop_size + 1)
+    stride = samples.strides[0]
+    return np.lib.stride_tricks.as_strided(samples, shape=(n_frames, chunk_size),
+                                           strides=(hop_size * stride, stride), writeable=False)
+
+
+def count_windows(n_samples, chunk_size, hop_size):
+    """Número de ventanas completas de ``chunk_size`` muestras cada ``hop_size``"""
+    return max(0, (n_samples - chunk_size) // hop_size + 1)
+
+
+def iter_window_notes(reader, analyzer, chunk_size, hop_size, block_frames=256, start=0, stop=None,
+                      progress=None):
+    """Genera las notas de las ventanas ``start``..``stop`` de un archivo abierto con AudioFileReader.
+
+    Las ventanas se leen por bloques de ``block_frames`` en un buffer reutilizado
+    y se analizan con ``analyze_frames`` sobre una vista sin copias.
+    """
+    n_frames = count_windows(reader.length, chunk_size, hop_size)
+    stop = n_frames if stop is None else min(stop, n_frames)
+    block = np.empty((block_frames - 1) * hop_size + chunk_size, dtype=np.float32)
+    for first in range(start, stop, block_frames):
+        count = min(block_frames, stop - first)
+        samples = reader.read(first * hop_size, (count - 1) * hop_size + chunk_size, out=block)
+        yield from analyzer.analyze_frames(frame_signal(samples, chunk_size, hop_size))
+        if progress is not None:
+            progress(first + count - start, stop - start)
+
+
+def cached_window_notes(reader, analyzer, chunk_size, hop_size, cache, content_hash, raw_format='int16',
+                        block_frames=256, start=0, stop=None, progress=None, cache_frames=4096):
+    """Genera las notas de las ventanas ``start``..``stop`` reutilizando las guardadas en una FeatureCache.
+
+    Las ventanas se guardan en entradas de ``cache_frames`` ventanas como
+    mucho, así que en memoria solo está la lista de notas de un tramo y no la
+    del archivo entero. La clave de cada entrada combina ``content_hash`` con
+    todo lo que cambia las notas (frecuencia, formato, ventana, salto,
+    sensibilidad, tolerancia, distancia entre picos) y su tramo. Los tramos
+    sin entrada se analizan con ``iter_window_notes`` y se guardan.
+    """
+    n_frames = count_windows(reader.length, chunk_size, hop_size)
+    stop = n_frames if stop is None else min(stop, n_frames)
+    settings = dict(rate=reader.rate, raw_format=raw_format, chunk_size=chunk_size, hop_size=hop_size,
+                    sensitivity=analyzer.sensitivity, freq_tolerance=analyzer.freq_tolerance,
+                    peak_distance=analyzer.peak_distance)
+    for first in range(start, stop, cache_frames):
+        last = min(first + cache_frames, stop)
+        key = cache.key(content_hash, start=first, stop=last, **settings)
+        windows = cache.load(key)
+        if windows is None:
+            # El progreso de cada tramo se cuenta desde el principio de todo el recorrido
+            block_progress = None if progress is None else \
+                (lambda done, total, offset=first - start: progress(offset + done, stop - start))
+            windows = list(iter_window_notes(reader, analyzer, chunk_size, hop_size, block_frames=block_frames,
+                                             start=first, stop=last, progress=block_progress))
+            cache.store(key, windows)
+        elif progress is not None:
+            progress(last - start, stop - start)
+        yield from windows
+
+
+def _file_window_notes(path, reader, analyzer, chunk_size, hop_size, raw_format, block_frames, cache, progress):
+    """Notas por ventana de un archivo completo, desde la caché si se indica una"""
+    if cache is None:
+        return iter_window_notes(reader, analyzer, chunk_size, hop_size, block_frames=block_frames,
+                                 progress=progress)
+    return cached_window_notes(reader, analyzer, chunk_size, hop_size, cache, cache.content_hash(path),
+                               raw_format=raw_format, block_frames=block_frames, progress=progress)
+
+
+def iter_timeline(path, sensitivity=0.1, confidence_threshold=0.6, chunk_size=4096,
+                  raw_rate=44100, raw_format='int16', block_frames=256, table_path=None, hop_size=None,
+                  progress=None, cache=None, vocabulary=None, freq_tolerance=10.0, peak_distance=15, info=None):
+    """Recorre un archivo por bloques y genera la línea de tiempo de acordes.
+
+    Genera tuplas (segundos, acorde, notas, confianza), una por ventana, con el
+    mismo resultado que produciría ChordDetectorApp al recibir el archivo
+    fragmento a fragmento. Con ``hop_size`` las ventanas de ``chunk_size``
+    muestras se solapan, como en el modo de salto en vivo.
+
+    Cada bloque de ``block_frames`` ventanas se lee del disco en un buffer
+    reutilizado, así que la memoria no depende de la duración del archivo.
+    ``progress(ventanas_procesadas, ventanas_totales)`` se llama tras cada bloque.
+    Con una FeatureCache en ``cache`` las notas de cada ventana se reutilizan
+    entre ejecuciones y solo se repite la detección de acordes. ``vocabulary``
+    es un vocabulario de acordes de ``load_vocabulary``; ``freq_tolerance`` y
+    ``peak_distance`` se pasan al FrequencyAnalyzer. Un diccionario en
+    ``info`` recibe la frecuencia de muestreo del archivo (``'rate'``) al
+    abrirlo, antes de la primera ventana.
+    """
+    hop_size = hop_size or chunk_size
+    reader = AudioFileReader(path, raw_rate=raw_rate, raw_format=raw_format)
+    rate = reader.rate
+    if info is not None:
+        info['rate'] = rate
+    analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=sensitivity, freq_tolerance=freq_tolerance,
+                                 peak_distance=peak_distance)
+    detector = ChordDetector(confidence_threshold=confidence_threshold, table_path=table_path,
+                             vocabulary=vocabulary)
+
+    current_chord = "N/A"
+    confidence = 0.0
+    windows = _file_window_notes(path, reader, analyzer, chunk_size, hop_size, raw_format, block_frames, cache,
+                                 progress)
+    for index, notes in enumerate(windows):
+        # Igual que process_audio: sin notas se conserva el acorde actual
+        if notes:
+            current_chord = detector.detect_chord(notes)
+            confidence = detector.last_score
+        yield index * hop_size / rate, current_chord, notes, confidence
+
+
+def analyze_file(path, sensitivity=0.1, confidence_threshold=0.6, chunk_size=4096,
+                 raw_rate=44100, raw_format='int16', block_frames=256, table_path=None, hop_size=None, cache=None,
+                 vocabulary=None, freq_tolerance=10.0, peak_distance=15):
+    """Analiza un archivo completo y devuelve la línea de tiempo de acordes como lista.
+
+    Para grabaciones largas es preferible recorrer ``iter_timeline``, que no
+    acumula la línea de tiempo en memoria.
+    """
+    return list(iter_timeline(path, sensitivity=sensitivity, confidence_threshold=confidence_threshold,
+                              chunk_size=chunk_size, raw_rate=raw_rate, raw_format=raw_format,
+                              block_frames=block_frames, table_path=table_path, hop_size=hop_size,
+                              cache=cache, vocabulary=vocabulary, freq_tolerance=freq_tolerance,
+                              peak_distance=peak_distance))
+
+
+def decode_segments(path, sensitivity=0.1, confidence_threshold=0.6, chunk_size=4096,
+                    raw_rate=44100, raw_format='int16', block_frames=256, table_path=None, hop_size=None,
+                    switch_penalty=1.0, progress=None, cache=None, vocabulary=None, freq_tolerance=10.0,
+                    peak_distance=15):
+    """Decodifica la secuencia de acordes de un archivo completo con Viterbi.
+
+    En lugar de la persistencia fragmento a fragmento de ChordDetector, cada
+    bloque de ventanas se puntúa de una vez y alimenta un ViterbiDecoder que
+    penaliza cada cambio de acorde con ``switch_penalty``. Devuelve la lista
+    de segmentos (inicio, fin, acorde) en segundos. ``cache``, ``vocabulary``,
+    ``freq_tolerance`` y ``peak_distance`` funcionan como en ``iter_timeline``.
+    """
+    hop_size = hop_size or chunk_size
+    reader = AudioFileReader(path, raw_rate=raw_rate, raw_format=raw_format)
+    rate = reader.rate
+    analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=sensitivity, freq_tolerance=freq_tolerance,
+                                 peak_distance=peak_distance)
+    detector = ChordDetector(confidence_threshold=confidence_threshold, table_path=table_path,
+                             vocabulary=vocabulary)
+    decoder = ViterbiDecoder(detector, switch_penalty)
+
+    block = []
+    for notes in _file_window_notes(path, reader, analyzer, chunk_size, hop_size, raw_format, block_frames, cache,
+                                    progress):
+        block.append(notes)
+        if len(block) == block_frames:
+            decoder.push(detector.pitch_class_matrix(block))
+            block = []
+    if block:
+        decoder.push(detector.pitch_class_matrix(block))
+    return decoder.segments(hop_size / rate, chunk_size / rate)
+
+
+def chord_changes(timeline):
+    """Reduce la línea de tiempo a los instantes en que cambia el acorde"""
+    changes = []
+    for entry in timeline:
+        if not changes or changes[-1][1] != entry[1]:
+            changes.append(entry)
+    return changes
@@ -1,5 +1,32 @@
 import numpy as np
-from scipy.signal import find_peaks
+
+# numpy >= 2.0 acepta `out` en rfft y calcula en float32 sin convertir a float64
+_RFFT_HAS_OUT = np.lib.NumpyVersion(np.__version__) >= '2.0.0'
+
+
+class _AnalysisWorkspace:
+    """Buffers preasignados para analizar fragmentos de un tamaño concreto.
+
+    Todo lo que es constante por tamaño (ventana, eje de frecuencias) se calcula
+    una vez y los buffers de trabajo se reutilizan en cada fragmento. Con
+    ``n_fft`` mayor que el fragmento, ``buffer`` tiene ``n_fft`` muestras y el
+    fragmento se escribe en ``frame`` (su principio): la cola de ceros del
+    relleno se escribe una sola vez.
+    """
+
+    def __init__(self, n_samples, sampling_rate, n_fft=None):
+        n_fft = max(n_samples, n_fft or 0)
+        n_bins = n_fft // 2 + 1
+        self.window = np.hanning(n_samples).astype(np.float32)
+        self.freqs = np.fft.rfftfreq(n_fft, 1/sampling_rate)
+        self.buffer = np.zeros(n_fft, dtype=np.float32)
+        self.frame = self.buffer[:n_samples]
+        self.spectrum = np.empty(n_bins, dtype=np.complex64)
+        self.magnitude = np.empty(n_bins, dtype=np.float32)
+        # Máscaras para la búsqueda de picos (los extremos nunca son picos)
+        self.rising = np.zeros(n_bins, dtype=bool)
+        self.falling = np.zeros(n_bins, dtype=bool)
+
 
 class FrequencyAnalyzer:
     # Frecuencias de referencia para cada nota (C4 = 261.63 Hz, etc.)
@@ -13,10 +40,29 @@ class FrequencyAnalyzer:
         'B': 493.88
     }
     
-    def __init__(self, sampling_rate=44100, sensitivity=0.1, freq_tolerance=10.0):
+    # Clase de altura (semitonos desde C) de cada nombre de nota
+    PITCH_CLASSES = {
+        'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3, 'E': 4, 'F': 5,
+        'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8, 'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
+    }
+    
+    def __init__(self, sampling_rate=44100, sensitivity=0.1, freq_tolerance=10.0, fft_backend='scipy',
+                 fft_workers=None, fft_size=None, interpolate=False, peak_distance=15):
         self.sampling_rate = sampling_rate
         self.sensitivity = sensitivity  # Sensibilidad de detección (0.01-1.0)
         self.freq_tolerance = freq_tolerance  # Tolerancia en Hz para identificación de notas
+        # Motor de FFT: 'scipy' (reserva la salida en cada llamada, admite varios
+        # hilos con fft_workers) o 'numpy' (acepta el buffer de salida con numpy >= 2,
+        # pero reserva más memoria temporal y es más lento; ver _rfft)
+        self.fft_backend = fft_backend
+        self.fft_workers = fft_workers
+        # Tamaño mínimo de la FFT: los fragmentos más cortos se rellenan con ceros hasta
+        # él, así que los bins no dependen del tamaño de fragmento (None = sin relleno)
+        self.fft_size = fft_size
+        # Refinar la frecuencia de cada pico entre bins con una parábola
+        self.interpolate = interpolate
+        # Separación mínima en bins entre dos picos (como ``distance`` de find_peaks)
+        self.peak_distance = peak_distance
         
         # Inicializar arrays para todas las octavas (de 1 a 8)
         self.all_notes = {}
@@ -25,55 +71,149 @@ class FrequencyAnalyzer:
                 # Ajustar la frecuencia para cada octava
                 adjusted_freq = freq * (2 ** (octave - 4)) if octave != 4 else freq
                 self.all_notes[f"{note}{octave}"] = adjusted_freq
+        
+        # Nombres y frecuencias en el mismo orden que all_notes (para búsquedas vectorizadas)
+        self._note_names = list(self.all_notes)
+        self._note_freqs = np.array(list(self.all_notes.values()))
+        # Clase de altura (0-11) de cada nota, para eliminar duplicados por octava
+        self._note_pitch_classes = np.array([self.PITCH_CLASSES[name[:-1]] for name in self._note_names])
+        # Tablas bin de FFT -> nota, indexadas por (frecuencia, tamaño, tolerancia)
+        self._note_tables = {}
+        # Buffers de trabajo por (tamaño de fragmento, frecuencia de muestreo)
+        self._workspaces = {}
+        # PipelineStats opcional para medir cada etapa de analyze
+        self.stats = None
+        # Límite opcional de candidatos a pico por fragmento (modo degradado por carga):
+        # solo los ``max_peaks`` más altos pasan a la selección por distancia
+        self.max_peaks = None
+        # Magnitud de la rfft del último fragmento analizado (None si era silencio);
+        # es un buffer reutilizado, válido hasta el siguiente analyze
+        self.spectrum = None
+        # Nota más grave entre los picos elegidos del último fragmento (antes de quitar
+        # las repeticiones por octava), para los acordes con bajo; None si no hay ninguna.
+        # analyze_frames deja la de cada fila en ``bass_notes``
+        self.bass_note = None
+        self.bass_notes = []
+    
+    def _workspace(self, n_samples):
+        """Devuelve (creándolo la primera vez) el espacio de trabajo para un tamaño"""
+        key = (n_samples, self.sampling_rate, self.fft_size)
+        workspace = self._workspaces.get(key)
+        if workspace is None:
+            workspace = self._workspaces[key] = _AnalysisWorkspace(n_samples, self.sampling_rate, self.fft_size)
+        return workspace
+    
+    def _rfft(self, data, out=None):
+        """rfft en precisión simple sobre el último eje.
+
+        Con el motor 'scipy' (el predeterminado) ``out`` se ignora:
+        scipy.fft.rfft no admite buffer de salida y reserva un array nuevo de
+        n/2+1 complex64 en cada llamada (unos 16 KB para 4096 muestras, la
+        mayor parte de los ~25 KB por fragmento que mide
+        benchmarks/bench_allocations.py). El motor 'numpy' escribe en ``out``
+        con numpy >= 2, pero pocketfft reserva internamente unos 64 KB
+        temporales por llamada y es más lento, así que no compensa.
+        """
+        if self.fft_backend == 'scipy':
+            import scipy.fft
+            return scipy.fft.rfft(data, axis=-1, workers=self.fft_workers)
+        if _RFFT_HAS_OUT:
+            return np.fft.rfft(data, axis=-1, out=out)
+        return np.fft.rfft(data, axis=-1).astype(np.complex64)
     
     def analyze(self, audio_data, min_amplitude=0.005):
         # Normalización del audio para mejorar la detección
-        amplitude = np.max(np.abs(audio_data))
+        # (máximo absoluto sin crear un array intermedio)
+        amplitude = max(audio_data.max(), -audio_data.min())
         if amplitude > min_amplitude:
+            workspace = self._workspace(len(audio_data))
+            
             # Normalizar la señal para mejorar detección con señales débiles
-            normalized_data = audio_data / (amplitude + 1e-10)  # Evita división por cero
+            windowed_data = workspace.frame
+            np.divide(audio_data, amplitude + 1e-10, out=windowed_data)  # Evita división por cero
             
-            # Aplicar ventana Hanning para reducir fugas espectrales
-            window = np.hanning(len(normalized_data))
-            windowed_data = normalized_data * window
+            # Aplicar ventana Hanning (precalculada) para reducir fugas espectrales
+            np.multiply(windowed_data, workspace.window, out=windowed_data)
+            stats = self.stats
+            if stats is not None:
+                stats.lap('normalize')
             
             # Realizar la FFT para obtener el espectro de frecuencias
-            fft_data = np.abs(np.fft.rfft(windowed_data))
-            freqs = np.fft.rfftfreq(len(windowed_data), 1/self.sampling_rate)
+            spectrum = self._rfft(workspace.buffer, out=workspace.spectrum)
+            fft_data = np.abs(spectrum, out=workspace.magnitude)
+            self.spectrum = fft_data
+            if stats is not None:
+                stats.lap('fft')
             
             # Calcular el umbral dinámico basado en la sensibilidad
             # Ajustamos un poco para ser menos restrictivos con señales débiles
             threshold = np.max(fft_data) * self.sensitivity
             
             # Encontrar picos en el espectro con umbral dinámico
-            # Disminuir distancia mínima para captar notas cercanas
-            peaks, properties = find_peaks(fft_data, height=threshold, distance=15)
+            peaks, peak_heights = self._find_peaks(fft_data, threshold, workspace, distance=self.peak_distance)
+            if stats is not None:
+                stats.lap('find_peaks')
             
             # Ordenar picos por amplitud (de mayor a menor)
-            peak_heights = properties['peak_heights']
-            sorted_indices = np.argsort(-peak_heights)  # Orden descendente
+            sorted_indices = np.argsort(-peak_heights, kind='stable')  # Orden descendente
             sorted_peaks = peaks[sorted_indices]
             
             # Ajustamos el número máximo de notas según la complejidad del audio
             max_notes = min(12, max(3, int(len(sorted_peaks) * 0.3)))
             sorted_peaks = sorted_peaks[:max_notes]
             
+            # Resolver todas las notas de una vez: con la tabla precalculada por bin o, con
+            # interpolación, a partir de la frecuencia refinada de cada pico
+            n_fft = len(workspace.buffer)
+            if self.interpolate:
+                frequencies = (sorted_peaks + _peak_offsets(fft_data, sorted_peaks)) * (self.sampling_rate / n_fft)
+                note_indices = self._note_indices(frequencies)
+            else:
+                note_indices = self._note_table(n_fft)[sorted_peaks]
+            
+            known = note_indices[note_indices >= 0]
+            self.bass_note = self._note_names[known[np.argmin(self._note_freqs[known])]] if len(known) else None
+            
             detected_notes = []
-            for peak_idx in sorted_peaks:
-                if peak_idx < len(freqs):
-                    freq = freqs[peak_idx]
-                    # Ampliar rango para captar más notas
-                    if 50 <= freq <= 5000:  # Rango más amplio
-                        note = self._find_closest_note(freq)
-                        if note != "Unknown":
-                            # Eliminar duplicados por octava pero preservar notas importantes
-                            base_note = note[:-1]  # Eliminar número de octava
-                            if not any(base_note == n[:-1] for n in detected_notes):
-                                detected_notes.append(note)
+            for note_idx in note_indices:
+                if note_idx >= 0:
+                    note = self._note_names[note_idx]
+                    # Eliminar duplicados por octava pero preservar notas importantes
+                    base_note = note[:-1]  # Eliminar número de octava
+                    if not any(base_note == n[:-1] for n in detected_notes):
+                        detected_notes.append(note)
+            if stats is not None:
+                stats.lap('notes')
             
             return detected_notes
+        self.spectrum = None
+        self.bass_note = None
+        if self.stats is not None:
+            self.stats.lap('normalize')
         return []
     
+    def _find_peaks(self, magnitude, threshold, workspace, distance):
+        """Picos de un espectro con la semántica de ``find_peaks(height, distance)``.
+
+        Los máximos locales se marcan en buffers booleanos del espacio de trabajo;
+        solo se crean arrays del tamaño de la lista de candidatos.
+        """
+        rising, falling = workspace.rising, workspace.falling
+        np.greater(magnitude[1:-1], magnitude[:-2], out=rising[1:-1])
+        np.greater(magnitude[1:-1], magnitude[2:], out=falling[1:-1])
+        np.logical_and(rising, falling, out=rising)
+        np.greater_equal(magnitude, threshold, out=falling)
+        np.logical_and(rising, falling, out=rising)
+        
+        peaks = np.flatnonzero(rising)
+        heights = magnitude[peaks]
+        if self.max_peaks is not None and len(peaks) > self.max_peaks:
+            # La selección voraz de un pico solo depende de los más altos que él, así que
+            # quedarse con los más altos no cambia la decisión sobre ellos
+            top = np.sort(np.argpartition(-heights, self.max_peaks - 1)[:self.max_peaks])
+            peaks, heights = peaks[top], heights[top]
+        return _select_by_distance(peaks, heights, distance)
+    
     def _find_closest_note(self, frequency):
         # Encuentra la nota más cercana a una frecuencia dada
         min_distance = float('inf')
@@ -97,3 +237,245 @@ class FrequencyAnalyzer:
                 closest_note = note
         
         return closest_note if closest_note else "Unknown"
+
+    def _note_indices(self, frequencies):
+        """Índice de nota (-1 = desconocida) de cada frecuencia de un array.
+
+        Aplica a la vez a todas las frecuencias exactamente las mismas reglas
+        que _find_closest_note, incluido el rango de 50-5000 Hz que analyze
+        acepta. Sirve para frecuencias arbitrarias (picos interpolados) y para
+        construir la tabla por bin.
+        """
+        note_freqs = self._note_freqs
+        distance = np.abs(frequencies[:, None] - note_freqs[None, :])
+        relative_distance = distance / note_freqs
+        tolerance = self.freq_tolerance * (1 + 0.1 * (note_freqs / 440))
+        relative_distance[distance >= tolerance] = np.inf
+        
+        # argmin devuelve la primera nota en caso de empate, como el bucle original
+        indices = np.argmin(relative_distance, axis=1).astype(np.int16)
+        unknown = np.isinf(relative_distance.min(axis=1)) | (frequencies < 50) | (frequencies > 5000)
+        indices[unknown] = -1
+        return indices
+
+    def _note_table(self, n_samples):
+        """Devuelve la tabla bin de rfft -> índice de nota (-1 = desconocida).
+
+        Se construye una sola vez por (frecuencia de muestreo, tamaño, tolerancia)
+        con _note_indices sobre la frecuencia central de cada bin.
+        """
+        key = (self.sampling_rate, n_samples, self.freq_tolerance)
+        table = self._note_tables.get(key)
+        if table is None:
+            table = self._note_indices(np.fft.rfftfreq(n_samples, 1/self.sampling_rate))
+            self._note_tables[key] = table
+        return table
+
+    def analyze_frames(self, frames, min_amplitude=0.005):
+        """Analiza una matriz (frames, muestras) en una sola pasada vectorizada.
+
+        Devuelve una lista de listas de notas, idéntica a llamar a ``analyze``
+        sobre cada fila por separado. Las filas pueden ser fragmentos
+        consecutivos de un archivo o los canales de una entrada multicanal.
+        Combina frame_spectra, spectral_peaks y peak_notes.
+        """
+        frames = np.atleast_2d(frames)
+        n_frames = len(frames)
+        results = [[] for _ in range(n_frames)]
+        self.bass_notes = [None] * n_frames
+        if n_frames == 0:
+            return results
+
+        active, magnitudes, n_fft = self.frame_spectra(frames, min_amplitude)
+        if len(active) == 0:
+            return results
+        notes, basses = self.peak_notes(len(active), self.spectral_peaks(magnitudes), n_fft)
+        for row, row_notes, bass in zip(active, notes, basses):
+            results[row] = row_notes
+            self.bass_notes[row] = bass
+        return results
+
+    def frame_spectra(self, frames, min_amplitude=0.005):
+        """Magnitudes de la rfft de las filas con señal de una matriz (frames, muestras).
+
+        Devuelve (índices de las filas por encima de ``min_amplitude``,
+        magnitudes de esas filas, tamaño de la FFT). Es la parte del análisis
+        que no depende de la sensibilidad, la tolerancia ni la distancia
+        entre picos.
+        """
+        n_samples = frames.shape[1]
+        n_fft = max(n_samples, self.fft_size or 0)
+        # Misma normalización que en analyze, pero por fila
+        amplitudes = np.maximum(frames.max(axis=1), -frames.min(axis=1))
+        active = np.flatnonzero(amplitudes > min_amplitude)
+        if len(active) == 0:
+            return active, np.zeros((0, n_fft // 2 + 1), dtype=np.float32), n_fft
+
+        # Mismos tipos que el espacio de trabajo de analyze (float32) para idéntico resultado
+        windowed = (frames[active] / (amplitudes[active, None] + 1e-10)).astype(np.float32, copy=False)
+        windowed *= self._workspace(n_samples).window
+        if n_fft > n_samples:
+            padded = np.zeros((len(active), n_fft), dtype=np.float32)
+            padded[:, :n_samples] = windowed
+            windowed = padded
+        return active, np.abs(self._rfft(windowed)), n_fft
+
+    def spectral_peaks(self, magnitudes, sensitivity=None):
+        """Máximos locales de cada fila de magnitudes que superan ``sensitivity`` veces su máximo.
+
+        Por defecto se usa la sensibilidad del analizador. Devuelve (filas,
+        bins, alturas, desplazamientos entre bins) ordenados por fila y bin;
+        los desplazamientos solo se calculan con ``interpolate`` (si no, None).
+        Con una sensibilidad menor se obtiene un superconjunto: filtrar las
+        alturas por un umbral mayor da los picos de esa otra sensibilidad.
+        """
+        sensitivity = self.sensitivity if sensitivity is None else sensitivity
+        # Los extremos nunca son picos
+        thresholds = np.max(magnitudes, axis=1) * sensitivity
+        inner = magnitudes[:, 1:-1]
+        candidates = (inner > magnitudes[:, :-2]) & (inner > magnitudes[:, 2:]) & (inner >= thresholds[:, None])
+        rows, bins = np.nonzero(candidates)
+        bins += 1
+        offsets = _peak_offsets_rows(magnitudes, rows, bins) if self.interpolate else None
+        return rows, bins, magnitudes[rows, bins], offsets
+
+    def peak_notes(self, n_rows, peaks, n_fft):
+        """Notas de cada fila a partir de sus picos candidatos (el resultado de spectral_peaks).
+
+        Aplica la distancia mínima entre picos, el límite de notas por fila,
+        la conversión a notas con la tolerancia del analizador y el descarte
+        de repeticiones por octava. Devuelve dos listas de ``n_rows``
+        elementos: las notas de cada fila y su nota más grave (o None).
+        """
+        rows, bins, heights, offsets = peaks
+        notes = [[] for _ in range(n_rows)]
+        basses = [None] * n_rows
+        keep = _select_by_distance_rows(rows, bins, heights, distance=self.peak_distance)
+        rows, bins, heights = rows[keep], bins[keep], heights[keep]
+
+        # Por fila, picos de mayor a menor altura (a igual altura, el de menor frecuencia)
+        order = np.lexsort((bins, -heights, rows))
+        rows, bins = rows[order], bins[order]
+        peak_counts = np.bincount(rows, minlength=n_rows)
+        max_notes = np.minimum(12, np.maximum(3, (peak_counts * 0.3).astype(int)))
+        starts = np.cumsum(peak_counts) - peak_counts
+        position = np.arange(len(rows)) - starts[rows]
+        selected = position < max_notes[rows]
+        rows, bins = rows[selected], bins[selected]
+
+        # Resolver todas las notas con un único acceso a la tabla por bin (o por frecuencia interpolada)
+        if offsets is not None:
+            offsets = offsets[keep][order][selected]
+            note_indices = self._note_indices((bins + offsets) * (self.sampling_rate / n_fft))
+        else:
+            note_indices = self._note_table(n_fft)[bins]
+        known = note_indices >= 0
+        rows, note_indices = rows[known], note_indices[known]
+
+        # Nota más grave de cada fila
+        by_pitch = np.lexsort((self._note_freqs[note_indices], rows))
+        bass_rows, lowest = np.unique(rows[by_pitch], return_index=True)
+        names = self._note_names
+        for row, note_idx in zip(bass_rows, note_indices[by_pitch[lowest]]):
+            basses[row] = names[note_idx]
+
+        # Descartar repeticiones de la misma nota en otra octava (gana la primera, la más fuerte)
+        keys = rows * 12 + self._note_pitch_classes[note_indices]
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+
+        for row, note_idx in zip(rows[first], note_indices[first]):
+            notes[row].append(names[note_idx])
+        return notes, basses
+
+
+def _parabola_offsets(left, center, right):
+    """Desplazamiento (en bins, entre -0.5 y 0.5) del vértice de la parábola por tres puntos"""
+    return 0.5 * (left - right) / (left - 2 * center + right)
+
+
+def _peak_offsets(magnitude, peaks):
+    """Posición de cada pico entre bins por interpolación parabólica.
+
+    La parábola se ajusta al logaritmo de la magnitud del pico y sus dos
+    vecinos: el lóbulo principal de la ventana de Hann es casi gaussiano, así
+    que en escala logarítmica el error queda en una pequeña fracción de bin.
+    Los picos son máximos locales estrictos, nunca en los extremos.
+    """
+    left, center, right = (np.log(magnitude[peaks + k] + 1e-12) for k in (-1, 0, 1))
+    return _parabola_offsets(left, center, right)
+
+
+def _peak_offsets_rows(magnitude, rows, peaks):
+    """``_peak_offsets`` para picos de varias filas de una matriz de magnitudes"""
+    left, center, right = (np.log(magnitude[rows, peaks + k] + 1e-12) for k in (-1, 0, 1))
+    return _parabola_offsets(left, center, right)
+
+
+def _select_by_distance(peaks, heights, distance):
+    """Selección voraz de picos separados al menos ``distance`` bins.
+
+    Misma regla que ``scipy.signal.find_peaks(distance=...)`` (y que
+    _select_by_distance_rows) pero sobre la lista (corta) de candidatos de un
+    solo fragmento, sin recorrer el espectro completo.
+    """
+    if len(peaks) < 2 or distance <= 1:
+        return peaks, heights
+    conflict = np.abs(peaks[:, None] - peaks[None, :]) < distance
+    # Prioridad: mayor altura y, a igual altura, el pico de la derecha
+    order = np.lexsort((peaks, heights))
+    rank = np.empty(len(peaks), dtype=np.intp)
+    rank[order] = np.arange(len(peaks))
+    higher = conflict & (rank[None, :] > rank[:, None])
+
+    keep = np.zeros(len(peaks), dtype=bool)
+    undecided = np.ones(len(peaks), dtype=bool)
+    while undecided.any():
+        winners = undecided & ~(higher & undecided[None, :]).any(axis=1)
+        keep |= winners
+        undecided &= ~conflict[:, winners].any(axis=1)
+    return peaks[keep], heights[keep]
+
+
+def _select_by_distance_rows(rows, peaks, heights, distance):
+    """``_select_by_distance`` para los candidatos de varias filas a la vez.
+
+    ``rows`` y ``peaks`` vienen ordenados por fila y bin (como np.nonzero).
+    Solo compiten los picos de la misma fila a menos de ``distance`` bins y,
+    como dos máximos locales nunca son contiguos, cada pico solo puede chocar
+    con unos pocos vecinos de la lista: basta comparar con desplazamientos
+    cortos en lugar de construir la matriz de conflictos completa. Devuelve la
+    máscara de picos conservados.
+    """
+    n = len(peaks)
+    if n < 2 or distance <= 1:
+        return np.ones(n, dtype=bool)
+    # Prioridad: mayor altura y, a igual altura, el pico de la derecha
+    order = np.lexsort((peaks, heights))
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+
+    # Pares (i, i + k) de la misma fila a menos de ``distance`` bins
+    pairs = []
+    for k in range(1, min(n, distance)):
+        conflict = (rows[k:] == rows[:-k]) & (peaks[k:] - peaks[:-k] < distance)
+        if not conflict.any():
+            break
+        pairs.append((k, conflict))
+
+    keep = np.zeros(n, dtype=bool)
+    undecided = np.ones(n, dtype=bool)
+    while undecided.any():
+        # Gana cada pico sin un rival pendiente de mayor prioridad
+        beaten = np.zeros(n, dtype=bool)
+        for k, conflict in pairs:
+            contested = conflict & undecided[k:] & undecided[:-k]
+            beaten[:-k] |= contested & (rank[k:] > rank[:-k])
+            beaten[k:] |= contested & (rank[:-k] > rank[k:])
+        winners = undecided & ~beaten
+        keep |= winners
+        undecided &= ~winners
+        for k, conflict in pairs:
+            undecided[:-k] &= ~(conflict & winners[k:])
+            undecided[k:] &= ~(conflict & winners[:-k])
+    return keep
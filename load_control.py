@@ -0,0 +1,203 @@
+import numpy as np
+from frequency_analyzer import FrequencyAnalyzer
+
+# Modos del análisis en vivo, de más completo a más barato (cada uno incluye los anteriores)
+FULL = 'full'                        # Todos los fragmentos con el análisis normal
+EVERY_NTH = 'every-nth'              # Solo se analiza uno de cada N fragmentos
+CAP_PEAKS = 'cap-peaks'              # Además, como mucho unos pocos picos por fragmento
+CHEAP_FRONT_END = 'cheap-front-end'  # Además, un front end más barato y la mitad de fragmentos analizados
+LOAD_MODES = (FULL, EVERY_NTH, CAP_PEAKS, CHEAP_FRONT_END)
+
+
+class SilenceGate:
+    """Puerta de silencio por energía con histéresis.
+
+    Mide el nivel eficaz (RMS, en dBFS) de cada fragmento con un solo
+    producto escalar. La puerta se abre en cuanto el nivel supera
+    ``open_db`` y solo se cierra tras ``hold`` fragmentos seguidos por debajo
+    de ``close_db``, así que ni un ruido cercano al umbral ni las pausas
+    cortas entre notas la hacen oscilar. Con la puerta cerrada el fragmento
+    no pasa por la FFT ni por la detección.
+    """
+
+    def __init__(self, open_db=-45.0, close_db=None, hold=4):
+        self.open_db = open_db
+        self.close_db = open_db - 6.0 if close_db is None else close_db
+        if self.close_db > self.open_db:
+            raise ValueError("El umbral de cierre de la puerta no puede superar al de apertura")
+        self.hold = hold
+        self.is_open = False
+        self.level_db = -np.inf
+        self._quiet = 0
+        # Fragmentos descartados por la puerta
+        self.gated = 0
+
+    def update(self, audio_data):
+        """Mide un fragmento y devuelve si la puerta queda abierta"""
+        samples = audio_data.reshape(-1)
+        energy = float(np.dot(samples, samples)) / max(1, samples.size)
+        self.level_db = 10 * np.log10(energy) if energy > 0 else -np.inf
+        if self.level_db >= self.open_db:
+            self.is_open = True
+            self._quiet = 0
+        elif self.is_open and self.level_db < self.close_db:
+            self._quiet += 1
+            if self._quiet >= self.hold:
+                self.is_open = False
+        if not self.is_open:
+            self.gated += 1
+        return self.is_open
+
+
+class DecimatedAnalyzer:
+    """Front end FFT barato: analiza la ventana a 1/``factor`` de la frecuencia de muestreo.
+
+    Promedia cada ``factor`` muestras (un paso bajo mínimo contra el aliasing)
+    y analiza el resultado con un FrequencyAnalyzer a ``sampling_rate /
+    factor``: la FFT es ``factor`` veces más corta y la separación entre bins
+    en Hz no cambia, así que las notas y ``spectrum`` son comparables con los
+    del análisis completo. La banda analizada se reduce a ``sampling_rate /
+    (2 * factor)``: con el factor 4 por defecto, unos 5,5 kHz a 44,1 kHz,
+    por encima de las notas de casi cualquier acorde. El ahorro no es
+    proporcional al factor: con ventanas de unos miles de muestras buena
+    parte del coste son llamadas de numpy de tamaño fijo en la búsqueda de
+    picos (ver benchmarks/bench_load_shedding.py).
+    """
+
+    def __init__(self, analyzer, factor=4):
+        self.factor = factor
+        self.sampling_rate = analyzer.sampling_rate
+        self.analyzer = FrequencyAnalyzer(sampling_rate=analyzer.sampling_rate / factor,
+                                          sensitivity=analyzer.sensitivity,
+                                          freq_tolerance=analyzer.freq_tolerance,
+                                          fft_backend=analyzer.fft_backend, fft_workers=analyzer.fft_workers,
+                                          fft_size=analyzer.fft_size and analyzer.fft_size // factor,
+                                          interpolate=analyzer.interpolate, peak_distance=analyzer.peak_distance)
+        self._buffer = None
+
+    @property
+    def stats(self):
+        return self.analyzer.stats
+
+    @stats.setter
+    def stats(self, stats):
+        self.analyzer.stats = stats
+
+    @property
+    def spectrum(self):
+        return self.analyzer.spectrum
+
+    @property
+    def bass_note(self):
+        return self.analyzer.bass_note
+
+    def analyze(self, audio_data, min_amplitude=0.005):
+        n = len(audio_data) // self.factor
+        if self._buffer is None or len(self._buffer) != n:
+            self._buffer = np.empty(n, dtype=np.float32)
+        # Suma de las ``factor`` muestras de cada grupo con vistas escalonadas: np.add.reduce
+        # sobre el eje corto de un reshape cuesta más que el propio análisis a media frecuencia
+        np.copyto(self._buffer, audio_data[0:n * self.factor:self.factor])
+        for k in range(1, self.factor):
+            self._buffer += audio_data[k:n * self.factor:self.factor]
+        self._buffer *= np.float32(1 / self.factor)
+        return self.analyzer.analyze(self._buffer, min_amplitude)
+
+
+class LoadController:
+    """Degrada el análisis en vivo por escalones cuando no da abasto y lo recupera solo.
+
+    Recibe el tiempo de proceso de cada fragmento analizado y mantiene una
+    media exponencial de la carga: tiempo de proceso dividido entre el tiempo
+    disponible por fragmento analizado (``period`` segundos, o ``every``
+    veces más cuando solo se analiza uno de cada ``every``, y ``2 * every``
+    en CHEAP_FRONT_END). Con ventanas de unos miles de muestras el front end
+    barato solo ahorra una parte del coste de cada fragmento, así que el
+    último escalón además duplica el salto entre fragmentos analizados
+    para que siempre libere carga. Si la carga pasa
+    de ``high`` durante ``patience`` fragmentos se sube un escalón de
+    LOAD_MODES; si se mantiene por debajo de ``low`` durante ``recover``
+    fragmentos, se baja uno. ``recover`` es bastante mayor que ``patience``
+    para que el modo no oscile entre dos escalones.
+    """
+
+    def __init__(self, period, high=0.8, low=0.4, every=2, smoothing=0.2, patience=4, recover=64,
+                 max_level=len(LOAD_MODES) - 1):
+        if not 0 < low < high:
+            raise ValueError("Se necesita 0 < low < high")
+        self.period = period
+        self.high = high
+        self.low = low
+        self.every = every
+        self.smoothing = smoothing
+        self.patience = patience
+        self.recover = recover
+        self.max_level = max_level
+        self.level = 0
+        self.load = 0.0
+        self._over = 0
+        self._under = 0
+        self._position = 0
+        # Contadores para monitorización
+        self.shed = 0
+        self.transitions = 0
+        self.analyzed_by_mode = {mode: 0 for mode in LOAD_MODES}
+
+    @property
+    def mode(self):
+        return LOAD_MODES[self.level]
+
+    def _stride(self, level):
+        """Se analiza un fragmento de cada ``_stride(level)``"""
+        if level == LOAD_MODES.index(CHEAP_FRONT_END):
+            return 2 * self.every
+        return self.every if level >= 1 else 1
+
+    def _budget(self, level):
+        return self.period * self._stride(level)
+
+    def should_analyze(self):
+        """Decide si el fragmento actual se analiza (uno de cada ``every``, o ``2 * every`` en CHEAP_FRONT_END)"""
+        self._position += 1
+        if self._position % self._stride(self.level):
+            self.shed += 1
+            return False
+        self.analyzed_by_mode[self.mode] += 1
+        return True
+
+    def record(self, seconds):
+        """Registra el tiempo de proceso de un fragmento analizado; devuelve True si cambió el modo"""
+        load = seconds / self._budget(self.level)
+        self.load += self.smoothing * (load - self.load)
+        if self.load > self.high and self.level < self.max_level:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.patience:
+                self._set_level(self.level + 1)
+                return True
+        elif self.load < self.low and self.level > 0:
+            self._under += 1
+            self._over = 0
+            if self._under >= self.recover:
+                self._set_level(self.level - 1)
+                return True
+        else:
+            self._over = self._under = 0
+        return False
+
+    def _set_level(self, level):
+        # La media pasa a expresarse respecto al tiempo disponible en el nuevo escalón
+        self.load *= self._budget(self.level) / self._budget(level)
+        self.level = level
+        self._over = self._under = 0
+        self.transitions += 1
+
+    def stats(self):
+        """Modo actual, carga media y contadores de fragmentos descartados"""
+        return {
+            'mode': self.mode,
+            'load': round(self.load, 3),
+            'shed': self.shed,
+            'transitions': self.transitions,
+            'analyzed_by_mode': dict(self.analyzed_by_mode),
+        }
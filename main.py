@@ -1,27 +1,132 @@
+import sys
 import time
-import numpy as np
-import os
+import json
 import argparse
-import matplotlib
-import matplotlib.pyplot as plt  # Añadida la importación correcta de pyplot
+import numpy as np
 from colorama import Fore, Back, Style, init
 from audio_capture import AudioCapture
+from audio_sources import FileSource, StdinSource, SyntheticSource
+from audio_pipeline import RingBuffer, AnalysisWorker, SlidingWindow, OVERRUN_POLICIES, DROP_OLDEST
 from frequency_analyzer import FrequencyAnalyzer
-from chord_detector import ChordDetector
-from visualizer import AudioVisualizer
+from chroma import ChromaAnalyzer
+from multichannel import MultiChannelDetector
+from chord_detector import ChordDetector, load_vocabulary
+from decoding import OnlineViterbi
+from load_control import SilenceGate, LoadController, DecimatedAnalyzer, LOAD_MODES, EVERY_NTH, CAP_PEAKS, CHEAP_FRONT_END
+from event_output import NDJSONWriter
+from stats import PipelineStats, format_latency
+from file_analysis import iter_timeline, decode_segments, RAW_FORMATS
+from parallel_analysis import iter_file_timelines
+from feature_cache import FeatureCache
+from timeline import TimelineWriter
+# matplotlib (visualizer) se importa solo cuando hay visualización
+
+# Sensibilidad por defecto de cada front end de análisis
+FRONT_END_SENSITIVITY = {'fft': 0.1, 'cqt': 0.3}
+
+# Candidatos a pico por fragmento en el modo CAP_PEAKS
+LOAD_MAX_PEAKS = 24
 
 class ChordDetectorApp:
-    def __init__(self, device_index=None, sensitivity=0.1, confidence_threshold=0.6, rate=44100, chunk_size=4096):
+    def __init__(self, device_index=None, sensitivity=0.1, confidence_threshold=0.6, rate=44100, chunk_size=4096,
+                 table_path=None, buffer_chunks=32, overrun_policy=DROP_OLDEST, window_size=None, hop_size=None,
+                 visual=True, event_writer=None, stats_interval=None, profiler=None, source=None,
+                 processes=False, channels=1, mix=False, front_end='fft', viterbi_lag=None, switch_penalty=1.0,
+                 fps=30, gate_db=None, adaptive=False, fft_size=None, interpolate=False, vocabulary=None,
+                 slash_chords=False, freq_tolerance=10.0, peak_distance=15):
         self.current_audio_data = None
-        # Usar los parámetros de sensibilidad y confianza
-        self.analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=sensitivity)
-        self.detector = ChordDetector(confidence_threshold=confidence_threshold)
+        # Fuente de audio: por defecto, el micrófono a través de PyAudio
+        if source is not None:
+            rate = source.rate
+            channels = source.channels
+        # Ventana de análisis y salto entre análisis (por defecto, un fragmento sin solapamiento)
+        window_size = window_size or chunk_size
+        hop_size = hop_size or window_size
+        if source is not None and source.chunk_size != hop_size:
+            raise ValueError("El tamaño de fragmento de la fuente debe coincidir con el salto de análisis")
+        self.sliding_window = SlidingWindow(window_size, hop_size, channels=channels) if window_size != hop_size else None
+        # Usar los parámetros de sensibilidad y confianza. El front end 'cqt'
+        # obtiene un cromagrama constant-Q que se clasifica directamente. Con 'fft',
+        # las ventanas cortas se pueden rellenar con ceros hasta ``fft_size`` e
+        # interpolar cada pico entre bins para no perder resolución en los graves
+        self.front_end = front_end
+        if front_end == 'cqt':
+            if fft_size is not None or interpolate:
+                raise ValueError("El relleno con ceros y la interpolación de picos solo se aplican al front end fft")
+            self.analyzer = ChromaAnalyzer(sampling_rate=rate, sensitivity=sensitivity)
+        else:
+            self.analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=sensitivity, fft_size=fft_size,
+                                              interpolate=interpolate, freq_tolerance=freq_tolerance,
+                                              peak_distance=peak_distance)
+        # Latencias por etapa (el analizador registra sus propias etapas)
+        self.stats = PipelineStats()
+        self.analyzer.stats = self.stats
+        self.stats_interval = stats_interval
+        self.detector = ChordDetector(confidence_threshold=confidence_threshold, table_path=table_path,
+                                      vocabulary=vocabulary)
+        # Acordes con bajo: la nota más grave detectada se pasa al detector (solo con fft)
+        self.slash_chords = slash_chords and front_end != 'cqt'
+        # Viterbi de retardo fijo en lugar de la persistencia del detector (solo un canal)
+        self.online_viterbi = None
+        if viterbi_lag is not None:
+            self.online_viterbi = OnlineViterbi(self.detector, switch_penalty=switch_penalty, lag=viterbi_lag)
+        # Puerta de silencio: los fragmentos por debajo del umbral no pasan por el análisis
+        self.gate = SilenceGate(gate_db) if gate_db is not None else None
+        # Control de carga: por escalones, analizar uno de cada N fragmentos, limitar los
+        # picos y pasar a un front end más barato (la FFT si se usa constant-Q, o una FFT
+        # a la mitad de frecuencia de muestreo). Con varios canales solo se salta fragmentos
+        self.load_controller = None
+        self.cheap_analyzer = None
+        if adaptive:
+            self.load_controller = LoadController(hop_size / rate,
+                                                  max_level=LOAD_MODES.index(EVERY_NTH if channels > 1 else
+                                                                             CHEAP_FRONT_END))
+            if front_end == 'cqt':
+                self.cheap_analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=FRONT_END_SENSITIVITY['fft'],
+                                                        freq_tolerance=freq_tolerance, peak_distance=peak_distance)
+            else:
+                self.cheap_analyzer = DecimatedAnalyzer(self.analyzer)
+            self.cheap_analyzer.stats = self.stats
+        # Varios canales: todos se analizan con una FFT 2-D y cada uno tiene su propio detector
+        self.multichannel = None
+        if channels > 1:
+            self.multichannel = MultiChannelDetector(self.analyzer, channels, confidence_threshold=confidence_threshold,
+                                                     table_path=table_path, mix=mix, vocabulary=vocabulary,
+                                                     slash_chords=slash_chords)
         
-        # Inicializar el visualizador
-        self.visualizer = AudioVisualizer()
+        # Inicializar el visualizador (en modo sin visualización nunca se importa matplotlib).
+        # Con procesos separados se crea en start, después de lanzar los procesos hijos
+        self.visual = visual
+        self.processes = processes
+        self.pipeline = None
+        self.visualizer = None
+        self.visualizer_options = {'sampling_rate': rate, 'window_size': window_size, 'fps': fps, 'fft_size': fft_size}
+        if visual and not processes:
+            from visualizer import AudioVisualizer
+            self.visualizer = AudioVisualizer(**self.visualizer_options)
+        # Salida NDJSON de cambios de acorde (modo sin visualización)
+        self.event_writer = event_writer
+        # Configuración del análisis con la que el proceso hijo de --processes crea su propia
+        # aplicación: solo valores serializables, sin buffers, hilos ni archivos abiertos
+        self.analysis_config = {
+            'sensitivity': sensitivity, 'confidence_threshold': confidence_threshold, 'rate': rate,
+            'chunk_size': chunk_size, 'table_path': table_path, 'window_size': window_size, 'hop_size': hop_size,
+            'stats_interval': stats_interval, 'channels': channels, 'mix': mix, 'front_end': front_end,
+            'viterbi_lag': viterbi_lag, 'switch_penalty': switch_penalty, 'gate_db': gate_db, 'adaptive': adaptive,
+            'fft_size': fft_size, 'interpolate': interpolate, 'vocabulary': vocabulary,
+            'slash_chords': slash_chords, 'freq_tolerance': freq_tolerance, 'peak_distance': peak_distance,
+        }
         
-        # Inicializar el capturador de audio con el dispositivo seleccionado
-        self.audio_capture = AudioCapture(self.process_audio, rate=rate, chunk_size=chunk_size, device_index=device_index)
+        # La captura solo copia muestras al buffer circular; el análisis corre en otro hilo
+        self.buffer_chunks = buffer_chunks
+        self.ring_buffer = RingBuffer(buffer_chunks, hop_size, channels=channels)
+        self.worker = AnalysisWorker(self.ring_buffer, self.process_audio, policy=overrun_policy, profiler=profiler)
+        
+        # Inicializar la fuente de audio (el micrófono con el dispositivo seleccionado si no se indica otra)
+        self.source = source or AudioCapture(rate=rate, chunk_size=hop_size, device_index=device_index,
+                                             channels=channels)
+        if self.source.free_run:
+            self.source.profiler = profiler
         
         # Estado actual
         self.current_chord = "N/A"
@@ -31,43 +136,298 @@ class ChordDetectorApp:
         self.sensitivity = sensitivity
         self.confidence_threshold = confidence_threshold
         
-    def process_audio(self, audio_data):
-        self.current_audio_data = audio_data
+    def process_audio(self, audio_data, timestamp=None):
+        stats = self.stats
+        stats.begin()
+        started = time.perf_counter()
+        
+        # Con solapamiento, cada fragmento es un salto que desplaza la ventana de análisis
+        if self.sliding_window is not None:
+            if not self.sliding_window.push(audio_data):
+                return
+            audio_data = self.sliding_window.window
+            stats.lap('window')
+        
+        # Puerta de silencio y, si el análisis no da abasto, descarte de fragmentos
+        analyze = True
+        if self.gate is not None and not self.gate.update(audio_data):
+            analyze = False
+            stats.increment('gated')
+            if self.online_viterbi is not None:
+                # El silencio también avanza la decodificación (sin información), pero
+                # mientras la puerta siga cerrada el acorde mostrado es N/A
+                self.online_viterbi.push(np.zeros(12))
+            self._reset_chords()
+        elif self.load_controller is not None and not self.load_controller.should_analyze():
+            # Fragmento descartado por carga: se mantienen las notas y el acorde actuales
+            analyze = False
+            stats.increment('shed')
+        stats.lap('gate')
         
-        # Analizar las notas presentes en el audio
-        self.current_notes = self.analyzer.analyze(audio_data)
+        # Front end del modo de carga actual
+        analyzer = self.analyzer
+        use_chroma = self.front_end == 'cqt'
+        if self.cheap_analyzer is not None and self.load_controller.mode == CHEAP_FRONT_END:
+            analyzer = self.cheap_analyzer
+            use_chroma = False
         
-        if self.current_notes:
-            # Detectar el acorde basado en las notas
-            self.current_chord = self.detector.detect_chord(self.current_notes)
+        if not analyze:
+            if self.multichannel is not None:
+                # Misma forma de onda que mostraría _process_channels
+                audio_data = audio_data.sum(axis=0) if self.multichannel.mix else audio_data[0]
+        elif self.multichannel is not None:
+            # Un acorde por canal; se muestra la mezcla si existe o, si no, el primer canal
+            audio_data = self._process_channels(audio_data)
+        else:
+            # Analizar las notas presentes en el audio
+            self.current_notes = analyzer.analyze(audio_data)
+            
+            if self.online_viterbi is not None:
+                # Cada fragmento avanza la decodificación, aunque no tenga notas
+                if use_chroma:
+                    self._decode_chord(analyzer.chroma)
+                else:
+                    self._decode_chord(self.detector.pitch_class_matrix([self.current_notes])[0])
+            elif self.current_notes:
+                # Detectar el acorde basado en las notas
+                previous_chord = self.current_chord
+                if use_chroma:
+                    self.current_chord = self.detector.detect_chroma(analyzer.chroma)
+                else:
+                    bass = analyzer.bass_note if self.slash_chords else None
+                    self.current_chord = self.detector.detect_chord(self.current_notes, bass)
+                stats.lap('detect_chord')
+                if self.current_chord != previous_chord:
+                    stats.increment('chord_changes')
+        self.current_audio_data = audio_data
+        if analyze and self.load_controller is not None:
+            # Solo cuentan los fragmentos analizados: los descartados apenas cuestan
+            if self.load_controller.record(time.perf_counter() - started):
+                self._apply_load_mode()
+                stats.increment('mode_changes')
             
         # Actualizar el visualizador con los nuevos datos
-        self.visualizer.update_data(audio_data, self.current_chord, self.current_notes)
+        if self.visualizer is not None:
+            # El espectro (FFT) o el cromagrama (constant-Q) del análisis, para no recalcularlos al dibujar
+            spectrum = chroma = None
+            if analyze and self.multichannel is None:
+                if use_chroma:
+                    chroma = analyzer.chroma
+                else:
+                    spectrum = analyzer.spectrum
+            self.visualizer.update_data(audio_data, self.current_chord, self.current_notes, chroma, spectrum)
+            stats.lap('visualizer')
+        
+        # Emitir un evento cuando cambia el acorde
+        if self.event_writer is not None and self.multichannel is None:
+            self.event_writer.write_change(time.time(), self.current_chord, self.current_notes,
+                                           self.detector.last_score)
+            stats.lap('output')
+        
+        stats.end('process')
+        # Desde que se capturó la última muestra hasta tener el resultado
+        if timestamp is not None:
+            stats.record('end_to_end', time.perf_counter() - timestamp)
             
+    def _reset_chords(self):
+        """Puerta cerrada: el acorde (y el de cada canal) pasa a N/A y se cuenta como cambio"""
+        if self.multichannel is not None:
+            changed = self.multichannel.reset()
+            self.stats.increment('chord_changes', len(changed))
+            if self.event_writer is not None and changed:
+                now = time.time()
+                for i in changed:
+                    self.event_writer.write_event(now, "N/A", [], 0.0, channel=self.multichannel.names[i])
+        elif self.current_chord != "N/A":
+            self.stats.increment('chord_changes')
+        self.current_chord = "N/A"
+        self.current_notes = []
+        self.detector.reset()
+    
+    def _apply_load_mode(self):
+        """Limita los picos por fragmento en CAP_PEAKS y en los modos siguientes"""
+        level = self.load_controller.level
+        max_peaks = LOAD_MAX_PEAKS if level >= LOAD_MODES.index(CAP_PEAKS) else None
+        for analyzer in (self.analyzer, self.cheap_analyzer):
+            analyzer = getattr(analyzer, 'analyzer', analyzer)
+            if isinstance(analyzer, FrequencyAnalyzer):
+                analyzer.max_peaks = max_peaks
+    
+    def load_stats(self):
+        """Modo de carga, fragmentos silenciados y descartados (None sin puerta ni control de carga)"""
+        if self.gate is None and self.load_controller is None:
+            return None
+        stats = self.load_controller.stats() if self.load_controller is not None else {'mode': 'full'}
+        stats['gated'] = self.gate.gated if self.gate is not None else 0
+        return stats
+    
+    def _decode_chord(self, chroma):
+        """Actualiza el acorde con el Viterbi de retardo fijo (el de hace ``lag`` fragmentos)"""
+        chord = self.online_viterbi.push(chroma)
+        self.stats.lap('detect_chord')
+        if chord is not None:
+            if chord != self.current_chord:
+                self.stats.increment('chord_changes')
+            self.current_chord = chord
+            self.detector.last_score = self.online_viterbi.last_score
+    
+    def _process_channels(self, block):
+        """Detecta el acorde de cada canal y emite un evento por canal que cambia.
+
+        Devuelve la forma de onda que se muestra (la mezcla o el primer canal);
+        su acorde y sus notas pasan a ser el acorde y las notas actuales.
+        """
+        multichannel = self.multichannel
+        changed = multichannel.process(block)
+        self.stats.lap('channels')
+        self.stats.increment('chord_changes', len(changed))
+        if self.event_writer is not None:
+            now = time.time()
+            for i in changed:
+                self.event_writer.write_event(now, multichannel.current_chords[i], multichannel.current_notes[i],
+                                              multichannel.detectors[i].last_score, channel=multichannel.names[i])
+            self.stats.lap('output')
+        shown = multichannel.channels if multichannel.mix else 0
+        self.current_chord = multichannel.current_chords[shown]
+        self.current_notes = multichannel.current_notes[shown]
+        return multichannel.frames[shown]
+    
     def run(self):
         # Inicializar colorama para usar colores en Windows
         init()
         
-        print(f"{Fore.CYAN}=== Detector de Acordes en Tiempo Real ==={Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}Usando visualización gráfica. Cierre la ventana para salir.{Style.RESET_ALL}")
-        print(f"{Fore.GREEN}Configuración: Sensibilidad={self.sensitivity}, Umbral de confianza={self.confidence_threshold}{Style.RESET_ALL}")
-        
+        # Sin visualización, stdout queda reservado para los eventos NDJSON
+        out = sys.stdout if self.visual else sys.stderr
+        print(f"{Fore.CYAN}=== Detector de Acordes en Tiempo Real ==={Style.RESET_ALL}", file=out)
+        if self.visual:
+            print(f"{Fore.YELLOW}Usando visualización gráfica. Cierre la ventana para salir.{Style.RESET_ALL}", file=out)
+        else:
+            print(f"{Fore.YELLOW}Modo sin visualización. Presione Ctrl+C para salir.{Style.RESET_ALL}", file=out)
+        if self.processes:
+            print(f"{Fore.YELLOW}Captura y análisis en procesos separados (memoria compartida){Style.RESET_ALL}", file=out)
+        if self.source.free_run:
+            print(f"{Fore.YELLOW}Modo libre: la fuente entrega fragmentos tan rápido como se analizan{Style.RESET_ALL}", file=out)
+        print(f"{Fore.GREEN}Configuración: Análisis={self.front_end}, Sensibilidad={self.sensitivity}, Umbral de confianza={self.confidence_threshold}{Style.RESET_ALL}", file=out)
+        if self.front_end == 'fft' and (self.analyzer.fft_size or self.analyzer.interpolate):
+            padding = f"hasta {self.analyzer.fft_size} muestras" if self.analyzer.fft_size else "no"
+            print(f"{Fore.GREEN}Relleno con ceros de la FFT: {padding}, interpolación de picos: "
+                  f"{'sí' if self.analyzer.interpolate else 'no'}{Style.RESET_ALL}", file=out)
+        if self.front_end == 'fft':
+            print(f"{Fore.GREEN}Picos: tolerancia {self.analyzer.freq_tolerance:g} Hz, distancia mínima "
+                  f"{self.analyzer.peak_distance} bins{Style.RESET_ALL}", file=out)
+
         try:
-            # Iniciar visualizador
-            self.visualizer.start()
-            
-            # Iniciar captura de audio
-            self.audio_capture.start()
+            self.start()
             
             # Mantener la aplicación corriendo
-            plt.show()
+            if self.visualizer is not None:
+                import matplotlib.pyplot as plt
+                plt.show()
+            else:
+                last_report = time.monotonic()
+                while self.is_running():
+                    time.sleep(0.5)
+                    # Informe periódico de latencias en stderr
+                    if self.stats_interval and time.monotonic() - last_report >= self.stats_interval:
+                        last_report = time.monotonic()
+                        self.print_pipeline_stats(file=out)
                 
         except KeyboardInterrupt:
-            print(f"\n{Fore.RED}Deteniendo el detector de acordes...{Style.RESET_ALL}")
+            print(f"\n{Fore.RED}Deteniendo el detector de acordes...{Style.RESET_ALL}", file=out)
         finally:
+            self.stop()
+            self.print_pipeline_stats(file=out)
+            print(f"{Fore.CYAN}¡Hasta luego!{Style.RESET_ALL}", file=out)
+    
+    def start(self):
+        """Arranca la fuente, el análisis y el visualizador sin bloquear"""
+        if self.processes:
+            from shared_pipeline import ProcessPipeline
+            # Los procesos hijos se lanzan antes de abrir la ventana de matplotlib
+            self.pipeline = ProcessPipeline(self, buffer_chunks=self.buffer_chunks, policy=self.worker.policy,
+                                            report_interval=self.stats_interval and min(self.stats_interval, 1.0))
+            self.pipeline.start()
+            if self.visual:
+                from visualizer import AudioVisualizer
+                self.visualizer = self.pipeline.visualizer = AudioVisualizer(**self.visualizer_options)
+        
+        # Iniciar visualizador
+        if self.visualizer is not None:
+            self.visualizer.start()
+        
+        if self.processes:
+            return
+        if self.source.free_run:
+            # Sin buffer intermedio: la fuente llama al análisis directamente
+            self.source.start(self.process_audio)
+        else:
+            # Iniciar el hilo de análisis antes que la captura
+            self.worker.start()
+            self.source.start(self.ring_buffer.write)
+    
+    def is_running(self):
+        if self.pipeline is not None:
+            return self.pipeline.is_running()
+        return self.source.is_running
+    
+    def stop(self):
+        if self.visualizer is not None:
             self.visualizer.stop()
-            self.audio_capture.stop()
-            print(f"{Fore.CYAN}¡Hasta luego!{Style.RESET_ALL}")
+        if self.pipeline is not None:
+            # La captura se detiene y el proceso de análisis termina lo pendiente
+            self.pipeline.stop()
+        else:
+            self.source.stop()
+            # Si la fuente terminó sola (archivo, stdin), analizar lo que quede en el buffer
+            self.worker.drain()
+            self.worker.stop()
+        if self.event_writer is not None:
+            self.event_writer.close()
+    
+    def pipeline_stats(self):
+        """Contadores de fragmentos procesados, pendientes y perdidos, y latencias por etapa"""
+        if self.pipeline is not None:
+            return self.pipeline.stats()
+        stats = self.worker.stats()
+        if self.source.free_run:
+            stats['processed'] = self.source.delivered
+        stats['input_overflows'] = self.source.input_overflows
+        stats['delivered'] = self.source.delivered
+        stats['elapsed'] = self.source.elapsed()
+        stats.update(self.stats.snapshot())
+        stats['load'] = self.load_stats()
+        return stats
+    
+    def print_pipeline_stats(self, file=None):
+        stats = self.pipeline_stats()
+        lost = stats['overruns'] + stats['skipped'] + stats['input_overflows']
+        color = Fore.YELLOW if lost else Fore.GREEN
+        print(f"{color}Fragmentos procesados: {stats['processed']}, sobrescritos: {stats['overruns']}, "
+              f"saltados: {stats['skipped']}, desbordamientos de entrada: {stats['input_overflows']}{Style.RESET_ALL}",
+              file=file)
+        # Rendimiento sostenido en modo libre, en múltiplos del tiempo real
+        elapsed = stats['elapsed']
+        if self.source.free_run and elapsed > 0:
+            audio_seconds = stats['delivered'] * self.source.chunk_size / self.source.rate
+            print(f"{Fore.YELLOW}{stats['delivered'] / elapsed:.0f} fragmentos/s "
+                  f"({audio_seconds / elapsed:.1f}x tiempo real){Style.RESET_ALL}", file=file)
+        load = stats.get('load')
+        if load is not None:
+            color = Fore.YELLOW if load['mode'] != 'full' or load.get('shed') else Fore.GREEN
+            print(f"{color}Modo de carga: {load['mode']}, fragmentos en silencio: {load['gated']}, "
+                  f"descartados por carga: {load.get('shed', 0)}, cambios de modo: {load.get('transitions', 0)}"
+                  f"{Style.RESET_ALL}", file=file)
+        latency = format_latency(stats['latency_ms'])
+        if latency:
+            print(f"{Fore.CYAN}Latencia por etapa:{Style.RESET_ALL}\n{latency}", file=file)
+        if self.visualizer is not None:
+            render = self.visualizer.stats.snapshot()
+            latency = format_latency(render['latency_ms'])
+            if latency:
+                frames = render['counters'].get('frames', 0)
+                repeated = render['counters'].get('repeated_frames', 0)
+                print(f"{Fore.CYAN}Dibujo ({frames} cuadros nuevos, {repeated} sin datos nuevos):{Style.RESET_ALL}\n"
+                      f"{latency}", file=file)
 
 def choose_audio_device():
     """Permite al usuario elegir un dispositivo de audio para la captura"""
@@ -95,6 +455,184 @@ def choose_audio_device():
         print(f"{Fore.RED}Entrada no válida. Usando el dispositivo predeterminado.{Style.RESET_ALL}")
         return None
 
+def analyze_audio_file(path, sensitivity, confidence, chunk_size, rate, raw_format, table_path=None, hop_size=None,
+                       event_writer=None, block_frames=256, cache=None, timeline_writer=None, vocabulary=None,
+                       freq_tolerance=10.0, peak_distance=15):
+    """Analiza un archivo de audio completo e imprime los cambios de acorde a medida que aparecen.
+
+    El archivo se recorre por bloques de ``block_frames`` ventanas, así que la
+    memoria no depende de su duración. Con ``event_writer`` los cambios de
+    acorde se escriben como NDJSON y los mensajes de estado van a stderr. Con
+    ``timeline_writer`` (TimelineWriter) se guardan además todas las ventanas.
+    """
+    out = sys.stdout if event_writer is None else sys.stderr
+    print(f"{Fore.CYAN}=== Análisis de archivo: {path} ==={Style.RESET_ALL}", file=out)
+    
+    # Progreso en la terminal (se omite si stderr está redirigido)
+    show_progress = sys.stderr.isatty()
+    def progress(done, total):
+        if show_progress:
+            print(f"\r{Fore.YELLOW}Progreso: {done / total:6.1%} ({done}/{total} ventanas){Style.RESET_ALL}",
+                  end='', file=sys.stderr, flush=True)
+    
+    start = time.perf_counter()
+    # La frecuencia real del archivo (``rate`` solo se aplica a los archivos sin cabecera)
+    info = {'rate': rate}
+    timeline = iter_timeline(path, sensitivity=sensitivity, confidence_threshold=confidence,
+                             chunk_size=chunk_size, raw_rate=rate, raw_format=raw_format,
+                             table_path=table_path, hop_size=hop_size, block_frames=block_frames,
+                             progress=progress, cache=cache, vocabulary=vocabulary,
+                             freq_tolerance=freq_tolerance, peak_distance=peak_distance, info=info)
+    n_windows = 0
+    duration = 0.0
+    last_chord = None
+    for timestamp, chord, notes, score in timeline:
+        n_windows += 1
+        duration = timestamp
+        if timeline_writer is not None:
+            timeline_writer.append(timestamp, chord, notes, score)
+        # Solo se muestran los cambios de acorde
+        if chord == last_chord:
+            continue
+        last_chord = chord
+        if event_writer is not None:
+            event_writer.write_event(timestamp, chord, notes, score)
+            continue
+        if show_progress:
+            print('\r\033[K', end='', file=sys.stderr)
+        minutes, seconds = divmod(timestamp, 60)
+        print(f"{Fore.GREEN}[{int(minutes):02d}:{seconds:06.3f}]{Style.RESET_ALL} {chord} ({', '.join(notes)})")
+    elapsed = time.perf_counter() - start
+    if show_progress:
+        print(file=sys.stderr)
+    if event_writer is not None:
+        event_writer.close()
+    if timeline_writer is not None:
+        # El último acorde dura hasta el final de su ventana
+        timeline_writer.close(duration + chunk_size / info['rate'] if n_windows else 0.0)
+
+    speed = duration / elapsed if elapsed > 0 else float('inf')
+    print(f"{Fore.YELLOW}{n_windows} ventanas analizadas en {elapsed:.2f} s ({speed:.0f}x tiempo real){Style.RESET_ALL}",
+          file=out)
+
+def decode_audio_file(path, sensitivity, confidence, chunk_size, rate, raw_format, table_path=None, hop_size=None,
+                      event_writer=None, block_frames=256, switch_penalty=1.0, cache=None, timeline_writer=None,
+                      vocabulary=None, freq_tolerance=10.0, peak_distance=15):
+    """Decodifica un archivo completo con Viterbi e imprime sus segmentos de acorde.
+
+    Con ``event_writer`` cada segmento se escribe como NDJSON (``start``,
+    ``end`` y ``chord``) y los mensajes de estado van a stderr. Con
+    ``timeline_writer`` se guarda una fila por segmento.
+    """
+    out = sys.stdout if event_writer is None else sys.stderr
+    print(f"{Fore.CYAN}=== Decodificación Viterbi de archivo: {path} ==={Style.RESET_ALL}", file=out)
+    
+    show_progress = sys.stderr.isatty()
+    def progress(done, total):
+        if show_progress:
+            print(f"\r{Fore.YELLOW}Progreso: {done / total:6.1%} ({done}/{total} ventanas){Style.RESET_ALL}",
+                  end='', file=sys.stderr, flush=True)
+    
+    start = time.perf_counter()
+    segments = decode_segments(path, sensitivity=sensitivity, confidence_threshold=confidence,
+                               chunk_size=chunk_size, raw_rate=rate, raw_format=raw_format,
+                               table_path=table_path, hop_size=hop_size, block_frames=block_frames,
+                               switch_penalty=switch_penalty, progress=progress, cache=cache,
+                               vocabulary=vocabulary, freq_tolerance=freq_tolerance, peak_distance=peak_distance)
+    elapsed = time.perf_counter() - start
+    if show_progress:
+        print(file=sys.stderr)
+    for segment_start, segment_end, chord in segments:
+        if timeline_writer is not None:
+            timeline_writer.append(segment_start, chord)
+        if event_writer is not None:
+            event_writer.write_segment(segment_start, segment_end, chord)
+            continue
+        start_minutes, start_seconds = divmod(segment_start, 60)
+        end_minutes, end_seconds = divmod(segment_end, 60)
+        print(f"{Fore.GREEN}[{int(start_minutes):02d}:{start_seconds:06.3f} - "
+              f"{int(end_minutes):02d}:{end_seconds:06.3f}]{Style.RESET_ALL} {chord}")
+    if event_writer is not None:
+        event_writer.close()
+    duration = segments[-1][1] if segments else 0.0
+    if timeline_writer is not None:
+        timeline_writer.close(duration)
+    
+    speed = duration / elapsed if elapsed > 0 else float('inf')
+    print(f"{Fore.YELLOW}{len(segments)} segmentos en {elapsed:.2f} s ({speed:.0f}x tiempo real){Style.RESET_ALL}",
+          file=out)
+
+def analyze_audio_files(paths, sensitivity, confidence, chunk_size, rate, raw_format, table_path=None, hop_size=None,
+                        event_writer=None, block_frames=256, workers=None, segment_frames=2048, cache=None,
+                        vocabulary=None, freq_tolerance=10.0, peak_distance=15):
+    """Analiza varios archivos (o uno largo por tramos) en un pool de procesos.
+
+    Los cambios de acorde de cada archivo se muestran en orden cuando su línea
+    de tiempo está completa. En NDJSON cada evento incluye el campo ``file``.
+    """
+    out = sys.stdout if event_writer is None else sys.stderr
+    print(f"{Fore.CYAN}=== Análisis de {len(paths)} archivo(s) con {workers or 'todos los'} procesos ==={Style.RESET_ALL}",
+          file=out)
+    
+    show_progress = sys.stderr.isatty()
+    def progress(done, total):
+        if show_progress:
+            print(f"\r{Fore.YELLOW}Progreso: {done / total:6.1%} ({done}/{total} tramos){Style.RESET_ALL}",
+                  end='', file=sys.stderr, flush=True)
+    
+    start = time.perf_counter()
+    n_windows = 0
+    duration = 0.0
+    timelines = iter_file_timelines(paths, sensitivity=sensitivity, confidence_threshold=confidence,
+                                    chunk_size=chunk_size, raw_rate=rate, raw_format=raw_format,
+                                    block_frames=block_frames, table_path=table_path, hop_size=hop_size,
+                                    workers=workers, segment_frames=segment_frames, progress=progress,
+                                    cache_dir=cache.directory if cache is not None else None,
+                                    cache_bytes=cache.max_bytes if cache is not None else None,
+                                    vocabulary=vocabulary, freq_tolerance=freq_tolerance,
+                                    peak_distance=peak_distance)
+    for path, timeline in timelines:
+        if show_progress:
+            print('\r\033[K', end='', file=sys.stderr)
+        n_windows += len(timeline)
+        duration += timeline[-1][0] if timeline else 0.0
+        if event_writer is None:
+            print(f"{Fore.CYAN}--- {path} ---{Style.RESET_ALL}")
+        last_chord = None
+        for timestamp, chord, notes, score in timeline:
+            if chord == last_chord:
+                continue
+            last_chord = chord
+            if event_writer is not None:
+                event_writer.write_event(timestamp, chord, notes, score, file=path)
+                continue
+            minutes, seconds = divmod(timestamp, 60)
+            print(f"{Fore.GREEN}[{int(minutes):02d}:{seconds:06.3f}]{Style.RESET_ALL} {chord} ({', '.join(notes)})")
+    elapsed = time.perf_counter() - start
+    if event_writer is not None:
+        event_writer.close()
+    
+    speed = duration / elapsed if elapsed > 0 else float('inf')
+    print(f"{Fore.YELLOW}{n_windows} ventanas analizadas en {elapsed:.2f} s ({speed:.0f}x tiempo real){Style.RESET_ALL}",
+          file=out)
+
+def load_config(path, defaults):
+    """Lee un archivo JSON de configuración con valores de las opciones de la línea de comandos.
+
+    Las claves son los nombres de las opciones con guiones bajos (``sensitivity``,
+    ``threshold``, ``freq_tolerance``, ``window``...) y deben estar en
+    ``defaults``; las que empiezan por ``_`` son informativas y se ignoran.
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("se esperaba un objeto JSON")
+    config = {key: value for key, value in config.items() if not key.startswith('_')}
+    unknown = sorted(set(config) - set(defaults))
+    if unknown:
+        raise ValueError(f"opciones desconocidas: {', '.join(unknown)}")
+    return config
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Detector de Acordes en Tiempo Real")
     parser.add_argument("-l", "--list", action="store_true", 
@@ -105,13 +643,172 @@ def parse_args():
                         help="Frecuencia de muestreo en Hz (por defecto: 44100)")
     parser.add_argument("-c", "--chunk", type=int, default=4096,
                         help="Tamaño del fragmento de audio (por defecto: 4096)")
-    parser.add_argument("-s", "--sensitivity", type=float, default=0.1,
-                        help="Sensibilidad de detección de notas (0.01-1.0, por defecto: 0.1)")
+    parser.add_argument("--channels", type=int, default=1,
+                        help="Canales de entrada que se analizan por separado, cada uno con su propio acorde "
+                             "(micrófono, --stdin o --synthetic; por defecto: 1)")
+    parser.add_argument("--mix", action="store_true",
+                        help="Con --channels, analizar además la suma de todos los canales como un canal 'mix'")
+    parser.add_argument("--window", type=int,
+                        help="Tamaño de la ventana de análisis en muestras (por defecto: igual a --chunk)")
+    parser.add_argument("--hop", type=int,
+                        help="Salto entre análisis en muestras; la ventana debe ser múltiplo del salto "
+                             "(por defecto: igual a la ventana, sin solapamiento)")
+    parser.add_argument("-s", "--sensitivity", type=float,
+                        help="Sensibilidad de detección de notas (0.01-1.0, por defecto: 0.1 con fft y 0.3 con cqt)")
+    parser.add_argument("--front-end", choices=sorted(FRONT_END_SENSITIVITY), default='fft',
+                        help="Análisis del audio: 'fft' busca picos en el espectro lineal, 'cqt' calcula un "
+                             "cromagrama constant-Q con núcleos dispersos (por defecto: fft)")
+    parser.add_argument("--fft-size", type=int, metavar="N",
+                        help="Con fft, rellenar con ceros cada ventana más corta hasta N muestras antes de la FFT "
+                             "(por ejemplo, --window 1024 --fft-size 4096)")
+    parser.add_argument("--interpolate", action="store_true",
+                        help="Con fft, refinar la frecuencia de cada pico entre bins por interpolación parabólica")
+    parser.add_argument("--vocabulary", metavar="FILE",
+                        help="Vocabulario de acordes en JSON (por ejemplo, vocabularies/extended.json con 9ª, 11ª, "
+                             "13ª, dominantes alterados y quintas)")
+    parser.add_argument("--slash-chords", action="store_true",
+                        help="Usar la nota más grave detectada como bajo y mostrar acordes con bajo (C major/E)")
     parser.add_argument("-t", "--threshold", type=float, default=0.6,
                         help="Umbral de confianza para detección de acordes (0.0-1.0, por defecto: 0.6)")
+    parser.add_argument("--freq-tolerance", type=float, default=10.0, metavar="HZ",
+                        help="Con fft, tolerancia en Hz al convertir un pico en nota (por defecto: 10)")
+    parser.add_argument("--peak-distance", type=int, default=15, metavar="BINS",
+                        help="Con fft, separación mínima en bins entre dos picos del espectro (por defecto: 15)")
+    parser.add_argument("--config", metavar="FILE",
+                        help="Archivo JSON con valores de las opciones (por ejemplo, el que escribe autotune.py); "
+                             "las opciones de la línea de comandos tienen prioridad")
+    parser.add_argument("--gate", type=float, metavar="DBFS",
+                        help="Puerta de silencio: no analizar los fragmentos con nivel eficaz por debajo de este "
+                             "umbral en dBFS (por ejemplo, -45); se cierra 6 dB por debajo, con histéresis")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Si el análisis se acerca al tiempo real, degradarlo por escalones (uno de cada 2 "
+                             "fragmentos, menos picos, front end más barato) y recuperarlo cuando sobre tiempo")
+    parser.add_argument("--fps", type=float, default=30,
+                        help="Cuadros por segundo de la visualización (por defecto: 30)")
     parser.add_argument("-nv", "--no-visual", action="store_true",
-                        help="Ejecutar sin visualización gráfica")
-    return parser.parse_args()
+                        help="Ejecutar sin visualización gráfica, emitiendo los cambios de acorde como NDJSON")
+    parser.add_argument("-o", "--output",
+                        help="Archivo NDJSON para los eventos de acorde (por defecto, la salida estándar en modo sin visualización)")
+    parser.add_argument("-f", "--file", nargs='+',
+                        help="Analizar uno o varios archivos de audio (WAV, FLAC o PCM crudo) en lugar del micrófono")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Procesos para analizar archivos en paralelo; 0 usa todas las CPU (por defecto: 1)")
+    parser.add_argument("--segment-frames", type=int, default=2048,
+                        help="Ventanas por tramo al repartir un archivo entre procesos (por defecto: 2048)")
+    parser.add_argument("--cache",
+                        help="Carpeta de la caché de notas por ventana en modo archivo: al repetir un archivo con la "
+                             "misma configuración de análisis solo se repite la detección de acordes")
+    parser.add_argument("--cache-size", type=float, default=1024,
+                        help="Tamaño máximo de la caché en MB; se borran las entradas usadas hace más tiempo "
+                             "(por defecto: 1024)")
+    parser.add_argument("--timeline",
+                        help="Con un solo archivo, guardar la línea de tiempo completa en esta carpeta (formato "
+                             "binario por columnas, consultable con timeline.py)")
+    parser.add_argument("--raw-format", choices=sorted(RAW_FORMATS), default="int16",
+                        help="Formato de muestra para archivos PCM crudo (.raw/.pcm, por defecto: int16)")
+    parser.add_argument("--block-frames", type=int, default=256,
+                        help="Ventanas leídas y analizadas por bloque en modo archivo; acota la memoria (por defecto: 256)")
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument("--replay",
+                              help="Reproducir un archivo de audio por el pipeline en vivo en lugar del micrófono")
+    source_group.add_argument("--stdin", action="store_true",
+                              help="Leer PCM crudo de la entrada estándar (formato --raw-format, frecuencia --rate)")
+    source_group.add_argument("--synthetic", action="store_true",
+                              help="Usar una progresión de acordes sintética como entrada")
+    parser.add_argument("--free-run", action="store_true",
+                        help="Con --replay, --stdin o --synthetic, entregar fragmentos tan rápido como se analizan "
+                             "en lugar de a tiempo real")
+    parser.add_argument("--loop", action="store_true",
+                        help="Repetir indefinidamente el archivo de --replay o la progresión de --synthetic")
+    parser.add_argument("--buffer", type=int, default=32,
+                        help="Capacidad del buffer circular entre captura y análisis, en fragmentos (por defecto: 32)")
+    parser.add_argument("--overrun-policy", choices=OVERRUN_POLICIES, default=DROP_OLDEST,
+                        help="Qué hacer si el análisis se retrasa: 'drop-oldest' procesa lo que queda en el buffer, "
+                             "'skip' salta al fragmento más reciente (por defecto: drop-oldest)")
+    parser.add_argument("--processes", action="store_true",
+                        help="Ejecutar captura, análisis y visualización en procesos separados, "
+                             "comunicados por memoria compartida")
+    parser.add_argument("--viterbi", action="store_true",
+                        help="Suavizar la secuencia de acordes con Viterbi: segmentos (inicio, fin, acorde) en modo "
+                             "archivo y decisión con retardo fijo (--viterbi-lag) en vivo")
+    parser.add_argument("--switch-penalty", type=float, default=1.0,
+                        help="Con --viterbi, penalización por cada cambio de acorde (por defecto: 1.0)")
+    parser.add_argument("--viterbi-lag", type=int, default=8,
+                        help="Con --viterbi en vivo, fragmentos de retardo antes de decidir un acorde (por defecto: 8)")
+    parser.add_argument("--stats-interval", type=float,
+                        help="Sin visualización, mostrar latencias y contadores en stderr cada N segundos")
+    parser.add_argument("--profile",
+                        help="Guardar un perfil de cProfile del análisis en este archivo (legible con pstats)")
+    parser.add_argument("--chord-table",
+                        help="Archivo .npz donde guardar/reutilizar la tabla precalculada de acordes")
+    # Los valores del archivo de configuración sustituyen a los valores por defecto, así que
+    # lo que se indique en la línea de comandos sigue teniendo prioridad
+    config_path = parser.parse_known_args()[0].config
+    if config_path:
+        try:
+            parser.set_defaults(**load_config(config_path, vars(parser.parse_args([]))))
+        except (OSError, ValueError) as e:
+            parser.error(f"No se pudo cargar la configuración {config_path}: {e}")
+    args = parser.parse_args()
+    
+    # Resolver ventana y salto a partir del tamaño de fragmento
+    args.window = args.window or args.chunk
+    args.hop = args.hop or args.window
+    if args.hop <= 0 or args.window % args.hop != 0:
+        parser.error("--window debe ser un múltiplo positivo de --hop")
+    if args.jobs < 0 or args.segment_frames <= 0:
+        parser.error("--jobs no puede ser negativo y --segment-frames debe ser positivo")
+    if args.cache_size <= 0:
+        parser.error("--cache-size debe ser positivo")
+    if args.timeline and not (args.file and len(args.file) == 1 and args.jobs == 1):
+        parser.error("--timeline requiere un solo archivo (--file) sin --jobs")
+    if args.fps <= 0:
+        parser.error("--fps debe ser positivo")
+    if args.block_frames <= 0:
+        parser.error("--block-frames debe ser positivo")
+    if args.free_run and not (args.replay or args.stdin or args.synthetic):
+        parser.error("--free-run requiere --replay, --stdin o --synthetic")
+    if args.channels < 1:
+        parser.error("--channels debe ser positivo")
+    if args.channels > 1 and (args.file or args.replay):
+        parser.error("--channels solo se admite con el micrófono, --stdin o --synthetic")
+    if args.mix and args.channels == 1:
+        parser.error("--mix requiere --channels mayor que 1")
+    if args.processes and args.profile:
+        parser.error("--profile no es compatible con --processes")
+    if args.front_end == 'cqt' and args.file:
+        parser.error("--front-end cqt solo se admite en el análisis en vivo (no con --file)")
+    if args.fft_size is not None and args.fft_size <= 0:
+        parser.error("--fft-size debe ser positivo")
+    if (args.fft_size or args.interpolate) and (args.front_end == 'cqt' or args.file):
+        parser.error("--fft-size e --interpolate solo se admiten con --front-end fft en el análisis en vivo")
+    if args.slash_chords and (args.front_end == 'cqt' or args.viterbi or args.file):
+        parser.error("--slash-chords solo se admite con --front-end fft en el análisis en vivo, sin --viterbi")
+    if args.viterbi and args.channels > 1:
+        parser.error("--viterbi no se admite con --channels")
+    if args.viterbi and args.file and (len(args.file) > 1 or args.jobs != 1):
+        parser.error("--viterbi decodifica un solo archivo, sin --jobs")
+    if args.freq_tolerance <= 0 or args.peak_distance < 1:
+        parser.error("--freq-tolerance debe ser positivo y --peak-distance al menos 1")
+    if args.switch_penalty < 0 or args.viterbi_lag < 0:
+        parser.error("--switch-penalty y --viterbi-lag no pueden ser negativos")
+    if args.sensitivity is None:
+        args.sensitivity = FRONT_END_SENSITIVITY[args.front_end]
+    return args
+
+def create_source(args):
+    """Crea la fuente de audio indicada en la línea de comandos (None para el micrófono)"""
+    if args.replay:
+        return FileSource(args.replay, chunk_size=args.hop, free_run=args.free_run, loop=args.loop,
+                          raw_rate=args.rate, raw_format=args.raw_format)
+    if args.stdin:
+        return StdinSource(rate=args.rate, chunk_size=args.hop, sample_format=args.raw_format,
+                           channels=args.channels, free_run=args.free_run, mix=False)
+    if args.synthetic:
+        # En modo libre la progresión suena una sola vez (salvo --loop) para poder medir el rendimiento
+        return SyntheticSource(rate=args.rate, chunk_size=args.hop, free_run=args.free_run,
+                               loop=args.loop or not args.free_run, channels=args.channels)
+    return None
 
 if __name__ == "__main__":
     # Inicializar colorama para usar colores en Windows
@@ -130,10 +827,56 @@ if __name__ == "__main__":
     sensitivity = max(0.01, min(1.0, args.sensitivity))
     confidence = max(0.3, min(1.0, args.threshold))
     
+    # Vocabulario de acordes propio
+    vocabulary = None
+    if args.vocabulary:
+        try:
+            vocabulary = load_vocabulary(args.vocabulary)
+        except (OSError, ValueError) as e:
+            print(f"{Fore.RED}No se pudo cargar el vocabulario de acordes: {e}{Style.RESET_ALL}")
+            exit(1)
+    
+    # Perfil opcional del análisis (en modo archivo, del hilo principal)
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    
+    # Modo archivo: análisis por lotes sin captura de audio
+    if args.file:
+        writer = NDJSONWriter(args.output) if args.output or args.no_visual else None
+        cache = FeatureCache(args.cache, int(args.cache_size * 1024 * 1024)) if args.cache else None
+        timeline_writer = TimelineWriter(args.timeline) if args.timeline else None
+        if profiler is not None:
+            profiler.enable()
+        if args.viterbi:
+            decode_audio_file(args.file[0], sensitivity, confidence, args.window, args.rate, args.raw_format,
+                              table_path=args.chord_table, hop_size=args.hop, event_writer=writer,
+                              block_frames=args.block_frames, switch_penalty=args.switch_penalty, cache=cache,
+                              timeline_writer=timeline_writer, vocabulary=vocabulary,
+                              freq_tolerance=args.freq_tolerance, peak_distance=args.peak_distance)
+        elif len(args.file) == 1 and args.jobs == 1:
+            analyze_audio_file(args.file[0], sensitivity, confidence, args.window, args.rate, args.raw_format,
+                               table_path=args.chord_table, hop_size=args.hop, event_writer=writer,
+                               block_frames=args.block_frames, cache=cache, timeline_writer=timeline_writer,
+                               vocabulary=vocabulary, freq_tolerance=args.freq_tolerance,
+                               peak_distance=args.peak_distance)
+        else:
+            analyze_audio_files(args.file, sensitivity, confidence, args.window, args.rate, args.raw_format,
+                                table_path=args.chord_table, hop_size=args.hop, event_writer=writer,
+                                block_frames=args.block_frames, workers=args.jobs or None,
+                                segment_frames=args.segment_frames, cache=cache, vocabulary=vocabulary,
+                                freq_tolerance=args.freq_tolerance, peak_distance=args.peak_distance)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        exit(0)
+    
     device_id = args.device
+    source = create_source(args)
     
-    # Si no se especificó un dispositivo, permitir elegirlo
-    if device_id is None:
+    # Si no se especificó un dispositivo, permitir elegirlo (sin visualización se usa el predeterminado)
+    if source is None and device_id is None and not args.no_visual:
         print(f"{Fore.CYAN}=== Detector de Acordes en Tiempo Real ==={Style.RESET_ALL}")
         device_id = choose_audio_device()
     
@@ -144,14 +887,37 @@ if __name__ == "__main__":
             sensitivity=sensitivity,
             confidence_threshold=confidence,
             rate=args.rate,
-            chunk_size=args.chunk
+            chunk_size=args.chunk,
+            table_path=args.chord_table,
+            buffer_chunks=args.buffer,
+            overrun_policy=args.overrun_policy,
+            window_size=args.window,
+            hop_size=args.hop,
+            visual=not args.no_visual,
+            event_writer=NDJSONWriter(args.output) if args.no_visual or args.output else None,
+            stats_interval=args.stats_interval,
+            profiler=profiler,
+            source=source,
+            processes=args.processes,
+            channels=args.channels,
+            mix=args.mix,
+            front_end=args.front_end,
+            viterbi_lag=args.viterbi_lag if args.viterbi else None,
+            switch_penalty=args.switch_penalty,
+            fps=args.fps,
+            gate_db=args.gate,
+            adaptive=args.adaptive,
+            fft_size=args.fft_size,
+            interpolate=args.interpolate,
+            vocabulary=vocabulary,
+            slash_chords=args.slash_chords,
+            freq_tolerance=args.freq_tolerance,
+            peak_distance=args.peak_distance
         )
         
-        # Si se especificó ejecutar sin visualización, modificar comportamiento
-        if args.no_visual:
-            print(f"{Fore.YELLOW}Modo sin visualización no implementado aún. Usando visualización estándar.{Style.RESET_ALL}")
-        
         app.run()
+        if profiler is not None:
+            profiler.dump_stats(args.profile)
     except Exception as e:
         print(f"{Fore.RED}Error al ejecutar la aplicación: {e}{Style.RESET_ALL}")
         import traceback
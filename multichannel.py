@@ -0,0 +1,82 @@
+import numpy as np
+from chord_detector import ChordDetector
+from chroma import ChromaAnalyzer
+
+
+class MultiChannelDetector:
+    """Detección de acordes independiente en cada canal de una entrada multicanal.
+
+    Todos los canales, y opcionalmente su mezcla (la suma de los canales), se
+    analizan con una sola llamada a ``FrequencyAnalyzer.analyze_frames``: una
+    única FFT 2-D sobre la matriz (canales, muestras). Cada canal conserva su
+    propio ChordDetector con su persistencia, así que su resultado es el mismo
+    que si se analizara por separado. Con un ChromaAnalyzer como ``analyzer``
+    los acordes se clasifican a partir de los cromagramas de todos los canales
+    en un único lote. Con ``slash_chords`` el acorde de cada canal usa su
+    nota más grave como bajo (``FrequencyAnalyzer.bass_notes``).
+    """
+
+    def __init__(self, analyzer, channels, confidence_threshold=0.6, table_path=None, mix=False, vocabulary=None,
+                 slash_chords=False):
+        self.analyzer = analyzer
+        self.channels = channels
+        self.mix = mix
+        self.names = [f"ch{i + 1}" for i in range(channels)] + (['mix'] if mix else [])
+        # La tabla de acordes se comparte entre detectores: basta con cargarla (o guardarla) una vez
+        self.detectors = [
+            ChordDetector(confidence_threshold=confidence_threshold, table_path=table_path if i == 0 else None,
+                          vocabulary=vocabulary)
+            for i in range(len(self.names))
+        ]
+        self.current_chords = ["N/A"] * len(self.names)
+        self.current_notes = [[] for _ in self.names]
+        # Última matriz analizada (con la fila de la mezcla, si la hay)
+        self.frames = None
+        self._mix_frames = None
+        self._use_chroma = isinstance(analyzer, ChromaAnalyzer)
+        self.slash_chords = slash_chords and not self._use_chroma
+
+    def reset(self):
+        """Silencio: el acorde de cada canal pasa a N/A. Devuelve los índices de los canales que cambiaron."""
+        changed = [i for i, chord in enumerate(self.current_chords) if chord != "N/A"]
+        for i, detector in enumerate(self.detectors):
+            detector.reset()
+            self.current_chords[i] = "N/A"
+            self.current_notes[i] = []
+        return changed
+
+    def process(self, block):
+        """Analiza un bloque (canales, muestras) y actualiza el acorde de cada canal.
+
+        Devuelve los índices de los canales cuyo acorde cambió.
+        """
+        frames = block
+        if self.mix:
+            # Canales y mezcla en un buffer reutilizado, para analizarlos en la misma FFT
+            n_samples = block.shape[-1]
+            if self._mix_frames is None or self._mix_frames.shape[1] != n_samples:
+                self._mix_frames = np.empty((self.channels + 1, n_samples), dtype=np.float32)
+            frames = self._mix_frames
+            frames[:self.channels] = block
+            np.sum(block, axis=0, out=frames[self.channels])
+        self.frames = frames
+
+        changed = []
+        all_notes = self.analyzer.analyze_frames(frames)
+        if self._use_chroma:
+            # Todos los cromagramas se puntúan en un lote; cada detector aplica su persistencia
+            statuses, labels, scores = self.detectors[0].classify_chromas(self.analyzer.chromas)
+        for i, notes in enumerate(all_notes):
+            self.current_notes[i] = notes
+            # Igual que en un solo canal: sin notas se conserva el acorde actual
+            if notes:
+                detector = self.detectors[i]
+                if self._use_chroma:
+                    detector.last_score = float(scores[i])
+                    chord = detector.update_state(int(statuses[i]), int(labels[i]))
+                else:
+                    chord = detector.detect_chord(notes, self.analyzer.bass_notes[i] if self.slash_chords else None)
+                if chord != self.current_chords[i]:
+                    changed.append(i)
+                self.current_chords[i] = chord
+        return changed
@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+from frequency_analyzer import FrequencyAnalyzer
+from chord_detector import ChordDetector
+from feature_cache import FeatureCache, DEFAULT_MAX_BYTES
+from file_analysis import AudioFileReader, iter_window_notes, cached_window_notes, count_windows, RAW_EXTENSIONS
+
+# Formatos cuya longitud se conoce sin decodificar y que se pueden leer por tramos
+SEGMENTABLE_EXTENSIONS = RAW_EXTENSIONS + ('.wav',)
+
+# Configuración, analizadores y caché de notas de cada proceso del pool (se rellenan en _init_worker)
+_worker_settings = None
+_worker_cache = {}
+_worker_feature_cache = None
+
+
+def _init_worker(settings):
+    global _worker_settings, _worker_feature_cache
+    _worker_settings = settings
+    _worker_cache.clear()
+    _worker_feature_cache = None
+    if settings['cache_dir'] is not None:
+        # Cada proceso abre la misma carpeta; las escrituras atómicas la hacen segura
+        _worker_feature_cache = FeatureCache(settings['cache_dir'], settings['cache_bytes'])
+
+
+def _worker_components(rate):
+    """Analizador y detector del proceso actual para una frecuencia de muestreo"""
+    components = _worker_cache.get(rate)
+    if components is None:
+        settings = _worker_settings
+        components = _worker_cache[rate] = (
+            FrequencyAnalyzer(sampling_rate=rate, sensitivity=settings['sensitivity'],
+                              freq_tolerance=settings['freq_tolerance'], peak_distance=settings['peak_distance']),
+            ChordDetector(confidence_threshold=settings['confidence_threshold'], table_path=settings['table_path'],
+                          vocabulary=settings['vocabulary']),
+        )
+    return components
+
+
+def _analyze_segment(task):
+    """Analiza las ventanas ``start``..``stop`` de un archivo sin estado de persistencia.
+
+    Devuelve (frecuencia, [(notas, estado, etiqueta, puntuación), ...]). La
+    persistencia entre ventanas la aplica después el proceso principal, en
+    orden, para que el resultado sea idéntico al análisis en serie.
+    """
+    _, path, start, stop, content_hash = task
+    settings = _worker_settings
+    reader = AudioFileReader(path, raw_rate=settings['raw_rate'], raw_format=settings['raw_format'])
+    analyzer, detector = _worker_components(reader.rate)
+    if _worker_feature_cache is not None:
+        windows = cached_window_notes(reader, analyzer, settings['chunk_size'], settings['hop_size'],
+                                      _worker_feature_cache, content_hash, raw_format=settings['raw_format'],
+                                      block_frames=settings['block_frames'], start=start, stop=stop)
+    else:
+        windows = iter_window_notes(reader, analyzer, settings['chunk_size'], settings['hop_size'],
+                                    block_frames=settings['block_frames'], start=start, stop=stop)
+    results = []
+    for notes in windows:
+        status, label, score = detector.classify_notes(notes)
+        results.append((tuple(notes), status, label, score))
+    return reader.rate, results
+
+
+def _split_tasks(paths, settings, segment_frames):
+    """Divide cada archivo en tramos de ``segment_frames`` ventanas consecutivas.
+
+    Los tramos comparten muestras en la frontera (cada ventana se lee completa),
+    así que no se pierde ni se duplica ninguna ventana. Con caché, el hash del
+    contenido de cada archivo se calcula aquí una sola vez para todos sus tramos.
+    """
+    tasks = []
+    for file_index, path in enumerate(paths):
+        content_hash = FeatureCache.content_hash(path) if settings['cache_dir'] is not None else None
+        if os.path.splitext(path)[1].lower() not in SEGMENTABLE_EXTENSIONS:
+            # FLAC y similares: la longitud no se conoce sin decodificar, un único tramo
+            tasks.append((file_index, path, 0, None, content_hash))
+            continue
+        reader = AudioFileReader(path, raw_rate=settings['raw_rate'], raw_format=settings['raw_format'])
+        n_frames = count_windows(reader.length, settings['chunk_size'], settings['hop_size'])
+        for start in range(0, max(n_frames, 1), segment_frames):
+            tasks.append((file_index, path, start, start + segment_frames, content_hash))
+    return tasks
+
+
+def iter_file_timelines(paths, sensitivity=0.1, confidence_threshold=0.6, chunk_size=4096, raw_rate=44100,
+                        raw_format='int16', block_frames=256, table_path=None, hop_size=None, workers=None,
+                        segment_frames=2048, tasks_per_dispatch=1, progress=None, cache_dir=None,
+                        cache_bytes=None, vocabulary=None, freq_tolerance=10.0, peak_distance=15):
+    """Analiza un corpus de archivos en un pool de procesos.
+
+    Los archivos largos se dividen en tramos de ``segment_frames`` ventanas que
+    se reparten entre ``workers`` procesos (por defecto, uno por CPU), enviando
+    ``tasks_per_dispatch`` tramos por mensaje para amortizar la comunicación.
+    Genera (ruta, línea_de_tiempo) en el orden de ``paths``; cada línea de
+    tiempo es idéntica a la de ``analyze_file`` sobre el mismo archivo.
+    ``progress(tramos_completados, tramos_totales)`` se llama tras cada tramo.
+    Con ``cache_dir`` las notas de cada tramo se guardan en una FeatureCache
+    compartida por todos los procesos (limitada a ``cache_bytes``).
+    ``vocabulary`` es un vocabulario de acordes de ``load_vocabulary``;
+    ``freq_tolerance`` y ``peak_distance`` se pasan al FrequencyAnalyzer.
+    """
+    paths = list(paths)
+    settings = {
+        'sensitivity': sensitivity,
+        'confidence_threshold': confidence_threshold,
+        'chunk_size': chunk_size,
+        'hop_size': hop_size or chunk_size,
+        'raw_rate': raw_rate,
+        'raw_format': raw_format,
+        'block_frames': block_frames,
+        'table_path': table_path,
+        'cache_dir': cache_dir,
+        'cache_bytes': cache_bytes or DEFAULT_MAX_BYTES,
+        'vocabulary': vocabulary,
+        'freq_tolerance': freq_tolerance,
+        'peak_distance': peak_distance,
+    }
+    tasks = _split_tasks(paths, settings, segment_frames)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        # Sin pool: mismo código en el proceso actual
+        _init_worker(settings)
+        results = map(_analyze_segment, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(settings,))
+        results = pool.imap(_analyze_segment, tasks, chunksize=tasks_per_dispatch)
+
+    try:
+        # Fusión en orden: la persistencia del detector se aplica en serie por archivo
+        detector = None
+        timeline = []
+        current_file = None
+        for done, (task, (rate, windows)) in enumerate(zip(tasks, results), 1):
+            file_index, path, start = task[:3]
+            if file_index != current_file:
+                if current_file is not None:
+                    yield paths[current_file], timeline
+                current_file = file_index
+                detector = ChordDetector(confidence_threshold=confidence_threshold, table_path=table_path,
+                                         vocabulary=vocabulary)
+                timeline = []
+                current_chord = "N/A"
+                confidence = 0.0
+            for offset, (notes, status, label, score) in enumerate(windows):
+                # Igual que process_audio: sin notas se conserva el acorde actual
+                if notes:
+                    current_chord = detector.update_state(status, label)
+                    confidence = score
+                timeline.append(((start + offset) * settings['hop_size'] / rate, current_chord, list(notes),
+                                 confidence))
+            if progress is not None:
+                progress(done, len(tasks))
+        if current_file is not None:
+            yield paths[current_file], timeline
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def analyze_files(paths, **kwargs):
+    """Como ``iter_file_timelines`` pero devuelve un diccionario ruta -> línea de tiempo"""
+    return dict(iter_file_timelines(paths, **kwargs))
@@ -0,0 +1,351 @@
+"""Servidor de detección de acordes para varias entradas simultáneas.
+
+Un bucle asyncio acepta conexiones TCP o de socket Unix. La primera línea de
+cada conexión es una cabecera JSON que indica su papel:
+
+- ``{"role": "ingest", "stream": "escenario-1", "rate": 44100, "format": "int16",
+  "channels": 1, "chunk": 4096}`` seguida de PCM crudo: una entrada de audio.
+- ``{"role": "subscribe", "streams": ["escenario-1"], "changes_only": true}``:
+  recibe eventos NDJSON de las entradas indicadas (todas si se omite).
+- ``{"role": "stats"}``: recibe una línea JSON con las estadísticas y se cierra.
+
+Cada entrada tiene su propio FrequencyAnalyzer y ChordDetector; el análisis
+se ejecuta en un pool de hilos. Tanto las entradas como los suscriptores
+tienen colas acotadas: si el análisis o un cliente lento se retrasan, se
+descarta lo más antiguo y se cuenta, sin bloquear al resto.
+"""
+import argparse
+import asyncio
+import json
+import numbers
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from frequency_analyzer import FrequencyAnalyzer
+from chord_detector import ChordDetector
+from file_analysis import RAW_FORMATS
+from stats import LatencyHistogram
+from synthesis import chord_midi_notes, synthesize_chord
+
+
+class StreamState:
+    """Estado de análisis y contadores de una entrada de audio"""
+
+    def __init__(self, name, rate=44100, chunk_size=4096, sample_format='float32', channels=1,
+                 sensitivity=0.1, confidence_threshold=0.6, table_path=None, queue_chunks=32):
+        if not isinstance(sample_format, str) or sample_format not in RAW_FORMATS:
+            raise ValueError(f"Formato PCM no soportado: {sample_format}")
+        # Un fragmento de 0 bytes haría girar el bucle de lectura sin fin
+        for key, value in (('rate', rate), ('chunk', chunk_size), ('channels', channels)):
+            if isinstance(value, bool) or not isinstance(value, numbers.Integral) or value <= 0:
+                raise ValueError(f"'{key}' debe ser un entero positivo: {value!r}")
+        self.name = name
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.dtype, self.scale = RAW_FORMATS[sample_format]
+        self.channels = channels
+        self.chunk_bytes = chunk_size * channels * np.dtype(self.dtype).itemsize
+        self.analyzer = FrequencyAnalyzer(sampling_rate=rate, sensitivity=sensitivity)
+        self.detector = ChordDetector(confidence_threshold=confidence_threshold, table_path=table_path)
+        self.queue = asyncio.Queue(queue_chunks)
+        self.current_chord = "N/A"
+        self.current_notes = []
+        self.last_published = None
+        # Contadores
+        self.received = 0
+        self.processed = 0
+        self.overruns = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def put(self, data, received_at):
+        """Encola un fragmento; si la cola está llena se descarta el más antiguo"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.overruns += 1
+        self.queue.put_nowait((self.received, data, received_at))
+        self.received += 1
+
+    def process(self, data):
+        """Decodifica y analiza un fragmento. Se ejecuta en el pool de hilos."""
+        if isinstance(data, bytes):
+            samples = np.frombuffer(data, dtype=self.dtype).reshape(-1, self.channels)
+            samples = samples.mean(axis=1, dtype=np.float32) if self.channels > 1 else samples[:, 0].astype(np.float32)
+            if self.scale != 1.0:
+                samples /= np.float32(self.scale)
+        else:
+            samples = data
+        self.current_notes = self.analyzer.analyze(samples)
+        if self.current_notes:
+            self.current_chord = self.detector.detect_chord(self.current_notes)
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'chunk': self.chunk_size,
+            'received': self.received,
+            'processed': self.processed,
+            'pending': self.queue.qsize(),
+            'overruns': self.overruns,
+            'errors': self.errors,
+            'latency_ms': self.latency.summary(),
+        }
+
+
+class Subscriber:
+    """Cliente suscrito a eventos, con su propia cola acotada"""
+
+    def __init__(self, streams=None, changes_only=True, queue_size=256):
+        self.streams = set(streams) if streams else None
+        self.changes_only = changes_only
+        self.queue = asyncio.Queue(queue_size)
+        self.sent = 0
+        self.dropped = 0
+
+    def wants(self, stream_name, changed):
+        return (changed or not self.changes_only) and (self.streams is None or stream_name in self.streams)
+
+    def offer(self, line):
+        """Encola un evento sin esperar; un cliente lento pierde sus eventos más antiguos"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(line)
+
+
+class ChordServer:
+    def __init__(self, workers=None, sensitivity=0.1, confidence_threshold=0.6, table_path=None,
+                 queue_chunks=32, subscriber_queue=256):
+        self.executor = ThreadPoolExecutor(workers)
+        self.sensitivity = sensitivity
+        self.confidence_threshold = confidence_threshold
+        self.table_path = table_path
+        self.queue_chunks = queue_chunks
+        self.subscriber_queue = subscriber_queue
+        self.streams = {}
+        self.subscribers = set()
+        self.started_at = time.perf_counter()
+        # Contadores de clientes ya desconectados
+        self.events_dropped = 0
+        self.loop = None
+
+    def warm_up(self):
+        """Importa el motor de FFT y construye la tabla de acordes antes de aceptar entradas"""
+        stream = StreamState('warm-up', sensitivity=self.sensitivity, confidence_threshold=self.confidence_threshold,
+                             table_path=self.table_path)
+        # Un acorde completo, para que el detector llegue a construir su tabla
+        stream.process(synthesize_chord(chord_midi_notes(0, [0, 4, 7]), stream.chunk_size, stream.rate))
+
+    async def serve(self, host=None, port=None, unix_path=None):
+        """Escucha en TCP y/o en un socket Unix hasta que se cancele"""
+        self.loop = asyncio.get_running_loop()
+        await self.loop.run_in_executor(self.executor, self.warm_up)
+        servers = []
+        if port is not None:
+            servers.append(await asyncio.start_server(self.handle_client, host, port))
+        if unix_path is not None:
+            servers.append(await asyncio.start_unix_server(self.handle_client, unix_path))
+        for server in servers:
+            for sock in server.sockets:
+                print(f"Escuchando en {sock.getsockname()}", file=sys.stderr, flush=True)
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            for server in servers:
+                server.close()
+            self.executor.shutdown(wait=False)
+
+    async def handle_client(self, reader, writer):
+        try:
+            header = json.loads(await reader.readline() or b'{}')
+        except json.JSONDecodeError:
+            header = None
+        role = header.get('role', 'ingest') if isinstance(header, dict) else None
+        try:
+            if role == 'ingest':
+                await self._serve_ingest(reader, writer, header)
+            elif role == 'subscribe':
+                await self._serve_subscriber(reader, writer, header)
+            elif role == 'stats':
+                writer.write((json.dumps(self.stats()) + '\n').encode())
+                await writer.drain()
+            else:
+                writer.write(b'{"error": "cabecera no valida"}\n')
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            print(f"Conexión cerrada ({role}): {e}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    def open_stream(self, name, **options):
+        """Registra una entrada con nombre único y arranca su tarea de análisis"""
+        unique_name = name
+        suffix = 2
+        while unique_name in self.streams:
+            unique_name = f"{name}#{suffix}"
+            suffix += 1
+        stream = StreamState(unique_name, sensitivity=options.pop('sensitivity', self.sensitivity),
+                             confidence_threshold=options.pop('confidence_threshold', self.confidence_threshold),
+                             table_path=self.table_path, queue_chunks=self.queue_chunks, **options)
+        self.streams[unique_name] = stream
+        stream.task = asyncio.ensure_future(self._consume(stream))
+        return stream
+
+    async def close_stream(self, stream, drain=True):
+        """Termina de analizar lo pendiente (si ``drain``) y retira la entrada"""
+        # Si la tarea de análisis ya terminó nadie vaciaría la cola
+        if drain and not stream.task.done():
+            await stream.queue.join()
+        stream.task.cancel()
+        self.streams.pop(stream.name, None)
+
+    async def _serve_ingest(self, reader, writer, header):
+        try:
+            stream = self.open_stream(header.get('stream', 'stream'), rate=header.get('rate', 44100),
+                                      chunk_size=header.get('chunk', 4096),
+                                      sample_format=header.get('format', 'int16'),
+                                      channels=header.get('channels', 1))
+        except ValueError as e:
+            # Cabecera no válida: se responde con el motivo y se cierra la conexión
+            writer.write((json.dumps({'error': str(e)}, ensure_ascii=False) + '\n').encode())
+            await writer.drain()
+            return
+        try:
+            while True:
+                data = await reader.readexactly(stream.chunk_bytes)
+                stream.put(data, time.perf_counter())
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            await self.close_stream(stream)
+
+    def attach_source(self, name, source):
+        """Conecta una fuente local (micrófono, archivo, sintética) como una entrada más.
+
+        La fuente entrega fragmentos desde su propio hilo; se copian y se pasan
+        al bucle con ``call_soon_threadsafe``.
+        """
+        stream = self.open_stream(name, rate=source.rate, chunk_size=source.chunk_size)
+
+        def callback(data, timestamp):
+            self.loop.call_soon_threadsafe(stream.put, np.array(data, dtype=np.float32), timestamp)
+        source.start(callback)
+        return stream
+
+    async def _consume(self, stream):
+        """Analiza los fragmentos de una entrada en orden y publica los resultados.
+
+        Un fragmento que falla al analizarse se registra y se cuenta en
+        ``errors``; la entrada sigue con el siguiente.
+        """
+        while True:
+            seq, data, received_at = await stream.queue.get()
+            try:
+                await self.loop.run_in_executor(self.executor, stream.process, data)
+                stream.processed += 1
+                stream.latency.record(time.perf_counter() - received_at)
+                self.publish(stream, seq)
+            except Exception as e:
+                stream.errors += 1
+                print(f"Error al analizar el fragmento {seq} de {stream.name}: {e!r}", file=sys.stderr)
+            finally:
+                stream.queue.task_done()
+
+    def publish(self, stream, seq):
+        changed = stream.current_chord != stream.last_published
+        stream.last_published = stream.current_chord
+        line = None
+        for subscriber in self.subscribers:
+            if subscriber.wants(stream.name, changed):
+                if line is None:
+                    event = {
+                        'stream': stream.name,
+                        'seq': seq,
+                        'timestamp': round(time.time(), 6),
+                        'chord': stream.current_chord,
+                        'notes': stream.current_notes,
+                        'confidence': round(float(stream.detector.last_score), 4),
+                    }
+                    line = (json.dumps(event, ensure_ascii=False) + '\n').encode()
+                subscriber.offer(line)
+
+    async def _serve_subscriber(self, reader, writer, header):
+        subscriber = Subscriber(header.get('streams'), header.get('changes_only', True), self.subscriber_queue)
+        self.subscribers.add(subscriber)
+        # Detectar la desconexión aunque no haya eventos que enviar
+        disconnected = asyncio.ensure_future(reader.read())
+        try:
+            while not disconnected.done():
+                getter = asyncio.ensure_future(subscriber.queue.get())
+                await asyncio.wait((getter, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    break
+                writer.write(getter.result())
+                await writer.drain()
+                subscriber.sent += 1
+        finally:
+            disconnected.cancel()
+            self.subscribers.discard(subscriber)
+            self.events_dropped += subscriber.dropped
+
+    def stats(self):
+        """Contadores por entrada y de los suscriptores"""
+        return {
+            'uptime': round(time.perf_counter() - self.started_at, 3),
+            'streams': {name: stream.stats() for name, stream in self.streams.items()},
+            'subscribers': len(self.subscribers),
+            'events_dropped': self.events_dropped + sum(s.dropped for s in self.subscribers),
+        }
+
+
+async def _report_stats(server, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps(server.stats()), file=sys.stderr, flush=True)
+
+
+async def main_async(args):
+    server = ChordServer(workers=args.workers, sensitivity=args.sensitivity, confidence_threshold=args.threshold,
+                         table_path=args.chord_table, queue_chunks=args.queue_chunks,
+                         subscriber_queue=args.subscriber_queue)
+    server.loop = asyncio.get_running_loop()
+    for device in args.device or []:
+        from audio_capture import AudioCapture
+        server.attach_source(f"device-{device}", AudioCapture(rate=args.rate, chunk_size=args.chunk,
+                                                              device_index=device))
+    if args.stats_interval:
+        asyncio.ensure_future(_report_stats(server, args.stats_interval))
+    await server.serve(args.host, args.port, args.unix)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servidor de detección de acordes para varias entradas")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección TCP (por defecto: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Puerto TCP (por defecto: 8765)")
+    parser.add_argument("--unix", help="Escuchar también en este socket Unix")
+    parser.add_argument("--device", type=int, action="append",
+                        help="Añadir un dispositivo de audio local como entrada (se puede repetir)")
+    parser.add_argument("-r", "--rate", type=int, default=44100,
+                        help="Frecuencia de muestreo de los dispositivos locales (por defecto: 44100)")
+    parser.add_argument("-c", "--chunk", type=int, default=4096,
+                        help="Tamaño de fragmento de los dispositivos locales (por defecto: 4096)")
+    parser.add_argument("-w", "--workers", type=int, help="Hilos de análisis (por defecto: según las CPU)")
+    parser.add_argument("-s", "--sensitivity", type=float, default=0.1)
+    parser.add_argument("-t", "--threshold", type=float, default=0.6)
+    parser.add_argument("--chord-table", help="Archivo .npz con la tabla precalculada de acordes")
+    parser.add_argument("--queue-chunks", type=int, default=32,
+                        help="Fragmentos pendientes por entrada antes de descartar (por defecto: 32)")
+    parser.add_argument("--subscriber-queue", type=int, default=256,
+                        help="Eventos pendientes por suscriptor antes de descartar (por defecto: 256)")
+    parser.add_argument("--stats-interval", type=float, help="Mostrar estadísticas en stderr cada N segundos")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main_async(parse_args()))
+    except KeyboardInterrupt:
+        pass
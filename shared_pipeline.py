@@ -0,0 +1,383 @@
+import json
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from audio_pipeline import DROP_OLDEST, SKIP_FRAMES, OVERRUN_POLICIES
+from event_output import NDJSONWriter
+
+# Posiciones de la cabecera compartida del buffer
+_WRITE, _READ, _OVERRUNS, _SKIPPED, _CLOSED = range(5)
+_HEADER_SIZE = 8
+
+# Notas que se publican para el visualizador (solo muestra las primeras)
+_PUBLISHED_NOTES = 8
+
+
+class SharedRing:
+    """Buffer circular de fragmentos en memoria compartida entre procesos.
+
+    Misma semántica que RingBuffer (un productor, un consumidor, el productor
+    nunca espera salvo con ``block``), pero los índices y contadores viven en
+    una cabecera compartida y cada hueco tiene un contador de secuencia: impar
+    mientras se escribe y par al terminar. El lector copia el fragmento y
+    comprueba que el contador no cambió (seqlock), así que los datos pasan de
+    un proceso a otro sin cerrojos ni serialización. Cada hueco puede llevar
+    además una etiqueta de hasta ``label_size`` bytes.
+
+    Con ``channels`` > 1 cada fragmento es una matriz (canales, muestras).
+
+    Sin ``name`` se crea un bloque nuevo; los procesos hijos reciben el objeto
+    al crearse y se conectan al mismo bloque.
+    """
+
+    def __init__(self, capacity, chunk_size, label_size=0, name=None, ready=None, channels=1):
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.label_size = label_size
+        self.channels = channels
+        self.owner = name is None
+        sizes = [
+            ('header', np.int64, (_HEADER_SIZE,)),
+            ('sequences', np.int64, (capacity,)),
+            ('timestamps', np.float64, (capacity,)),
+            ('label_lengths', np.int64, (capacity,)),
+            ('buffer', np.float32, (capacity, chunk_size) if channels == 1 else (capacity, channels, chunk_size)),
+            ('labels', np.uint8, (capacity, label_size)),
+        ]
+        total = sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for _, dtype, shape in sizes)
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=total if self.owner else 0)
+        offset = 0
+        for attribute, dtype, shape in sizes:
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            setattr(self, attribute, array)
+            offset += array.nbytes
+        if self.owner:
+            self.header[:] = 0
+            self.sequences[:] = 0
+        # Aviso de datos nuevos para el consumidor (equivalente a RingBuffer.data_ready)
+        self.ready = ready if ready is not None else multiprocessing.Event()
+        self.read_timestamp = 0.0
+        self.read_label = b''
+
+    def __reduce__(self):
+        # Al pasar a otro proceso se vuelve a conectar al bloque por su nombre
+        return (SharedRing, (self.capacity, self.chunk_size, self.label_size, self.shm.name, self.ready,
+                             self.channels))
+
+    @property
+    def overruns(self):
+        return int(self.header[_OVERRUNS])
+
+    @property
+    def skipped(self):
+        return int(self.header[_SKIPPED])
+
+    @property
+    def written(self):
+        return int(self.header[_WRITE])
+
+    @property
+    def closed(self):
+        return bool(self.header[_CLOSED])
+
+    def available(self):
+        return int(self.header[_WRITE] - self.header[_READ])
+
+    def write(self, data, timestamp=None, label=b'', block=False):
+        """Copia un fragmento al buffer. Solo lo llama el proceso productor.
+
+        Con ``block`` espera a que el consumidor libere un hueco en lugar de
+        sobrescribir lo más antiguo (modo libre).
+        """
+        header = self.header
+        index = int(header[_WRITE])
+        if index - header[_READ] >= self.capacity:
+            if block:
+                while index - header[_READ] >= self.capacity and not header[_CLOSED]:
+                    time.sleep(0.0005)
+            else:
+                header[_OVERRUNS] += 1
+        slot = index % self.capacity
+        # Secuencia impar: el hueco se está escribiendo
+        self.sequences[slot] = 2 * index + 1
+        n = min(data.shape[-1], self.chunk_size)
+        self.buffer[slot, ..., :n] = data[..., :n]
+        if n < self.chunk_size:
+            self.buffer[slot, ..., n:] = 0
+        self.timestamps[slot] = time.perf_counter() if timestamp is None else timestamp
+        if self.label_size:
+            label = label[:self.label_size]
+            self.labels[slot, :len(label)] = np.frombuffer(label, dtype=np.uint8)
+            self.label_lengths[slot] = len(label)
+        # Secuencia par: hueco completo; después se publica el índice
+        self.sequences[slot] = 2 * index + 2
+        header[_WRITE] = index + 1
+        self.ready.set()
+
+    def read(self, out, policy=DROP_OLDEST):
+        """Copia el siguiente fragmento en ``out``. Devuelve False si no hay datos.
+
+        El instante de captura y la etiqueta del fragmento leído quedan en
+        ``read_timestamp`` y ``read_label``.
+        """
+        header = self.header
+        while True:
+            written = int(header[_WRITE])
+            index = int(header[_READ])
+            if written == index:
+                return False
+
+            if policy == SKIP_FRAMES and written - index > 1:
+                # Descartar el atraso y quedarse solo con el último fragmento
+                header[_SKIPPED] += written - index - 1
+                index = written - 1
+            elif written - index > self.capacity:
+                # Lo más antiguo ya se sobrescribió: continuar por lo más viejo que queda
+                index = written - self.capacity
+
+            slot = index % self.capacity
+            sequence = 2 * index + 2
+            if self.sequences[slot] != sequence:
+                # El productor ya está reescribiendo este hueco: volver a situarse
+                header[_READ] = index
+                continue
+            out[:] = self.buffer[slot]
+            timestamp = self.timestamps[slot]
+            label = self.labels[slot, :self.label_lengths[slot]].tobytes() if self.label_size else b''
+            # Si la secuencia cambió durante la copia, el dato no es válido
+            if self.sequences[slot] == sequence:
+                header[_READ] = index + 1
+                self.read_timestamp = timestamp
+                self.read_label = label
+                return True
+            header[_READ] = index
+
+    def close(self):
+        """Marca el final del flujo (y libera a un productor que esté esperando)"""
+        self.header[_CLOSED] = 1
+        self.ready.set()
+
+    def release(self):
+        """Desconecta este proceso del bloque; quien lo creó además lo elimina"""
+        for attribute in ('header', 'sequences', 'timestamps', 'label_lengths', 'buffer', 'labels'):
+            setattr(self, attribute, None)
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class ResultPublisher:
+    """Ocupa el lugar del visualizador en el proceso de análisis.
+
+    Cada resultado (ventana analizada, acorde y notas) se publica en un
+    SharedRing para que el proceso de visualización lo recoja.
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+
+    def update_data(self, audio_data, chord, notes, chroma=None, spectrum=None):
+        # Espectro y cromagrama no se publican: el visualizador los recalcula
+        label = json.dumps([chord, list(notes[:_PUBLISHED_NOTES])], ensure_ascii=False).encode()
+        self.ring.write(audio_data, label=label)
+
+
+def _ignore_interrupts():
+    # Ctrl+C lo gestiona el proceso principal, que detiene a los demás en orden
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _capture_process(source, ring, stop_event, reports):
+    """Proceso de captura: la fuente escribe cada fragmento en la memoria compartida"""
+    _ignore_interrupts()
+    block = source.free_run
+    source.start(lambda data, timestamp: ring.write(data, timestamp, block=block))
+    try:
+        while source.is_running and not stop_event.is_set():
+            time.sleep(0.05)
+    finally:
+        source.stop()
+        ring.close()
+        reports.put(('capture', {
+            'delivered': source.delivered,
+            'input_overflows': source.input_overflows,
+            'elapsed': source.elapsed(),
+        }))
+
+
+def _analysis_process(app_class, config, output, ring, results, policy, reports, report_interval):
+    """Proceso de análisis: consume la memoria compartida con el process_audio de una aplicación propia.
+
+    La aplicación se crea aquí a partir de ``config`` (``analysis_config`` de
+    la del proceso principal), porque la original no se puede serializar para
+    los métodos de arranque ``spawn`` y ``forkserver``. Con ``output`` (la
+    ruta de NDJSONWriter, o None para la salida estándar) los eventos se
+    escriben desde este proceso.
+    """
+    _ignore_interrupts()
+    event_writer = NDJSONWriter(output[0]) if output is not None else None
+    app = app_class(**config, visual=False, event_writer=event_writer)
+    app.visualizer = ResultPublisher(results) if results is not None else None
+    chunk = np.zeros(ring.buffer.shape[1:], dtype=np.float32)
+    processed = 0
+    last_report = time.monotonic()
+
+    def report():
+        stats = app.stats.snapshot()
+        stats['processed'] = processed
+        stats['load'] = app.load_stats()
+        reports.put(('analysis', stats))
+
+    try:
+        while True:
+            ring.ready.wait(timeout=0.1)
+            ring.ready.clear()
+            while ring.read(chunk, policy):
+                app.process_audio(chunk, ring.read_timestamp)
+                processed += 1
+            if ring.closed and not ring.available():
+                break
+            if report_interval and time.monotonic() - last_report >= report_interval:
+                last_report = time.monotonic()
+                report()
+    finally:
+        # Un productor bloqueado en modo libre no debe esperar a un consumidor que ya no está
+        ring.close()
+        if results is not None:
+            results.close()
+        if app.event_writer is not None:
+            app.event_writer.close()
+        report()
+
+
+class ProcessPipeline:
+    """Captura, análisis y visualización en procesos separados.
+
+    La captura y el análisis corren en procesos hijos y el proceso principal
+    solo visualiza, de modo que el renderizado de matplotlib no compite por el
+    GIL con el análisis. El audio y los resultados pasan por SharedRing; por
+    la cola ``reports`` solo viajan las estadísticas, como mucho cada
+    ``report_interval`` segundos y al terminar.
+    """
+
+    def __init__(self, app, buffer_chunks=32, policy=DROP_OLDEST, report_interval=None):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Política de desbordamiento no válida: {policy}")
+        self.app = app
+        self.policy = policy
+        self.report_interval = report_interval
+        self.audio_ring = SharedRing(buffer_chunks, app.source.chunk_size, channels=app.source.channels)
+        window_size = app.sliding_window.window_size if app.sliding_window is not None else app.source.chunk_size
+        # Unos pocos huecos bastan: el visualizador solo quiere el resultado más reciente
+        try:
+            self.results = SharedRing(4, window_size, label_size=1024)
+        except Exception:
+            self.audio_ring.release()
+            raise
+        self.reports = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.visualizer = None
+        self.capture = None
+        self.analysis = None
+        self.follower = None
+        self.follower_stop = threading.Event()
+        self.started_at = None
+        self._reports = {}
+        self._ring_counters = {}
+
+    def start(self):
+        """Arranca los procesos hijos (antes de crear ventanas o hilos en este proceso)"""
+        self.started_at = time.perf_counter()
+        writer = self.app.event_writer
+        output = (writer.path,) if writer is not None else None
+        self.analysis = multiprocessing.Process(
+            target=_analysis_process,
+            args=(type(self.app), self.app.analysis_config, output, self.audio_ring, self.results, self.policy,
+                  self.reports, self.report_interval),
+            daemon=True)
+        self.capture = multiprocessing.Process(
+            target=_capture_process, args=(self.app.source, self.audio_ring, self.stop_event, self.reports),
+            daemon=True)
+        try:
+            self.analysis.start()
+            self.capture.start()
+        except Exception:
+            # Sin procesos en marcha nadie liberaría la memoria compartida
+            self.stop_event.set()
+            for process in (self.analysis, self.capture):
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            self.audio_ring.release()
+            self.results.release()
+            raise
+        self.follower = threading.Thread(target=self._follow_results, daemon=True)
+        self.follower.start()
+
+    def _follow_results(self):
+        """Pasa el resultado más reciente al visualizador, alternando entre dos buffers"""
+        buffers = [np.zeros(self.results.chunk_size, dtype=np.float32) for _ in range(2)]
+        current = 0
+        while not self.follower_stop.is_set() and (self.analysis.is_alive() or self.results.available()):
+            self.results.ready.wait(timeout=0.1)
+            self.results.ready.clear()
+            if self.results.read(buffers[current], SKIP_FRAMES) and self.visualizer is not None:
+                chord, notes = json.loads(self.results.read_label)
+                self.visualizer.update_data(buffers[current], chord, notes)
+                current = 1 - current
+
+    def is_running(self):
+        return self.capture is not None and self.capture.is_alive()
+
+    def stop(self, timeout=1.0):
+        """Detiene la captura, deja que el análisis termine lo pendiente y libera la memoria"""
+        self.stop_event.set()
+        self.capture.join(timeout)
+        # El análisis sale solo al vaciar el buffer cerrado
+        self.analysis.join(timeout)
+        for process in (self.capture, self.analysis):
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        # El hilo lee de self.results: tiene que haber salido antes de liberar la memoria
+        self.follower_stop.set()
+        self.follower.join()
+        # Últimos contadores antes de liberar la memoria compartida
+        self.stats()
+        self.audio_ring.release()
+        self.results.release()
+
+    def _collect_reports(self):
+        while True:
+            try:
+                role, data = self.reports.get_nowait()
+            except queue.Empty:
+                return
+            self._reports[role] = data
+
+    def stats(self):
+        """Mismos contadores que ChordDetectorApp.pipeline_stats, reunidos de los procesos hijos"""
+        if self.audio_ring.header is not None:
+            self._collect_reports()
+            self._ring_counters = {
+                'pending': self.audio_ring.available(),
+                'overruns': self.audio_ring.overruns,
+                'skipped': self.audio_ring.skipped,
+                'delivered': self.audio_ring.written,
+            }
+        analysis = self._reports.get('analysis', {})
+        capture = self._reports.get('capture', {})
+        stats = {
+            'processed': analysis.get('processed', 0),
+            'input_overflows': capture.get('input_overflows', 0),
+            'elapsed': capture.get('elapsed', time.perf_counter() - (self.started_at or time.perf_counter())),
+        }
+        stats.update(self._ring_counters)
+        stats['latency_ms'] = analysis.get('latency_ms', {})
+        stats['counters'] = analysis.get('counters', {})
+        stats['load'] = analysis.get('load')
+        return stats
@@ -0,0 +1,89 @@
+import time
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+def format_latency(latency_ms):
+    """Resumen de una línea por etapa a partir de los percentiles de ``snapshot``"""
+    lines = []
+    for stage, summary in latency_ms.items():
+        if summary['count']:
+            lines.append(f"{stage:<12} p50={summary['p50']:.3f} p95={summary['p95']:.3f} "
+                         f"p99={summary['p99']:.3f} ms (n={summary['count']})")
+    return '\n'.join(lines)
+
+
+class LatencyHistogram:
+    """Ventana deslizante de las últimas ``capacity`` mediciones de una etapa.
+
+    Registrar una medición solo escribe en un array preasignado; los
+    percentiles se calculan al leer, fuera del camino crítico.
+    """
+
+    def __init__(self, capacity=1024):
+        self.samples = np.zeros(capacity)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+
+    def summary(self):
+        """Número de mediciones y percentiles en milisegundos"""
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not len(filled):
+            return {'count': 0}
+        values = np.percentile(filled, PERCENTILES) * 1e3
+        summary = {'count': self.count}
+        summary.update({f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, values)})
+        return summary
+
+
+class PipelineStats:
+    """Tiempos por etapa y contadores del pipeline de análisis.
+
+    Cada etapa se mide como una vuelta de cronómetro: ``begin`` marca el inicio
+    del fragmento y cada ``lap`` registra el tiempo desde la marca anterior.
+    Está pensado para que lo use un único hilo (el de análisis); los demás
+    hilos solo leen con ``snapshot``.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.histograms = {}
+        self.counters = {}
+        self._start = 0.0
+        self._last = 0.0
+
+    def begin(self):
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.record(stage, now - self._last)
+        self._last = now
+
+    def end(self, stage='total'):
+        """Registra el tiempo total desde ``begin``"""
+        self.record(stage, time.perf_counter() - self._start)
+
+    def record(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram(self.capacity)
+        histogram.record(seconds)
+
+    def increment(self, counter, amount=1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def snapshot(self):
+        """Copia legible de percentiles por etapa y contadores"""
+        return {
+            'latency_ms': {stage: h.summary() for stage, h in list(self.histograms.items())},
+            'counters': dict(self.counters),
+        }
+
+    def format(self):
+        """Resumen de una línea por etapa: p50/p95/p99 en milisegundos"""
+        return format_latency(self.snapshot()['latency_ms'])
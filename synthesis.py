@@ -0,0 +1,105 @@
+import numpy as np
+
+# Notas musicales en orden cromático (mismo orden que ChordDetector.NOTES)
+NOTES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+
+def midi_to_frequency(midi):
+    """Frecuencia en Hz de una nota MIDI (A4 = 69 = 440 Hz)"""
+    return 440.0 * 2.0 ** ((np.asarray(midi, dtype=float) - 69) / 12)
+
+
+def chord_midi_notes(root, intervals, octave=3, inversion=0):
+    """Notas MIDI de un acorde sobre ``root`` (0-11) en la octava indicada.
+
+    Con ``inversion`` > 0 las notas más graves se suben una octava, de modo
+    que la nota del bajo deja de ser la fundamental.
+    """
+    base = 12 * (octave + 1) + root
+    notes = sorted(base + interval for interval in intervals)
+    for i in range(inversion % len(notes)):
+        notes[i] += 12
+    return sorted(notes)
+
+
+def synthesize_chord(midi_notes, n_samples, sampling_rate=44100, harmonics=4, rolloff=0.6,
+                     detune_cents=0.0, noise=0.0, rng=None):
+    """Genera un acorde sintético como señal float32.
+
+    Cada nota se compone de ``harmonics`` parciales con amplitud decreciente
+    (``rolloff`` por armónico) y fase aleatoria. ``detune_cents`` desafina cada
+    nota al azar dentro de ±cents y ``noise`` añade ruido blanco con esa
+    desviación relativa al valor eficaz de la señal.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    t = np.arange(n_samples) / sampling_rate
+    signal = np.zeros(n_samples)
+    nyquist = sampling_rate / 2
+
+    for midi in midi_notes:
+        detune = rng.uniform(-detune_cents, detune_cents) if detune_cents else 0.0
+        fundamental = midi_to_frequency(midi) * 2.0 ** (detune / 1200)
+        for k in range(1, harmonics + 1):
+            freq = fundamental * k
+            if freq >= nyquist:
+                break
+            signal += rolloff ** (k - 1) * np.sin(2 * np.pi * freq * t + rng.uniform(0, 2 * np.pi))
+
+    if noise:
+        rms = np.sqrt(np.mean(signal ** 2))
+        signal += rng.normal(0, noise * rms, n_samples)
+
+    peak = np.max(np.abs(signal))
+    if peak > 0:
+        signal *= 0.5 / peak
+    return signal.astype(np.float32)
+
+
+def chord_test_set(chord_patterns, n_samples, sampling_rate=44100, inversions=True, octave=3,
+                   harmonics=4, rolloff=0.6, detune_cents=0.0, noise=0.0, seed=0):
+    """Genera un caso por cada tipo de acorde, raíz e inversión.
+
+    Devuelve una lista de tuplas (etiqueta esperada, inversión, señal), donde la
+    etiqueta sigue el formato de ChordDetector (por ejemplo "C# minor7").
+    """
+    rng = np.random.default_rng(seed)
+    cases = []
+    for chord_type, intervals in chord_patterns.items():
+        n_inversions = len(intervals) if inversions else 1
+        for root in range(12):
+            for inversion in range(n_inversions):
+                notes = chord_midi_notes(root, intervals, octave=octave, inversion=inversion)
+                signal = synthesize_chord(notes, n_samples, sampling_rate, harmonics=harmonics,
+                                          rolloff=rolloff, detune_cents=detune_cents, noise=noise, rng=rng)
+                cases.append((f"{NOTES[root]} {chord_type}", inversion, signal))
+    return cases
+
+
+def chord_progression(chord_patterns, seconds, sampling_rate=44100, chord_seconds=(1.0, 2.0), octaves=(3, 4),
+                      inversions=True, harmonics=4, rolloff=0.6, detune_cents=0.0, noise=0.0, seed=0):
+    """Progresión de acordes al azar con sus etiquetas, para ajustar y evaluar la detección.
+
+    Cada acorde es un tipo de ``chord_patterns`` sobre una raíz, una octava de
+    ``octaves`` y (con ``inversions``) una inversión al azar, y dura entre los
+    dos valores de ``chord_seconds``. Devuelve (señal float32, segmentos), con
+    cada segmento como (inicio, fin, etiqueta) en segundos y la etiqueta en el
+    formato de ChordDetector.
+    """
+    rng = np.random.default_rng(seed)
+    chord_types = list(chord_patterns)
+    total = int(seconds * sampling_rate)
+    signals, segments = [], []
+    position = 0
+    while position < total:
+        n_samples = min(total - position, max(1, int(rng.uniform(*chord_seconds) * sampling_rate)))
+        chord_type = chord_types[rng.integers(len(chord_types))]
+        root = int(rng.integers(12))
+        intervals = chord_patterns[chord_type]
+        inversion = int(rng.integers(len(intervals))) if inversions else 0
+        notes = chord_midi_notes(root, intervals, octave=int(rng.choice(octaves)), inversion=inversion)
+        signals.append(synthesize_chord(notes, n_samples, sampling_rate, harmonics=harmonics, rolloff=rolloff,
+                                        detune_cents=detune_cents, noise=noise, rng=rng))
+        segments.append((position / sampling_rate, (position + n_samples) / sampling_rate,
+                         f"{NOTES[root]} {chord_type}"))
+        position += n_samples
+    return np.concatenate(signals), segments
@@ -0,0 +1,359 @@
+"""Formato binario por columnas para líneas de tiempo de acordes.
+
+Una línea de tiempo es una carpeta con una columna por campo (instante,
+acorde, confianza y notas) en binario little-endian, más los índices que se
+construyen al cerrarla: segmentos (filas donde cambia el acorde), un índice
+de instantes cada ``TIME_INDEX_STEP`` filas y, por cada acorde, la lista de
+sus segmentos. ``meta.json`` se escribe en último lugar y de forma atómica:
+una carpeta sin él es una línea de tiempo sin terminar.
+
+Las columnas se abren con ``np.memmap``, así que las consultas solo leen las
+páginas que necesitan. Uso como programa:
+
+    python timeline.py acordes.chtl [--at 12.5] [--range 10 20] [--chord "A minor7"]
+        [--export {json,csv,lab}] [-o salida]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import numpy as np
+from chord_detector import ChordDetector
+
+FORMAT_VERSION = 1
+
+# Filas entre dos entradas del índice de instantes
+TIME_INDEX_STEP = 4096
+
+# Filas acumuladas en memoria antes de añadirlas a las columnas
+FLUSH_ROWS = 65536
+
+# Columnas que se escriben fila a fila y su tipo en disco
+ROW_COLUMNS = {
+    'time': '<f8',
+    'label': '<i2',
+    'confidence': '<f4',
+    'note_count': '<u1',
+}
+
+# Columnas e índices que se construyen al cerrar
+INDEX_COLUMNS = {
+    'notes': '<u1',
+    'note_offsets': '<i8',
+    'time_index': '<f8',
+    'segment_row': '<i8',
+    'segment_time': '<f8',
+    'segment_label': '<i2',
+    'label_offsets': '<i8',
+    'label_segments': '<i8',
+}
+
+
+def chord_vocabulary():
+    """Etiquetas internadas de antemano: ChordDetector.NOTES x CHORD_PATTERNS, en el orden de chord_labels"""
+    return [f"{root} {chord_type}" for root in ChordDetector.NOTES for chord_type in ChordDetector.CHORD_PATTERNS]
+
+
+class TimelineWriter:
+    """Escribe una línea de tiempo fila a fila, por bloques, sin acumularla en memoria.
+
+    Las etiquetas y los nombres de nota se internan: cada fila guarda un
+    índice int16 en la tabla de acordes (que empieza por todos los de
+    ``chord_vocabulary``) y un índice uint8 por nota. Los instantes deben
+    llegar en orden no decreciente.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # Una carpeta que se reescribe deja de ser válida hasta el nuevo close
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            os.unlink(meta_path)
+        self.labels = chord_vocabulary()
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        self.note_names = []
+        self._note_index = {}
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), 'wb')
+                       for name in list(ROW_COLUMNS) + ['notes']}
+        self._rows = {name: [] for name in ROW_COLUMNS}
+        self._notes = []
+        self.rows = 0
+        self.last_time = None
+        self.closed = False
+
+    def _intern(self, table, index, value):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(table)
+            table.append(value)
+        return code
+
+    def append(self, time, chord, notes=(), confidence=0.0):
+        """Añade una fila (instante en segundos, acorde, notas, confianza)"""
+        if self.last_time is not None and time < self.last_time:
+            raise ValueError("Los instantes de la línea de tiempo deben ser crecientes")
+        self.last_time = time
+        rows = self._rows
+        rows['time'].append(time)
+        rows['label'].append(self._intern(self.labels, self._label_index, chord))
+        rows['confidence'].append(confidence)
+        rows['note_count'].append(len(notes))
+        for note in notes:
+            self._notes.append(self._intern(self.note_names, self._note_index, note))
+        self.rows += 1
+        if len(rows['time']) >= FLUSH_ROWS:
+            self.flush()
+
+    def extend(self, rows):
+        """Añade varias filas (instante, acorde, notas, confianza), como las de iter_timeline"""
+        for time, chord, notes, confidence in rows:
+            self.append(time, chord, notes, confidence)
+
+    def flush(self):
+        """Añade a las columnas en disco las filas acumuladas"""
+        if len(self._label_index) > 32767 or len(self._note_index) > 255:
+            raise ValueError("Demasiadas etiquetas o notas distintas para el formato")
+        for name, dtype in ROW_COLUMNS.items():
+            np.asarray(self._rows[name], dtype=dtype).tofile(self._files[name])
+            self._rows[name].clear()
+        np.asarray(self._notes, dtype='<u1').tofile(self._files['notes'])
+        self._notes.clear()
+
+    def close(self, end_time=None):
+        """Escribe las filas pendientes, construye los índices y publica ``meta.json``.
+
+        ``end_time`` es el final del último segmento (por defecto, el instante
+        de la última fila).
+        """
+        if self.closed:
+            return
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self.closed = True
+        path = self.path
+        time = _read_column(path, 'time', '<f8')
+        labels = _read_column(path, 'label', '<i2')
+        counts = _read_column(path, 'note_count', '<u1')
+
+        # Segmentos: filas donde cambia el acorde
+        segment_row = np.flatnonzero(np.diff(labels) != 0) + 1 if len(labels) else np.zeros(0, dtype=np.int64)
+        if len(labels):
+            segment_row = np.concatenate(([0], segment_row))
+        segment_label = labels[segment_row]
+        # Segmentos de cada acorde, en orden temporal (argsort estable)
+        label_segments = np.argsort(segment_label, kind='stable')
+        label_offsets = np.zeros(len(self.labels) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(segment_label, minlength=len(self.labels)), out=label_offsets[1:])
+        note_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=note_offsets[1:])
+        columns = {
+            'note_offsets': note_offsets,
+            'time_index': time[::TIME_INDEX_STEP],
+            'segment_row': segment_row,
+            'segment_time': time[segment_row],
+            'segment_label': segment_label,
+            'label_offsets': label_offsets,
+            'label_segments': label_segments,
+        }
+        for name, values in columns.items():
+            np.asarray(values, dtype=INDEX_COLUMNS[name]).tofile(os.path.join(path, f"{name}.bin"))
+
+        if end_time is None:
+            end_time = float(time[-1]) if len(time) else 0.0
+        meta = {
+            'version': FORMAT_VERSION,
+            'rows': self.rows,
+            'segments': len(segment_row),
+            'end_time': end_time,
+            'time_index_step': TIME_INDEX_STEP,
+            'labels': self.labels,
+            'notes': self.note_names,
+        }
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Si hubo un error la línea de tiempo queda sin meta.json, es decir, sin terminar
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files.values():
+                f.close()
+
+
+def _read_column(path, name, dtype):
+    """Proyecta una columna en memoria (solo lectura); las vacías se devuelven como array vacío"""
+    column_path = os.path.join(path, f"{name}.bin")
+    if os.path.getsize(column_path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(column_path, dtype=dtype, mode='r')
+
+
+def write_timeline(path, rows, end_time=None):
+    """Escribe una secuencia de filas (instante, acorde, notas, confianza) en ``path``"""
+    writer = TimelineWriter(path)
+    writer.extend(rows)
+    writer.close(end_time)
+    return path
+
+
+class Timeline:
+    """Lectura y consultas sobre una línea de tiempo escrita con TimelineWriter.
+
+    Ninguna consulta carga el archivo entero: las columnas se proyectan en
+    memoria y cada búsqueda por instante es una búsqueda binaria sobre el
+    índice de instantes seguida de otra dentro de un solo bloque de filas.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            raise ValueError(f"{path} no es una línea de tiempo terminada (falta meta.json)")
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError(f"Versión de línea de tiempo no soportada: {meta['version']}")
+        self.labels = meta['labels']
+        self.note_names = meta['notes']
+        self.end_time = meta['end_time']
+        self.rows = meta['rows']
+        self.n_segments = meta['segments']
+        self._step = meta['time_index_step']
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        columns = dict(ROW_COLUMNS, **INDEX_COLUMNS)
+        for name, dtype in columns.items():
+            setattr(self, f"_{name}", _read_column(path, name, dtype))
+
+    def __len__(self):
+        return self.rows
+
+    def _row_at(self, t):
+        """Última fila con instante <= t, o -1 si t es anterior a la primera"""
+        block = int(np.searchsorted(self._time_index, t, side='right')) - 1
+        if block < 0:
+            return -1
+        start = block * self._step
+        times = self._time[start:start + self._step]
+        return start + int(np.searchsorted(times, t, side='right')) - 1
+
+    def row(self, index):
+        """Fila ``index`` como (instante, acorde, notas, confianza)"""
+        start, end = self._note_offsets[index], self._note_offsets[index + 1]
+        notes = [self.note_names[code] for code in self._notes[start:end]]
+        return (float(self._time[index]), self.labels[self._label[index]], notes, float(self._confidence[index]))
+
+    def chord_at(self, t):
+        """Fila vigente en el instante ``t``, o None fuera de la línea de tiempo"""
+        index = self._row_at(t)
+        if index < 0 or t > self.end_time:
+            return None
+        return self.row(index)
+
+    def _segment_end(self, index):
+        if index + 1 < len(self._segment_time):
+            return float(self._segment_time[index + 1])
+        return float(self.end_time)
+
+    def segments(self, t0=None, t1=None):
+        """Segmentos (inicio, fin, acorde) que se solapan con [t0, t1]"""
+        first = 0 if t0 is None else max(0, int(np.searchsorted(self._segment_time, t0, side='right')) - 1)
+        last = len(self._segment_time) if t1 is None else int(np.searchsorted(self._segment_time, t1, side='right'))
+        return [(float(self._segment_time[i]), self._segment_end(i), self.labels[self._segment_label[i]])
+                for i in range(first, last)]
+
+    def occurrences(self, chord):
+        """Segmentos (inicio, fin) de un acorde, en orden temporal"""
+        code = self._label_index.get(chord)
+        if code is None:
+            return []
+        indices = self._label_segments[self._label_offsets[code]:self._label_offsets[code + 1]]
+        return [(float(self._segment_time[i]), self._segment_end(i)) for i in indices]
+
+    def iter_rows(self, start=0, stop=None, block_rows=FLUSH_ROWS):
+        """Genera las filas ``start``..``stop`` leyendo las columnas por bloques"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        names = self.note_names
+        labels = self.labels
+        for first in range(start, stop, block_rows):
+            last = min(first + block_rows, stop)
+            offsets = self._note_offsets[first:last + 1] - self._note_offsets[first]
+            codes = self._notes[self._note_offsets[first]:self._note_offsets[last]].tolist()
+            times = self._time[first:last].tolist()
+            label_codes = self._label[first:last].tolist()
+            confidences = self._confidence[first:last].tolist()
+            offsets = offsets.tolist()
+            for i in range(last - first):
+                notes = [names[code] for code in codes[offsets[i]:offsets[i + 1]]]
+                yield times[i], labels[label_codes[i]], notes, confidences[i]
+
+    def export_json(self, f):
+        """Escribe todas las filas como un array JSON de objetos"""
+        f.write('[')
+        for i, (time, chord, notes, confidence) in enumerate(self.iter_rows()):
+            row = {'time': round(time, 6), 'chord': chord, 'notes': notes, 'confidence': round(confidence, 4)}
+            f.write((',\n' if i else '\n') + json.dumps(row, ensure_ascii=False))
+        f.write('\n]\n')
+
+    def export_csv(self, f):
+        """Escribe todas las filas como CSV (las notas, separadas por espacios)"""
+        writer = csv.writer(f)
+        writer.writerow(['time', 'chord', 'confidence', 'notes'])
+        for time, chord, notes, confidence in self.iter_rows():
+            writer.writerow([f"{time:.6f}", chord, f"{confidence:.4f}", ' '.join(notes)])
+
+    def export_lab(self, f):
+        """Escribe los segmentos en formato .lab (inicio, fin y acorde separados por tabuladores)"""
+        for start, end, chord in self.segments():
+            f.write(f"{start:.6f}\t{end:.6f}\t{chord}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas sobre una línea de tiempo de acordes")
+    parser.add_argument("path", help="Carpeta de la línea de tiempo")
+    parser.add_argument("--at", type=float, help="Acorde vigente en este instante (segundos)")
+    parser.add_argument("--range", type=float, nargs=2, metavar=('T0', 'T1'),
+                        help="Segmentos que se solapan con el intervalo")
+    parser.add_argument("--chord", help="Todas las apariciones de un acorde (por ejemplo, \"A minor7\")")
+    parser.add_argument("--export", choices=['json', 'csv', 'lab'], help="Exportar la línea de tiempo completa")
+    parser.add_argument("-o", "--output", help="Archivo de salida de --export (por defecto, la salida estándar)")
+    args = parser.parse_args()
+
+    timeline = Timeline(args.path)
+    if args.export:
+        out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            getattr(timeline, f"export_{args.export}")(out)
+        finally:
+            if args.output:
+                out.close()
+        return
+    if args.at is not None:
+        row = timeline.chord_at(args.at)
+        if row is None:
+            print("Fuera de la línea de tiempo")
+        else:
+            time, chord, notes, confidence = row
+            print(f"{chord} ({', '.join(notes)}) desde {time:.3f} s, confianza {confidence:.2f}")
+    if args.range is not None:
+        for start, end, chord in timeline.segments(*args.range):
+            print(f"{start:10.3f} {end:10.3f}  {chord}")
+    if args.chord is not None:
+        occurrences = timeline.occurrences(args.chord)
+        for start, end in occurrences:
+            print(f"{start:10.3f} {end:10.3f}")
+        print(f"{len(occurrences)} apariciones de {args.chord}")
+    if args.at is None and args.range is None and args.chord is None:
+        print(f"{len(timeline)} filas, {timeline.n_segments} segmentos, {timeline.end_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
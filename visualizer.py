@@ -1,81 +1,497 @@
+import threading
+import time
+import matplotlib
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import numpy as np
-import time
+from matplotlib.artist import Artist
+from matplotlib.patches import Polygon
+from frequency_analyzer import FrequencyAnalyzer
+from stats import PipelineStats
+
+NOTES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+
+def decimate_minmax(samples, width, out):
+    """Reduce una señal a ``width`` columnas guardando el mínimo y el máximo de cada una.
+
+    Escribe en ``out`` (al menos 2 * width valores) la secuencia mín, máx, mín,
+    máx... y devuelve (vista de ``out`` con los valores, muestras por columna).
+    Si la señal ya cabe en el ancho se devuelve tal cual con paso 1.
+    """
+    n = len(samples)
+    if n <= 2 * width:
+        out[:n] = samples
+        return out[:n], 1
+    step = -(-n // width)
+    columns = n // step
+    blocks = samples[:columns * step].reshape(columns, step)
+    np.min(blocks, axis=1, out=out[0:2 * columns:2])
+    np.max(blocks, axis=1, out=out[1:2 * columns:2])
+    return out[:2 * columns], step
+
+
+def _copy_into(buffer, values):
+    """Copia ``values`` en ``buffer`` en float32, reutilizándolo si tiene el mismo tamaño"""
+    if buffer is None or len(buffer) != len(values):
+        buffer = np.empty(len(values), dtype=np.float32)
+    np.copyto(buffer, values, casting='unsafe')
+    return buffer
+
+
+class _Snapshot:
+    """Un resultado del análisis: ventana de audio, acorde, notas y, si los hay, espectro y cromagrama"""
 
-class AudioVisualizer:
     def __init__(self):
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.chord = "N/A"
+        self.notes = []
+        self.spectrum = None
+        self.chroma = None
+        # Buffers de espectro y cromagrama, que se conservan aunque un resultado no los traiga
+        self._buffers = {'spectrum': None, 'chroma': None}
+        self.sequence = 0
+
+    def fill(self, audio_data, chord, notes, spectrum, chroma, sequence):
+        self.audio = _copy_into(self.audio, audio_data)
+        self.chord = chord
+        self.notes = list(notes)
+        self.spectrum = self._copy('spectrum', spectrum)
+        self.chroma = self._copy('chroma', chroma)
+        self.sequence = sequence
+
+
+    def _copy(self, name, values):
+        if values is None:
+            return None
+        self._buffers[name] = _copy_into(self._buffers[name], values)
+        return self._buffers[name]
+
+
+class _ScrollingImage:
+    """Imagen (filas, historia) que se desplaza una columna por fragmento sin copiar la historia.
+
+    Cada columna se escribe dos veces, en ``pos`` y en ``pos + history``, así
+    que ``data[:, pos + 1:pos + 1 + history]`` siempre es la historia completa
+    en orden temporal y es una vista, no una copia. ``fill`` puede ser un
+    color (p. ej. RGBA): cada celda tiene entonces la forma de ``fill``.
+    """
+
+    def __init__(self, rows, history, fill=0.0, dtype=np.float32):
+        self.history = history
+        fill = np.asarray(fill, dtype=dtype)
+        self.data = np.empty((rows, 2 * history) + fill.shape, dtype=dtype)
+        self.data[...] = fill
+        self.pos = history - 1
+
+    def push(self, column, repeat=1):
+        """Añade ``repeat`` veces una columna (los fragmentos que llegaron desde el último dibujo)"""
+        for _ in range(min(repeat, self.history)):
+            self.pos = (self.pos + 1) % self.history
+            self.data[:, self.pos] = column
+            self.data[:, self.pos + self.history] = column
+
+    def view(self):
+        start = self.pos + 1
+        return self.data[:, start:start + self.history]
+
+
+class _PixelImage(Artist):
+    """Imagen desplazable a la resolución en píxeles de unos ejes, dibujada sin remuestreo.
+
+    AxesImage normaliza, aplica el mapa de colores y remuestrea la imagen
+    completa a los píxeles de los ejes en cada dibujo, lo que cuesta más que
+    todo el análisis del fragmento. Aquí cada columna nueva (``rows`` valores
+    entre 0 y 1) se convierte a RGBA con una tabla de 256 colores al
+    añadirla, ya a la altura en píxeles de los ejes, y ``draw`` pasa los
+    píxeles tal cual a ``renderer.draw_image``. Cada fragmento ocupa
+    ``width / history`` píxeles (al menos uno); si los ejes cambian de
+    tamaño, la historia se reescala una vez.
+    """
+
+    def __init__(self, ax, rows, history, cmap):
+        super().__init__()
+        self.axes = ax
+        self.rows = rows
+        self.history = history
+        self.set_figure(ax.figure)
+        self.set_animated(True)
+        self._lut = (matplotlib.colormaps[cmap](np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+        self._bounds = None
+        self.image = None
+        self._fit()
+
+    def _fit(self):
+        """Ajusta los píxeles al tamaño actual de los ejes, conservando la historia"""
+        x0, y0, width, height = (int(round(v)) for v in self.axes.bbox.bounds)
+        bounds = (x0, y0, max(1, width), max(1, height))
+        if bounds == self._bounds:
+            return
+        width, height = bounds[2:]
+        old = self.image.view() if self.image is not None else None
+        self._bounds = bounds
+        # Fila de datos de cada fila de píxeles (renderer.draw_image pone la fila 0 abajo)
+        self._row_map = np.arange(height) * self.rows // height
+        self._step = max(1, round(width / self.history))
+        self.image = _ScrollingImage(height, width, fill=self._lut[0], dtype=np.uint8)
+        if old is not None:
+            resized = old[np.arange(height) * old.shape[0] // height][:, np.arange(width) * old.shape[1] // width]
+            self.image.data[:, :width] = resized
+            self.image.data[:, width:] = resized
+
+    def push(self, values, repeat=1):
+        """Añade ``repeat`` fragmentos con los valores (entre 0 y 1) de cada fila de datos"""
+        levels = np.clip(values * 255, 0, 255).astype(np.intp)
+        self.image.push(self._lut[levels[self._row_map]], repeat * self._step)
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        self._fit()
+        gc = renderer.new_gc()
+        renderer.draw_image(gc, self._bounds[0], self._bounds[1], np.ascontiguousarray(self.image.view()))
+        gc.restore()
+        self.stale = False
+
+
+class AudioVisualizer:
+    """Forma de onda, espectrograma y cromagrama desplazables con el acorde detectado.
+
+    ``update_data`` (hilo de análisis) solo copia el resultado en un buffer
+    propio y lo intercambia con el compartido bajo un cerrojo; el dibujo
+    intercambia a su vez el compartido con el suyo, así que ninguno de los dos
+    lee un buffer mientras el otro lo escribe y el cerrojo solo protege el
+    intercambio de referencias. Al dibujar, la forma de onda se reduce a
+    mín/máx por píxel con un eje x cacheado y se rellena como un polígono sin
+    borde, y el espectro y el cromagrama se añaden como una columna a
+    imágenes RGBA ya a la resolución de sus ejes (``_PixelImage``).
+
+    Un temporizador a ``fps`` cuadros por segundo solo redibuja cuando hay un
+    resultado nuevo: restaura el fondo guardado en el último dibujo completo
+    solo en los ejes que cambian y hace blit solo de sus recuadros. El
+    recuadro del acorde es opaco y sus píxeles se guardan por texto, así que
+    un acorde ya visto no se vuelve a rasterizar. El tiempo de cada cuadro
+    queda en ``stats``.
+    """
+
+    # Frecuencia máxima del espectrograma y decibelios mostrados por debajo del máximo
+    MAX_FREQUENCY = 2000
+    DYNAMIC_RANGE_DB = 60
+    # Por debajo de esta amplitud el fragmento se considera silencio (como en el análisis)
+    MIN_AMPLITUDE = 0.005
+    # Recuadros de acorde y notas ya rasterizados que se conservan (maquetar el texto
+    # cuesta más que todo el resto del cuadro)
+    TEXT_CACHE_SIZE = 64
+
+    def __init__(self, sampling_rate=44100, window_size=4096, fps=30, history=200, fft_size=None):
+        self.sampling_rate = sampling_rate
+        self.window_size = window_size
+        # Tamaño mínimo de la FFT del análisis (relleno con ceros): fija la separación entre bins
+        self.fft_size = fft_size
+        self.fps = fps
+        self.history = history
+
         # Configurar la ventana de visualización
         plt.style.use('dark_background')  # Mejor estilo para visualización
-        self.fig, self.ax = plt.subplots(figsize=(10, 6))
-        plt.subplots_adjust(left=0.1, right=0.9, top=0.9, bottom=0.1)
-        
-        # Para la forma de onda
-        self.line, = self.ax.plot([], [], lw=2, color='cyan')
+        self.fig, (self.ax, self.spectrum_ax, self.chroma_ax) = plt.subplots(
+            3, 1, figsize=(10, 8), gridspec_kw={'height_ratios': [2, 2, 1]})
+        plt.subplots_adjust(left=0.1, right=0.9, top=0.93, bottom=0.07, hspace=0.45)
+
+        # Para la forma de onda: relleno entre el mínimo y el máximo de cada píxel (un
+        # polígono sin borde se rasteriza mucho antes que una línea que sube y baja en
+        # cada columna)
         self.ax.set_ylim(-1, 1)
-        self.ax.set_xlim(0, 1000)  # Ajustar según el tamaño de chunk
+        self.ax.set_xlim(0, window_size - 1)
+        self.waveform = Polygon(np.zeros((2, 2)), closed=True, facecolor='cyan', lw=0)
+        self.ax.add_patch(self.waveform)
+        self._outline = np.zeros((0, 2))
         self.ax.set_title('Forma de Onda de Audio', color='white', fontsize=14)
         self.ax.set_xlabel('Muestras', color='white')
         self.ax.set_ylabel('Amplitud', color='white')
         self.ax.grid(True, alpha=0.3)
-        
+
+        # Espectrograma y cromagrama: historia de ``history`` fragmentos, el más reciente a la derecha
+        self.spectrum_image = None
+        self.spectrum_ax.set_title('Espectro (dB)', color='white', fontsize=11)
+        self.spectrum_ax.set_ylabel('Hz', color='white')
+        self.spectrum_ax.set_xlim(-history, 0)
+        self.chroma_image = _PixelImage(self.chroma_ax, 12, history, 'magma')
+        self.chroma_ax.set_xlim(-history, 0)
+        self.chroma_ax.set_ylim(-0.5, 11.5)
+        self.chroma_ax.set_title('Cromagrama', color='white', fontsize=11)
+        self.chroma_ax.set_yticks(range(12))
+        self.chroma_ax.set_yticklabels(NOTES, fontsize=7)
+        self.chroma_ax.set_xlabel('Fragmentos', color='white')
+
         # Cambiar el color de los ejes para mejor visibilidad
-        self.ax.tick_params(axis='x', colors='white')
-        self.ax.tick_params(axis='y', colors='white')
-        
-        # Para mostrar el acorde detectado y las notas
+        for ax in (self.ax, self.spectrum_ax, self.chroma_ax):
+            ax.tick_params(axis='x', colors='white')
+            ax.tick_params(axis='y', colors='white')
+
+        # Para mostrar el acorde detectado y las notas. El recuadro es opaco y centrado, así
+        # que los píxeles de un texto ya dibujado se pueden restaurar en lugar de volver a
+        # maquetarlo (hasta el siguiente dibujo completo)
         self.chord_text = self.ax.text(0.5, 0.95, '', transform=self.ax.transAxes,
                                        ha='center', va='top', fontsize=16, color='yellow',
-                                       bbox=dict(boxstyle='round', facecolor='black', alpha=0.7))
-        
-        # Para animación
-        self.anim = None
-        
-        # Datos actuales
-        self.audio_data = np.zeros(1000)
-        self.current_chord = "N/A"
-        self.current_notes = []
-        
-        # Control de tiempo para limitar FPS
-        self.last_update = time.time()
-        self.fps_limit = 30  # Limitar a 30 FPS para reducir uso de CPU
-    
-    def update_plot(self, frame):
-        # Limitar la tasa de actualización para reducir uso de CPU
-        current_time = time.time()
-        if current_time - self.last_update < 1.0/self.fps_limit:
-            return self.line, self.chord_text
-            
-        self.last_update = current_time
-        
-        # Actualizar la forma de onda
-        x = np.arange(len(self.audio_data))
-        y = self.audio_data
-        self.line.set_data(x, y)
-        
+                                       bbox=dict(boxstyle='square', facecolor='black', edgecolor='black'))
+        self._text_pixels = {}
+
+        # Para animación: fondo de cada eje guardado en el último dibujo completo
+        self.timer = None
+        self._backgrounds = None
+
+        # Resultados: el que escribe el análisis, el compartido y el que se está dibujando
+        self._lock = threading.Lock()
+        self._back = _Snapshot()
+        self._front = _Snapshot()
+        self._drawn = _Snapshot()
+        self._sequence = 0
+        self._fresh = False
+
+        # Ancho en píxeles de la forma de onda y eje x cacheado por (muestras, ancho)
+        self._width = None
+        self._x_key = None
+        self._x = None
+        self._y = np.zeros(0, dtype=np.float32)
+        self._spectrum = None
+        self._spectrum_image(window_size)
+        self.fig.canvas.mpl_connect('resize_event', self._on_resize)
+        # Los artistas que cambian se dibujan aparte, sobre el fondo de cada dibujo completo
+        for artist in self._artists():
+            artist.set_animated(True)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+        # Tiempos del dibujo (estado, forma de onda, espectro, cromagrama, texto y total)
+        self.stats = PipelineStats()
+
+    @property
+    def current_chord(self):
+        return self._drawn.chord
+
+    @property
+    def current_notes(self):
+        return self._drawn.notes
+
+    def _on_resize(self, event):
+        self._width = None
+
+    def _waveform_width(self):
+        """Ancho en píxeles del eje de la forma de onda (se recalcula al redimensionar)"""
+        if self._width is None:
+            self._width = max(1, int(self.ax.bbox.width))
+        return self._width
+
+    def _x_axis(self, n_samples, columns, step):
+        """Eje x de la forma de onda (una x por columna); solo se reconstruye si cambia el tamaño o el ancho"""
+        key = (n_samples, columns, step)
+        if key != self._x_key:
+            self._x_key = key
+            if step == 1:
+                self._x = np.arange(columns, dtype=np.float32)
+            else:
+                # Centro de cada columna
+                self._x = np.arange(columns, dtype=np.float32) * step + step / 2
+            if n_samples != self.window_size:
+                # Cambió el tamaño de ventana: los ejes cambian y hay que redibujar el fondo
+                self.window_size = n_samples
+                self.ax.set_xlim(0, max(n_samples - 1, 1))
+                self.fig.canvas.draw_idle()
+        return self._x
+
+    def _spectrum_image(self, n_samples):
+        """Imagen del espectrograma para un tamaño de ventana (se crea con el primer fragmento)"""
+        spectrum = self._spectrum
+        if spectrum is None or spectrum['n_samples'] != n_samples:
+            n_fft = max(n_samples, self.fft_size or 0)
+            freqs = np.fft.rfftfreq(n_fft, 1 / self.sampling_rate)
+            n_bins = max(2, int(np.searchsorted(freqs, self.MAX_FREQUENCY)))
+            rebuild = self.spectrum_image is not None
+            self.spectrum_image = _PixelImage(self.spectrum_ax, n_bins, self.history, 'viridis')
+            self.spectrum_ax.set_ylim(0, freqs[n_bins - 1])
+            if rebuild:
+                # Cambia la escala de frecuencias: hay que redibujar el fondo
+                self.fig.canvas.draw_idle()
+            spectrum = self._spectrum = {
+                'n_samples': n_samples,
+                'n_bins': n_bins,
+                'window': np.hanning(n_samples).astype(np.float32),
+                'buffer': np.zeros(n_fft, dtype=np.float32),
+            }
+        return spectrum
+
+    def _push_spectrum(self, snapshot, repeat):
+        audio = snapshot.audio
+        spectrum = self._spectrum_image(len(audio))
+        n_bins = spectrum['n_bins']
+        if snapshot.spectrum is not None:
+            # El espectro que ya calculó el análisis
+            magnitude = snapshot.spectrum[:n_bins]
+        elif max(audio.max(), -audio.min()) > self.MIN_AMPLITUDE:
+            buffer = spectrum['buffer']
+            np.multiply(audio, spectrum['window'], out=buffer[:len(audio)])
+            magnitude = np.abs(np.fft.rfft(buffer)[:n_bins])
+        else:
+            magnitude = None
+        if magnitude is None:
+            column = np.zeros(n_bins)
+        else:
+            # Decibelios relativos al bin más fuerte del fragmento, de -DYNAMIC_RANGE_DB (0) a 0 dB (1)
+            column = 20 * np.log10(magnitude / (magnitude.max() + 1e-12) + 1e-12)
+            column = 1 + column / self.DYNAMIC_RANGE_DB
+        self.spectrum_image.push(column, repeat)
+
+    def _push_chroma(self, snapshot, repeat):
+        if snapshot.chroma is not None:
+            column = snapshot.chroma
+        else:
+            # Sin cromagrama del análisis: las notas, de más a menos fuerte
+            column = np.zeros(12, dtype=np.float32)
+            for rank, note in enumerate(snapshot.notes):
+                pitch_class = FrequencyAnalyzer.PITCH_CLASSES.get(note[:-1])
+                if pitch_class is not None:
+                    column[pitch_class] = max(column[pitch_class], 1.0 - 0.5 * rank / len(snapshot.notes))
+        self.chroma_image.push(column, repeat)
+
+    def _push_waveform(self, y, step):
+        """Contorno del relleno: los máximos de izquierda a derecha y los mínimos de vuelta"""
+        if step == 1:
+            lower = upper = y
+        else:
+            lower, upper = y[0::2], y[1::2]
+        x = self._x_axis(len(self._drawn.audio), len(upper), step)
+        n = len(upper)
+        if len(self._outline) < 2 * n:
+            self._outline = np.zeros((2 * n, 2))
+        outline = self._outline[:2 * n]
+        outline[:n, 0] = x
+        # Al menos un píxel de alto, para que sin borde la señal plana siga viéndose como una línea
+        ylim = self.ax.get_ylim()
+        np.maximum(upper, lower + (ylim[1] - ylim[0]) / max(1.0, self.ax.bbox.height), out=outline[:n, 1])
+        outline[n:, 0] = x[::-1]
+        outline[n:, 1] = lower[::-1]
+        self.waveform.set_xy(outline)
+
+    def _artists(self):
+        return self.waveform, self.chord_text, self.spectrum_image, self.chroma_image
+
+    def update_plot(self, frame=None):
+        """Prepara los artistas con el resultado más reciente.
+
+        Devuelve los artistas que hay que redibujar, o una tupla vacía si no
+        llegó ningún resultado desde el cuadro anterior.
+        """
+        stats = self.stats
+        stats.begin()
+        # Recoger el resultado más reciente, si hay uno nuevo
+        previous = self._drawn.sequence
+        with self._lock:
+            fresh = self._fresh
+            if fresh:
+                self._front, self._drawn = self._drawn, self._front
+                self._fresh = False
+        stats.lap('snapshot')
+        if not fresh:
+            stats.increment('repeated_frames')
+            return ()
+        snapshot = self._drawn
+        # Fragmentos analizados desde el último dibujo: las imágenes avanzan lo mismo
+        repeat = snapshot.sequence - previous
+
+        # Forma de onda reducida a mín/máx por píxel
+        width = self._waveform_width()
+        if len(self._y) < 2 * width:
+            self._y = np.empty(2 * width, dtype=np.float32)
+        y, step = decimate_minmax(snapshot.audio, width, self._y)
+        self._push_waveform(y, step)
+        stats.lap('waveform')
+
+        self._push_spectrum(snapshot, repeat)
+        stats.lap('spectrum')
+        self._push_chroma(snapshot, repeat)
+        stats.lap('chroma')
+
         # Actualizar el texto del acorde y notas
-        notes_str = ", ".join(self.current_notes[:5]) if self.current_notes else "Ninguna nota detectada"
-        display_text = f"Acorde: {self.current_chord}\nNotas: {notes_str}"
+        notes_str = ", ".join(snapshot.notes[:5]) if snapshot.notes else "Ninguna nota detectada"
+        display_text = f"Acorde: {snapshot.chord}\nNotas: {notes_str}"
         self.chord_text.set_text(display_text)
-        
-        return self.line, self.chord_text
-    
-    def update_data(self, audio_data, chord, notes):
-        self.audio_data = audio_data
-        self.current_chord = chord
-        self.current_notes = notes
-    
+        stats.lap('text')
+        stats.end('render')
+        stats.increment('frames')
+
+        return self._artists()
+
+    def update_data(self, audio_data, chord, notes, chroma=None, spectrum=None):
+        """Entrega un resultado del análisis (se llama desde el hilo de análisis).
+
+        ``spectrum`` es la magnitud de la rfft de la ventana si el análisis ya
+        la calculó, y ``chroma``, su cromagrama; sin ellos, el espectro se
+        calcula al dibujar y el cromagrama se deriva de las notas.
+        """
+        back = self._back
+        back.fill(audio_data, chord, notes, spectrum, chroma, self._sequence + 1)
+        with self._lock:
+            self._back, self._front = self._front, back
+            self._sequence += 1
+            self._fresh = True
+
+    def _on_draw(self, event):
+        # Dibujo completo (ventana nueva, redimensionada...): guardar el fondo de cada eje y
+        # añadir los artistas
+        canvas = self.fig.canvas
+        if getattr(canvas, 'supports_blit', False):
+            self._backgrounds = {ax: canvas.copy_from_bbox(ax.bbox) for ax in self.fig.axes}
+        self._text_pixels.clear()
+        for artist in self._artists():
+            self.fig.draw_artist(artist)
+
+    def _draw_text(self):
+        """Dibuja el recuadro del acorde, o restaura sus píxeles si ese texto ya se dibujó"""
+        canvas = self.fig.canvas
+        text = self.chord_text.get_text()
+        pixels = self._text_pixels.pop(text, None)
+        if pixels is None:
+            self.fig.draw_artist(self.chord_text)
+            pixels = canvas.copy_from_bbox(self.chord_text.get_bbox_patch().get_window_extent())
+            if len(self._text_pixels) >= self.TEXT_CACHE_SIZE:
+                # Se descarta el usado hace más tiempo
+                del self._text_pixels[next(iter(self._text_pixels))]
+        else:
+            canvas.restore_region(pixels)
+        self._text_pixels[text] = pixels
+
+    def refresh(self):
+        """Dibuja un cuadro si hay un resultado nuevo; devuelve si se dibujó"""
+        artists = self.update_plot()
+        if not artists:
+            return False
+        canvas = self.fig.canvas
+        if self._backgrounds is None:
+            # Sin fondo guardado (o sin soporte de blit) se redibuja todo
+            canvas.draw_idle()
+            return True
+        start = time.perf_counter()
+        # Solo se restauran, redibujan y copian a pantalla los ejes que cambiaron
+        changed = [ax for ax in self.fig.axes if any(artist.axes is ax for artist in artists)]
+        for ax in changed:
+            canvas.restore_region(self._backgrounds[ax])
+        for artist in artists:
+            if artist is self.chord_text:
+                self._draw_text()
+            else:
+                self.fig.draw_artist(artist)
+        for ax in changed:
+            canvas.blit(ax.bbox)
+        self.stats.record('blit', time.perf_counter() - start)
+        return True
+
     def start(self):
-        # Iniciar la animación con save_count para evitar la advertencia
-        self.anim = FuncAnimation(self.fig, self.update_plot, 
-                                  frames=None, 
-                                  interval=50, 
-                                  blit=True,
-                                  cache_frame_data=False)  # Evita la memoria ilimitada
+        # El temporizador fija la tasa de refresco; solo se dibuja cuando hay datos nuevos
+        self.timer = self.fig.canvas.new_timer(interval=1000 / self.fps)
+        self.timer.add_callback(self.refresh)
+        self.timer.start()
         plt.show(block=False)
         plt.pause(0.1)  # Pequeña pausa para que la ventana aparezca
-    
+
     def stop(self):
-        if self.anim:
-            self.anim.event_source.stop()
+        if self.timer:
+            self.timer.stop()
             plt.close(self.fig)